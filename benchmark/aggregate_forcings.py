@@ -0,0 +1,129 @@
+"""
+Forcing aggregation
+===================
+
+Time the aggregation of a synthetic hourly gridded forcing file (ERA5-like) to the HRUs of a basin with the
+``aggregate-forcings-to-hrus`` script. A fraction of the grid cells are NODATA (e.g. over water), and some cells are
+missing at random time steps, so that the weights of the HRUs need to be rescaled. The peak memory is the peak of the
+Python allocations measured with `tracemalloc` in a second run, with the variables read and aggregated in windows of
+`--time-window` time steps.
+
+Run it on two checkouts to compare the aggregation before and after a change, or with other windows and compression of
+the output:
+
+    $ python benchmark/aggregate_forcings.py --years 3
+    $ python benchmark/aggregate_forcings.py --years 3 --time-window 100 --no-zlib
+"""
+import argparse
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import netCDF4 as nc4
+import numpy as np
+
+from ravenpy.cli import aggregate_forcings_to_hrus
+from ravenpy.config.commands import GridWeightsCommand
+
+
+def create_inputs(path: Path, ntime: int, nlat: int, nlon: int, n_hrus: int):
+    rng = np.random.default_rng(0)
+
+    fn = path / "forcing.nc"
+    with nc4.Dataset(fn, "w") as ds:
+        ds.createDimension("time", ntime)
+        ds.createDimension("lat_dim", nlat)
+        ds.createDimension("lon_dim", nlon)
+        t = ds.createVariable("time", "f8", ("time",))
+        t.units = "hours since 2000-01-01"
+        t[:] = np.arange(ntime)
+
+        # Cells of the first rows are always NODATA, the others are missing at 0.1% of the time steps
+        mask = np.zeros((ntime, nlat, nlon), dtype=bool)
+        mask[:, : nlat // 10] = True
+        mask |= rng.uniform(size=mask.shape) < 0.001
+        for name in ["pr", "tas"]:
+            v = ds.createVariable(
+                name, "f4", ("time", "lat_dim", "lon_dim"), fill_value=-9999.0
+            )
+            v.missing_value = np.float32(-9999.0)
+            v[:] = np.ma.masked_array(
+                rng.gamma(2, 3, mask.shape).astype(np.float32), mask
+            )
+
+    # HRUs covering 4 to 20 adjacent cells
+    data = []
+    for hru in range(1, n_hrus + 1):
+        ilat, ilon = rng.integers(0, nlat - 4), rng.integers(0, nlon - 5)
+        cells = [
+            (ilat + i) * nlon + ilon + j
+            for i in range(4)
+            for j in range(5)
+            if rng.uniform() < 0.6
+        ] or [ilat * nlon + ilon]
+        w = rng.uniform(size=len(cells))
+        data += [(hru, c, x) for c, x in zip(cells, w / w.sum())]
+    gw = GridWeightsCommand(
+        number_hrus=n_hrus, number_grid_cells=nlat * nlon, data=tuple(data)
+    )
+    weights = path / "weights.rvt"
+    weights.write_text(gw.to_rv())
+    return fn, weights
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--years", type=float, default=3, help="Years of hourly data.")
+    parser.add_argument("--grid", type=int, nargs=2, default=(40, 60), help="nlat nlon")
+    parser.add_argument("--hrus", type=int, default=500, help="Number of HRUs.")
+    parser.add_argument(
+        "--time-window", type=int, help="Number of time steps aggregated at once."
+    )
+    parser.add_argument(
+        "--no-zlib", action="store_true", help="Do not compress the output."
+    )
+    args = parser.parse_args()
+
+    options = []
+    if args.time_window:
+        options += ["--time-window", str(args.time_window)]
+    if args.no_zlib:
+        options += ["--no-zlib"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        fn, weights = create_inputs(
+            tmp, int(args.years * 8760), *args.grid, n_hrus=args.hrus
+        )
+
+        def aggregate():
+            aggregate_forcings_to_hrus.main(
+                [
+                    str(fn),
+                    str(weights),
+                    "-v",
+                    "pr",
+                    "-v",
+                    "tas",
+                    "--output-nc-file",
+                    str(tmp / "aggregated.nc"),
+                    "--output-weight-file",
+                    str(tmp / "aggregated.rvt"),
+                ]
+                + options,
+                standalone_mode=False,
+            )
+
+        t0 = time.perf_counter()
+        aggregate()
+        t = time.perf_counter() - t0
+        tracemalloc.start()
+        aggregate()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{t:.2f} s  peak {peak / 2**20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Configuration overhead of model runs
+====================================
+
+Time the Python work done to configure a model before each run, without executing Raven: constructing the model
+(the Raven version being probed once per binary), updating the
+configuration with the run parameters (including the forcing commands read from the NetCDF file), computing the
+derived parameters, which set the initial states of every HRU, and rendering the RVH. Also compares
+`dataclasses.replace` on a command with its trusted counterpart, `RavenCommand.copy`.
+
+Run it on two checkouts to compare the overhead before and after a change:
+
+    $ python benchmark/config_overhead.py --hrus 1000
+"""
+import argparse
+import dataclasses
+import datetime as dt
+import tempfile
+import timeit
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from ravenpy.config.commands import HRUState
+from ravenpy.models import GR4JCN, Raven
+
+PARAMS = (0.529, -3.396, 407.29, 1.072, 16.9, 0.947)
+
+
+def forcing(path: Path) -> Path:
+    """Write a small synthetic forcing file."""
+    time = pd.date_range("2000-01-01", periods=365)
+    v = np.random.default_rng(0).random(len(time))
+    ds = xr.Dataset(
+        {
+            "tasmin": ("time", v - 5, {"units": "degC"}),
+            "tasmax": ("time", v + 5, {"units": "degC"}),
+            "pr": ("time", v, {"units": "mm/d"}),
+            "qobs": ("time", v, {"units": "m3/s"}),
+        },
+        coords={"time": time},
+    )
+    fn = path / "forcing.nc"
+    ds.to_netcdf(fn)
+    return fn
+
+
+def model(n_hrus: int) -> GR4JCN:
+    m = GR4JCN()
+    m.config.rvh.hrus = tuple(
+        GR4JCN.LandHRU(hru_id=i + 1, area=10, elevation=100, latitude=45, longitude=-70)
+        for i in range(n_hrus)
+    )
+    return m
+
+
+def best(func, repeat: int) -> float:
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--hrus", type=int, default=1000, help="Number of HRUs.")
+    parser.add_argument("--repeat", type=int, default=10, help="Number of repetitions.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        nc = forcing(Path(tmp))
+
+        # Constructing a model, once the version of the Raven binary is known
+        assert Raven().raven_version
+
+        def construct():
+            Raven(workdir=tmp).raven_version
+
+        t = best(construct, args.repeat)
+        print(f"Model construction:                  {t * 1e3:8.2f} ms")
+
+        # Updating the configuration with the run parameters
+        lumped = model(1)
+
+        def prepare():
+            lumped._prepare_runs(
+                nc,
+                params=PARAMS,
+                area=4250.6,
+                elevation=843.0,
+                latitude=54.48,
+                longitude=-123.36,
+                start_date=dt.datetime(2000, 1, 1),
+                end_date=dt.datetime(2000, 12, 31),
+            )
+
+        t = best(prepare, args.repeat)
+        print(f"Run parameters and forcing commands: {t * 1e3:8.2f} ms")
+
+        # Default initial states of every HRU
+        distributed = model(args.hrus)
+        distributed.config.rvp.params = GR4JCN.Params(*PARAMS)
+
+        def derived():
+            distributed.config.rvc.reset()
+            distributed.derived_parameters()
+
+        t = best(derived, args.repeat)
+        print(f"Derived parameters ({args.hrus} HRUs):   {t * 1e3:8.2f} ms")
+
+    # Rendering the RVH of many HRUs, whose tables are memoized until they are modified
+    rvh = model(args.hrus).config.rvh
+    t = best(lambda: rvh.to_rv(), args.repeat)
+    print(f"RVH rendering ({args.hrus} HRUs):      {t * 1e3:8.2f} ms")
+
+    # Replacing the attribute of a command
+    state = HRUState(index=1, soil0=10)
+    n = 1000
+    t = timeit.timeit(lambda: dataclasses.replace(state, soil0=1.0), number=n) / n
+    print(f"dataclasses.replace(HRUState):      {t * 1e6:8.2f} us")
+    if hasattr(state, "construct"):
+        t = timeit.timeit(lambda: state.copy({"soil0": 1.0}), number=n) / n
+        print(f"HRUState.copy:                      {t * 1e6:8.2f} us")
+
+
+if __name__ == "__main__":
+    main()
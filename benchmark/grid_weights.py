@@ -0,0 +1,76 @@
+"""
+Grid weights extraction
+=======================
+
+Time the extraction of the grid weights of the HRUs of the Lievre routing product sample
+(`raven-routing-sample/finalcat_hru_info.zip`) from the grids of the test data: the VIC grid of the Lievre tutorial and
+a larger crop of the ERA5 grid, then the extraction of the same weights from a `GridWeightsCache`. The test data is found
+with `get_local_testdata` (see `RAVENPY_TESTDATA_PATH`).
+
+Run it on two checkouts to compare the extraction before and after a change, or with more than one process:
+
+    $ python benchmark/grid_weights.py
+    $ python benchmark/grid_weights.py --jobs 4
+"""
+import argparse
+import tempfile
+import timeit
+
+from ravenpy.extractors import RoutingProductGridWeightExtractor
+from ravenpy.utilities.grid_weights import GridWeightsCache
+from ravenpy.utilities.testdata import get_local_testdata
+
+ROUTING = "raven-routing-sample/finalcat_hru_info.zip"
+
+GRIDS = {
+    "VIC": ("raven-routing-sample/VIC_streaminputs.nc", {}),
+    "ERA5": (
+        "raven-routing-sample/era5-test-dataset-crop.nc",
+        {"var_names": ("longitude", "latitude")},
+    ),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument(
+        "--grid",
+        choices=list(GRIDS),
+        action="append",
+        help="Grids to extract the weights from (all by default).",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of processes computing the weights (0 for the number of CPUs).",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Number of repetitions.")
+    args = parser.parse_args()
+
+    routing = get_local_testdata(ROUTING)
+    for name in args.grid or GRIDS:
+        path, kwargs = GRIDS[name]
+        grid = get_local_testdata(path)
+
+        def extract(cache=None):
+            return RoutingProductGridWeightExtractor(
+                grid, routing, cache=cache, **kwargs
+            ).extract(jobs=args.jobs or None)
+
+        gw = extract()
+        t = min(timeit.repeat(extract, number=1, repeat=args.repeat))
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = GridWeightsCache(tmp)
+            extract(cache)
+            t_cached = min(
+                timeit.repeat(lambda: extract(cache), number=1, repeat=args.repeat)
+            )
+        print(
+            f"{name:<5} {gw.number_grid_cells:6d} cells  {len(gw.data):5d} weights  {t:8.3f} s  "
+            f"(cached {t_cached:.3f} s)"
+        )
+
+
+if __name__ == "__main__":
+    main()
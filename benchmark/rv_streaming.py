@@ -0,0 +1,104 @@
+"""
+Streaming of large RV files
+===========================
+
+Compare the time and peak memory of writing the RV files of a large synthetic routed configuration (one subbasin per
+HRU, as in continental Routing Product extractions), either rendered to a string with `to_rv` or streamed to the file
+with `write_to`. The peak memory is the peak of the Python allocations measured with `tracemalloc`, which also slows
+down the rendering, so the times are measured separately. The tables of the RVH are only streamed when they have more
+than `MAX_MEMOIZED_RECORDS` records, otherwise their memoized text is written.
+
+    $ python benchmark/rv_streaming.py --hrus 200000
+"""
+import argparse
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from ravenpy.config.commands import GridWeightsCommand, Sub
+from ravenpy.config.rvs import RVH
+from ravenpy.models.emulators import GR4JCN
+
+
+def config(n_hrus: int, n_cells: int):
+    rvh = RVH(None)
+    rvh.subbasins = tuple(
+        Sub.construct(
+            subbasin_id=i + 1, name=f"sub_{i + 1}", downstream_id=i, reach_length=1.5
+        )
+        for i in range(n_hrus)
+    )
+    rvh.hrus = tuple(
+        GR4JCN.LandHRU.construct(
+            hru_id=i + 1,
+            area=10.0,
+            elevation=100.0,
+            latitude=45.0,
+            longitude=-70.0,
+            subbasin_id=i + 1,
+        )
+        for i in range(n_hrus)
+    )
+    gw = GridWeightsCommand.construct(
+        number_hrus=n_hrus,
+        number_grid_cells=n_hrus * n_cells,
+        data=tuple(
+            (i + 1, i * n_cells + j, 1.0 / n_cells)
+            for i in range(n_hrus)
+            for j in range(n_cells)
+        ),
+    )
+    return rvh, gw
+
+
+def write_string(rv, fn: Path):
+    # Measure the rendering of the tables, not their memoized text
+    getattr(rv, "_fragments", {}).clear()
+    with open(fn, "w") as f:
+        f.write(rv.to_rv())
+
+
+def write_stream(rv, fn: Path):
+    with open(fn, "w") as f:
+        rv.write_to(f)
+
+
+def measure(func, rv, fn: Path):
+    # Overwriting a large file can be slower than writing a new one
+    if fn.exists():
+        fn.unlink()
+    t0 = time.perf_counter()
+    func(rv, fn)
+    t = time.perf_counter() - t0
+    fn.unlink()
+    tracemalloc.start()
+    func(rv, fn)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return t, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--hrus", type=int, default=200000, help="Number of HRUs.")
+    parser.add_argument(
+        "--cells", type=int, default=4, help="Number of grid cells per HRU."
+    )
+    args = parser.parse_args()
+
+    rvh, gw = config(args.hrus, args.cells)
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, rv in [("RVH", rvh), ("GridWeights", gw)]:
+            fn = Path(tmp) / name
+            for label, func in [("to_rv", write_string), ("write_to", write_stream)]:
+                t, peak = measure(func, rv, fn)
+                size = fn.stat().st_size / 2**20
+                print(
+                    f"{name:<12} {label:<9} {t:8.2f} s  peak {peak / 2**20:8.1f} MiB  "
+                    f"(file {size:.1f} MiB)"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -2,10 +2,120 @@ from pathlib import Path
 from typing import List, Tuple
 
 import click
+import numpy as np
+from scipy import sparse
 
-from ravenpy.config.commands import GridWeightsCommand
+from ravenpy.config.commands import GridWeightsCommand, GridWeightsData
 from ravenpy.extractors.routing_product import RoutingProductGridWeightExtractor
 
+# Default number of time steps read and aggregated at once, and maximum number of (HRU, cell) elements of the
+# intermediate arrays used to rescale the weights of HRUs with NODATA cells
+TIME_CHUNK_SIZE = 1000
+RESCALE_BLOCK_SIZE = 2**20
+
+
+def _sum_cells(a):
+    """Sum a (..., cell) array over its cells.
+
+    The values are summed in the same order as `np.sum(a, axis=0)` over a (cell, time) array created by transposing a
+    (time, cell) array, as in the original loop over the HRUs, so that the results are the same to the last bit.
+    """
+    cells = np.ascontiguousarray(a).reshape(-1, a.shape[-1])
+    return cells.T.sum(axis=0).reshape(a.shape[:-1])
+
+
+def _rescale(weights, sizes, masked):
+    """Zero out the weights of the masked cells, and rescale the weights of each HRU to sum up to 1.
+
+    Returns the rescaled weights, and whether all the weights of each HRU are 0 (all its cells are NODATA).
+    """
+    rescaled = weights.copy()
+    rescaled.data = np.where(masked[weights.indices], 0.0, weights.data)
+    empty = np.empty(len(sizes), dtype=bool)
+
+    # for all the HRUs with the same number of cells at once
+    for size in np.unique(sizes):
+        (hrus,) = np.nonzero(sizes == size)
+        entries = weights.indptr[hrus, np.newaxis] + np.arange(size)
+        weights_nodata = rescaled.data[entries]
+        # "nan_to_num" automatically converts NaN's to 0
+        weights_nodata = np.nan_to_num(
+            weights_nodata / _sum_cells(weights_nodata)[:, np.newaxis]
+        )
+        rescaled.data[entries] = weights_nodata
+        empty[hrus] = _sum_cells(weights_nodata) == 0.0
+
+    return rescaled, empty
+
+
+def _aggregate(data, mask, weights, input_var):
+    """Aggregate a (time, cell) block of a variable to the HRUs.
+
+    The values of the HRUs are the product of the sparse (HRU, cell) matrix of their weights with the values of the
+    cells, where the weights of the cells that are NODATA at all the time steps of the block are zeroed and the
+    other weights rescaled. The (time step, HRU) pairs with other NODATA cells are found with a second sparse product
+    of the weights with the mask, and their weights rescaled for all the pairs with the same number of cells at once.
+    HRUs whose cells are all NODATA are set to the missing value of the variable. The sums are computed in the same
+    order as in the original loop over the HRUs and their cells, so that the values are identical.
+
+    Parameters
+    ----------
+    data : np.ndarray
+      Values of the cells (time, cell).
+    mask : np.ndarray
+      Whether the cells are NODATA (time, cell).
+    weights : scipy.sparse.csr_matrix
+      Weights of the cells of each HRU (HRU, cell), in the order of the grid weights (see `GridWeightsData.to_matrix`).
+    input_var : netCDF4.Variable
+      Aggregated variable, holding the `missing_value`.
+
+    Returns
+    -------
+    np.ndarray
+      Values of the HRUs (time, HRU).
+    """
+    sizes = np.diff(weights.indptr)
+    always = mask.all(axis=0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rescaled, empty = _rescale(weights, sizes, always)
+        agg = (rescaled @ data.T).T
+        nodata = np.repeat(empty[np.newaxis], len(agg), axis=0)
+
+        # (time step, HRU) pairs with other NODATA cells
+        hi, ti = (weights.astype(bool) @ sparse.csr_matrix(mask & ~always).T).nonzero()
+        for size in np.unique(sizes[hi]):
+            (pairs,) = np.nonzero(sizes[hi] == size)
+            batch = max(1, RESCALE_BLOCK_SIZE // size)
+            for i in range(0, len(pairs), batch):
+                t = ti[pairs[i : i + batch], np.newaxis]
+                h = hi[pairs[i : i + batch]]
+                entries = weights.indptr[h, np.newaxis] + np.arange(size)
+                cells = weights.indices[entries]
+
+                # zero out weights where grid cell is NODATA, and rescale
+                weights_nodata = np.where(mask[t, cells], 0.0, weights.data[entries])
+                weights_nodata = np.nan_to_num(
+                    weights_nodata / _sum_cells(weights_nodata)[:, np.newaxis]
+                )
+
+                # derive aggregate, adding up the cells in order
+                values = data[t, cells] * weights_nodata
+                agg_pairs = np.zeros(len(h))
+                for j in range(size):
+                    agg_pairs += values[:, j]
+
+                agg[t[:, 0], h] = agg_pairs
+                nodata[t[:, 0], h] = _sum_cells(weights_nodata) == 0.0
+
+    # if all grid cells have weight 0.0 (i.e., all invalid) set value to NODATA
+    if nodata.any():
+        # only if such cells are found
+        # otherwise "input_var.missing_value" might not even exist
+        agg[nodata] = input_var.missing_value
+
+    return agg
+
 
 @click.command()
 @click.argument("input-nc-file", type=click.Path(exists=True))
@@ -31,6 +141,34 @@ from ravenpy.extractors.routing_product import RoutingProductGridWeightExtractor
 )
 @click.option("--output-nc-file", type=click.Path(), help="")
 @click.option("--output-weight-file", type=click.Path(), help="")
+@click.option(
+    "-w",
+    "--time-window",
+    type=click.IntRange(min=1),
+    default=TIME_CHUNK_SIZE,
+    show_default=True,
+    help="Number of time steps read, aggregated and written at once. The memory used is proportional to the number "
+    "of time steps times the number of grid cells in the bounding box of the HRUs.",
+)
+@click.option(
+    "--chunk-size",
+    type=click.IntRange(min=1),
+    help="Number of time steps in each chunk of the variables of the output NetCDF file (all the HRUs are in the "
+    "same chunk). Defaults to --time-window, so that each window is compressed and written once.",
+)
+@click.option(
+    "--zlib/--no-zlib",
+    default=True,
+    show_default=True,
+    help="Compress the variables of the output NetCDF file.",
+)
+@click.option(
+    "--complevel",
+    type=click.IntRange(1, 9),
+    default=4,
+    show_default=True,
+    help="Compression level of the output NetCDF file.",
+)
 def aggregate_forcings_to_hrus(
     input_nc_file,
     input_weight_file,
@@ -38,6 +176,10 @@ def aggregate_forcings_to_hrus(
     output_weight_file,
     dim_names,
     variables_to_aggregate,
+    time_window,
+    chunk_size,
+    zlib,
+    complevel,
 ):
     """
     Aggregates NetCDF files containing 3-dimensional forcing variables like precipitation and temperature
@@ -63,16 +205,18 @@ def aggregate_forcings_to_hrus(
 
     (2) A text file (with the same format as INPUT_WEIGHT_FILE) with the updated grid weights, that a ``:StationForcing``
     command will require.
+
+    The variables are read, aggregated and written in windows of --time-window time steps, so that the memory used
+    does not depend on the length of the time series. The chunking and compression of the output NetCDF file are
+    controlled with --chunk-size, --zlib/--no-zlib and --complevel.
     """
     # NOTE: This is in order to make sphinx-click happy. Magic. Do not touch.
     import netCDF4 as nc4
-    import numpy as np
 
     gws = GridWeightsCommand.parse(Path(input_weight_file).read_text())
 
     nHRU = gws.number_hrus
     # nCells = gws.number_grid_cells
-    weights_data = gws.data
 
     # read NetCDF
     nc_in = nc4.Dataset(input_nc_file, "r")
@@ -86,15 +230,29 @@ def aggregate_forcings_to_hrus(
     # cell_id = ilat * nlon + ilon
     # ---> ilon = cell_id %  nlon
     # ---> ilat = cell_id // nlon
-    weights_data_lon_lat_ids = []
-    for iweights_data in weights_data:
-        cell_id = iweights_data[1]
-        ilon = cell_id % nlon
-        ilat = cell_id // nlon
-        weights_data_lon_lat_ids.append(
-            tuple([iweights_data[0], ilon, ilat, iweights_data[2]])
+    weights_data = gws.arrays()
+    ilon = weights_data.cell_ids % nlon
+    ilat = weights_data.cell_ids // nlon
+
+    # bounding box of the cells of the HRUs (reading it is faster than reading every single cell individually)
+    min_lon, max_lon = int(ilon.min()), int(ilon.max())
+    min_lat, max_lat = int(ilat.min()), int(ilat.max())
+    nlon_bb = max_lon - min_lon + 1
+    nlat_bb = max_lat - min_lat + 1
+
+    # (HRU, cell) matrix of the weights, whose columns are the cells of the bounding box, and whose rows are the
+    # sorted HRU IDs
+    hrus, weights = GridWeightsData(
+        weights_data.hru_ids,
+        (ilat - min_lat) * nlon_bb + (ilon - min_lon),
+        weights_data.weights,
+    ).to_matrix(nlat_bb * nlon_bb, canonical=False)
+
+    if len(hrus) != nHRU:
+        # should really never happen
+        raise ValueError(
+            "Number of weights found in grid weights list is not matching the number indicated there by nHRUs"
         )
-    weights_data_lon_lat_ids = np.asarray(weights_data_lon_lat_ids)  # type: ignore
 
     # create new NetCDF that will contain aggregated data of listed variables
 
@@ -114,14 +272,24 @@ def aggregate_forcings_to_hrus(
     nc_out.setncatts(nc_in.__dict__)
 
     # create all variables in output NC (incl. time) and copy over all attributes
+    chunk_size = min(chunk_size or time_window, ntime)
     for name, variable in nc_in.variables.items():
         if name in variables_to_aggregate + ("time",):
 
             if name != "time":
                 dims = ["time", "nHRU"]
+                chunksizes = [chunk_size, nHRU]
             else:
                 dims = ["time"]
-            _ = nc_out.createVariable(name, variable.datatype, dims, zlib=True)
+                chunksizes = [chunk_size]
+            _ = nc_out.createVariable(
+                name,
+                variable.datatype,
+                dims,
+                zlib=zlib,
+                complevel=complevel,
+                chunksizes=chunksizes,
+            )
 
             # copy variable attributes all at once via dictionary
             nc_out[name].setncatts(nc_in[name].__dict__)
@@ -146,116 +314,42 @@ def aggregate_forcings_to_hrus(
         # what is the order of dimensions?
         idx_lon_dim = input_var.dimensions.index(dim_names[0])
         idx_lat_dim = input_var.dimensions.index(dim_names[1])
-        # idx_time_dim = input_var.dimensions.index("time")
-
-        # read in data for bounding box (is faster than reading then every single cell individually)
-        # --> this takes most time for large NetCDFs
-        min_lon = int(np.min(weights_data_lon_lat_ids[:, 1]))  # type: ignore
-        max_lon = int(np.max(weights_data_lon_lat_ids[:, 1]))  # type: ignore
-        min_lat = int(np.min(weights_data_lon_lat_ids[:, 2]))  # type: ignore
-        max_lat = int(np.max(weights_data_lon_lat_ids[:, 2]))  # type: ignore
+        idx_time_dim = input_var.dimensions.index("time")
 
         idx_input = [slice(0, ntime, 1), slice(0, ntime, 1), slice(0, ntime, 1)]
         idx_input[idx_lon_dim] = slice(min_lon, max_lon + 1, 1)
         idx_input[idx_lat_dim] = slice(min_lat, max_lat + 1, 1)
-
-        # print(weights_data_lon_lat_ids[:, 1])
-        # print(min_lon, max_lon)
-        # print(min_lat, max_lat)
-        # print(idx_input)
-
-        input_var_bb = input_var[idx_input]
-
-        # list of HRU IDs
-        hrus = np.unique(weights_data_lon_lat_ids[:, 0])  # type: ignore
-
-        if len(hrus) != nHRU:
-            # should really never happen
-            raise ValueError(
-                "Number of weights found in grid weights list is not matching the number indicated there by nHRUs"
-            )
-
-        # do actual aggregation
-        agg_var = np.zeros([ntime, nHRU])
-        new_weights = []
-        for ihru, hru in enumerate(hrus):
-
-            hru = int(hru)
-
-            # filter all weights for current HRU
-            idx = np.where(weights_data_lon_lat_ids[:, 0] == hru)[0]  # type: ignore
-
-            # create an array that contains weights for each time step
-            # --> weights need to be rescaled if NODATA values appear
-            # --> transpose such that we can broadcast during rescaling later
-            # --> shape = (ncells,ntime) with ncells = len(idx)
-            weights_nodata = np.transpose(
-                np.tile(weights_data_lon_lat_ids[idx, 3], (ntime, 1))  # type: ignore
-            )
-
-            # go through all time steps and zero out weights where grid cell is NODATA
-            for iii, ii in enumerate(idx):
-
-                # bring idx for input_var in appropriate order
-                idx_input = [slice(0, ntime, 1), slice(0, ntime, 1), slice(0, ntime, 1)]
-                idx_input[idx_lon_dim] = int(weights_data_lon_lat_ids[ii, 1]) - min_lon  # type: ignore
-                idx_input[idx_lat_dim] = int(weights_data_lon_lat_ids[ii, 2]) - min_lat  # type: ignore
-
-                weights_nodata[iii] = np.where(
-                    input_var_bb[idx_input].mask, 0.0, weights_nodata[iii]
-                )
-
-            # rescale
-            # --> columns where all grid cells are nan might cause a warning:
-            #     "RuntimeWarning: invalid value encountered in true_divide"
-            old_settings = np.seterr()
-            np.seterr(invalid="ignore")
-            # "nan_to_num" automatically converts NaN's to 0
-            weights_nodata = np.nan_to_num(
-                weights_nodata / np.sum(weights_nodata, axis=0)
+        axes = (idx_time_dim, idx_lat_dim, idx_lon_dim)
+
+        for t in range(0, ntime, time_window):
+            window = slice(t, min(t + time_window, ntime), 1)
+
+            # read in data for bounding box
+            # --> this takes most time for large NetCDFs
+            idx_input[idx_time_dim] = window
+            input_var_bb = input_var[tuple(idx_input)]
+
+            # (time, cell) arrays of the values and NODATA mask of the cells of the bounding box
+            data = np.transpose(np.ma.getdata(input_var_bb), axes)
+            mask = np.transpose(np.ma.getmaskarray(input_var_bb), axes)
+
+            # do actual aggregation, and write the window of the 2D variable
+            output_var[window] = _aggregate(
+                data.reshape(-1, nlat_bb * nlon_bb),
+                mask.reshape(-1, nlat_bb * nlon_bb),
+                weights,
+                input_var,
             )
-            np.seterr(**old_settings)  # reset to default
-
-            # derive aggregate
-            for iii, ii in enumerate(idx):
-
-                # bring idx for input_var in appropriate order
-                idx_input = [slice(0, ntime, 1), slice(0, ntime, 1), slice(0, ntime, 1)]
-                idx_input[idx_lon_dim] = int(weights_data_lon_lat_ids[ii, 1]) - min_lon  # type: ignore
-                idx_input[idx_lat_dim] = int(weights_data_lon_lat_ids[ii, 2]) - min_lat  # type: ignore
-
-                # this does not work when NODATA values occur
-                # agg_var[:, ihru] += (
-                #     input_var_bb[idx_input] * weights_data_lon_lat_ids[ii, 3]
-                # )
-
-                # this makes sure to handle NODATA cells properly
-                agg_var[:, ihru] += input_var_bb[idx_input].data * weights_nodata[iii]
-
-            # if all grid cells have weight 0.0 (i.e., all invalid) set value to NODATA
-            idx_t_all_cells_nodata = np.where(
-                np.sum(weights_nodata[:, :], axis=0) == 0.0
-            )
-            if len(idx_t_all_cells_nodata[0]) > 0:
-                # only if such cells are found
-                # otherwise "input_var.missing_value" might not even exist
-                agg_var[idx_t_all_cells_nodata, ihru] = input_var.missing_value
-
-            # create new weights: now each HRU is exactly one "grid-cell"
-            new_weights.append((hru, ihru, 1.0))
-
-        # write 2D variable
-        output_var[:] = agg_var
 
     nc_out.close()
+    nc_in.close()
 
     # the return should actually look exactly like the return of "RoutingProductGridWeightImporter"
     # not sure how to do that
 
-    gws_new = GridWeightsCommand(
-        number_hrus=nHRU,
-        number_grid_cells=nHRU,
-        data=tuple(new_weights),
+    # create new weights: now each HRU is exactly one "grid-cell"
+    gws_new = GridWeightsCommand.from_arrays(
+        hrus, np.arange(nHRU), np.ones(nHRU), number_grid_cells=nHRU
     )
 
     if not output_weight_file:
@@ -68,6 +68,30 @@ from ravenpy.extractors.routing_product import RoutingProductGridWeightExtractor
     show_default=True,
     help="Threshold (as fraction) of allowed mismatch in areas between subbasins from routing information (ROUTING_FILE) and overlay with grid-cells or subbasins (INPUT_FILE). If error is smaller than this threshold the weights will be adjusted such that they sum up to exactly 1. Raven will exit gracefully in case weights do not sum up to at least 0.95.",
 )
+@click.option(
+    "-j",
+    "--jobs",
+    type=int,
+    default=1,
+    show_default=True,
+    help="Number of processes computing the weights of chunks of HRUs in parallel (0 for the number of CPUs). The weights do not depend on the number of processes.",
+)
+@click.option(
+    "--cache/--no-cache",
+    default=True,
+    show_default=True,
+    help="Load the weights from the cache of grid weights if they have already been generated from the same inputs, and store them in it otherwise.",
+)
+@click.option(
+    "--refresh-cache",
+    is_flag=True,
+    help="Generate the weights even if they are found in the cache, and replace them.",
+)
+@click.option(
+    "--cache-dir",
+    type=click.Path(file_okay=False),
+    help="Directory of the cache of grid weights (defaults to ~/.raven_cache/grid_weights).",
+)
 @click.option(
     "-o",
     "--output",
@@ -84,6 +108,10 @@ def generate_grid_weights(
     gauge_ids,
     sub_ids,
     area_error_threshold,
+    jobs,
+    cache,
+    refresh_cache,
+    cache_dir,
     output,
 ):
     """
@@ -108,6 +136,7 @@ def generate_grid_weights(
     """
     # NOTE: This is in order to make sphinx-click happy. Magic. Do not touch.
     from ravenpy.extractors import RoutingProductGridWeightExtractor
+    from ravenpy.utilities.grid_weights import GridWeightsCache
 
     extractor = RoutingProductGridWeightExtractor(
         input_file,
@@ -119,8 +148,11 @@ def generate_grid_weights(
         gauge_ids,
         sub_ids,
         area_error_threshold,
+        cache=(GridWeightsCache(cache_dir) if cache_dir else GridWeightsCache())
+        if cache
+        else None,
     )
-    gw_cmd = extractor.extract()
+    gw_cmd = extractor.extract(jobs=jobs or None, refresh_cache=refresh_cache)
 
     if not output:
         input_file_path = Path(input_file)
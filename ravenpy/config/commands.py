@@ -1,18 +1,28 @@
+import collections.abc
+import copy
 import datetime as dt
+import io
 import itertools
+import numbers
 import re
 from abc import ABC, abstractmethod
-from dataclasses import asdict, field
+from dataclasses import MISSING, asdict, field, fields
 from enum import Enum
+from functools import lru_cache, partial
 from pathlib import Path
 from textwrap import dedent
-from typing import Any, Dict, Optional, Tuple, Union, no_type_check
+from typing import IO, Any, Dict, Iterable, List, Optional, Tuple, Union, no_type_check
 
+import numpy as np
+from pydantic import ValidationError
 from pydantic.dataclasses import dataclass
 
 INDENT = " " * 4
 VALUE_PADDING = 10
 
+# Number of records written at once by the commands streaming their table to a file (see `RavenCommand.write_to`)
+WRITE_CHUNK_SIZE = 10000
+
 
 class RavenCommand(ABC):
     """
@@ -27,6 +37,202 @@ class RavenCommand(ABC):
     def __str__(self):
         return self.to_rv()
 
+    def write_to(self, f: IO[str]):
+        """Write the rendered command to a text file object.
+
+        Commands with large tables of records (e.g. `HRUsCommand`) write their records in chunks instead of rendering
+        the whole command to a single string.
+        """
+        f.write(self.to_rv())
+
+    @classmethod
+    def construct(cls, *args, **kwargs):
+        """Create a command from trusted values, without validating them.
+
+        The regular constructor validates, and converts, the values of all the fields, which is costly for commands
+        created in loops (e.g. one `HRUState` per HRU and simulation). This is meant for values produced by the library
+        itself, which already have the type of their field: unlike the constructor, values are not validated, and only
+        numbers are converted to the type of their `int` or `float` field (e.g. `1` to `1.0`). Fields that are not
+        given take their default value, mutable defaults being copied.
+        """
+        names = _field_names(cls)
+        if len(args) > len(names):
+            raise TypeError(f"{cls.__name__} takes at most {len(names)} arguments")
+        values = dict(zip(names, args))
+        for name in kwargs:
+            if name not in names:
+                raise TypeError(f"{cls.__name__} has no field {name!r}")
+            if name in values:
+                raise TypeError(f"{cls.__name__} got multiple values for {name!r}")
+        values.update(kwargs)
+
+        d = {}
+        for name, default, factory in _field_defaults(cls):
+            if name in values:
+                d[name] = values[name]
+            elif factory is not None:
+                d[name] = factory()
+            elif default is MISSING:
+                raise TypeError(f"{cls.__name__} is missing a value for {name!r}")
+            else:
+                d[name] = default
+        number_fields = _number_fields(cls)
+        for name in values:
+            if name in number_fields:
+                d[name] = _coerce_number(d[name], number_fields[name])
+        return _from_values(cls, d)
+
+    def copy(self, update: Optional[Dict[str, Any]] = None, validate: bool = False):
+        """Return a shallow copy of the command, with the fields in `update` replaced.
+
+        This is a faster `dataclasses.replace`, which validates the values of all the fields again. With `validate`,
+        only the values in `update` are validated.
+        """
+        cls = self.__class__
+        update = update or {}
+        names = _field_names(cls)
+        for name in update:
+            if name not in names:
+                raise TypeError(f"{cls.__name__} has no field {name!r}")
+        if validate and update:
+            update = _validate_fields(cls, update, self.__dict__)
+        return _from_values(cls, {**self.__dict__, **update})
+
+
+@lru_cache(maxsize=None)
+def _dedent(template: str) -> str:
+    """Return the dedented template, computed once per template."""
+    return dedent(template)
+
+
+@lru_cache(maxsize=None)
+def _split_template(template: str, name: str, strip: bool = False) -> Tuple[str, str]:
+    """Split the dedented template around the field holding the records of a table."""
+    t = _dedent(template)
+    head, tail = (t.strip() if strip else t).split(f"{{{name}}}")
+    return head, tail
+
+
+def write_lines(
+    f: IO[str],
+    lines: Iterable[str],
+    sep: str = "\n",
+    chunk_size: Optional[int] = None,
+):
+    """Write `sep.join(lines)` to a text file object, `chunk_size` lines at a time (`WRITE_CHUNK_SIZE` by default)."""
+    chunk_size = chunk_size or WRITE_CHUNK_SIZE
+    it = iter(lines)
+    chunk = list(itertools.islice(it, chunk_size))
+    while chunk:
+        f.write(sep.join(chunk))
+        chunk = list(itertools.islice(it, chunk_size))
+        if chunk:
+            f.write(sep)
+
+
+def _render(cmd: "RavenCommand", **kwargs) -> str:
+    """Render a command streaming its records (see `RavenCommand.write_to`) to a string."""
+    buf = io.StringIO()
+    cmd.write_to(buf, **kwargs)  # type: ignore
+    return buf.getvalue()
+
+
+@lru_cache(maxsize=None)
+def _field_names(cls) -> Tuple[str, ...]:
+    return tuple(f.name for f in fields(cls) if f.init)
+
+
+def _is_immutable(value) -> bool:
+    if isinstance(value, (tuple, frozenset)):
+        return all(map(_is_immutable, value))
+    return value is None or isinstance(
+        value, (numbers.Number, str, bytes, Enum, dt.date, dt.time, dt.timedelta, Path)
+    )
+
+
+@lru_cache(maxsize=None)
+def _field_defaults(cls) -> List[Tuple[str, Any, Any]]:
+    """Return the name, default value and default factory of the fields of a dataclass.
+
+    The default values are taken from an instance created with the regular constructor, so that they are converted
+    to the type of their field (e.g. `0` to `0.0` for a float). Mutable default values (e.g. commands) are returned
+    as a factory of copies, so that they are not shared by the instances.
+    """
+    try:
+        validated = cls().__dict__
+    except TypeError:
+        # Some fields are required
+        validated = {}
+    out = []
+    for f in fields(cls):
+        factory = None if f.default_factory is MISSING else f.default_factory
+        default = validated.get(f.name, f.default)
+        if factory is None and default is not MISSING and not _is_immutable(default):
+            factory = partial(copy.deepcopy, default)
+        out.append((f.name, default, factory))
+    return out
+
+
+@lru_cache(maxsize=None)
+def _number_fields(cls) -> Dict[str, type]:
+    """Return the fields of a dataclass holding an `int` or a `float`, or a tuple of them, and their type.
+
+    Optional fields are included.
+    """
+    out = {}
+    for f in fields(cls):
+        tp = f.type
+        # Optional[float] is Union[float, None]
+        if getattr(tp, "__origin__", None) is Union:
+            args = [a for a in tp.__args__ if a is not type(None)]
+            tp = args[0] if len(args) == 1 else None
+        # Tuple[float, ...]
+        if getattr(tp, "__origin__", None) is tuple and tp.__args__[1:] == (...,):
+            tp = tp.__args__[0]
+        if f.init and tp in (int, float):
+            out[f.name] = tp
+    return out
+
+
+def _coerce_number(value, tp: type):
+    """Convert a number, or a tuple of numbers, to `tp`, leaving other values (e.g. Ostrich parameter names) as is."""
+    if isinstance(value, tuple):
+        return tuple(_coerce_number(v, tp) for v in value)
+    if (
+        type(value) is not tp
+        and isinstance(value, numbers.Real)
+        and not isinstance(value, bool)
+    ):
+        return tp(value)
+    return value
+
+
+def _from_values(cls, values: Dict[str, Any]):
+    """Create an instance of a pydantic dataclass from the values of its fields, without validating them.
+
+    This is the only place relying on the private internals of pydantic (v1) dataclasses: the instance is flagged as
+    initialised, so that it is not validated again when it is the value of a field of another dataclass.
+    """
+    obj = cls.__new__(cls)
+    obj.__dict__.update(values)
+    obj.__dict__["__pydantic_initialised__"] = True
+    return obj
+
+
+def _validate_fields(cls, update: Dict[str, Any], values: Dict[str, Any]):
+    """Validate some of the fields of a pydantic dataclass, and return the converted values."""
+    model = cls.__pydantic_model__
+    out = {}
+    errors = []
+    for name, value in update.items():
+        v, err = model.__fields__[name].validate(value, values, loc=name, cls=model)
+        if err:
+            errors.append(err)
+        out[name] = v
+    if errors:
+        raise ValidationError(errors, model)
+    return out
+
 
 @dataclass
 class LinearTransform(RavenCommand):
@@ -89,8 +295,13 @@ class SubBasinsCommand(RavenCommand):
     """
 
     def to_rv(self):
-        recs = [f"    {sb}" for sb in self.subbasins]
-        return dedent(self.template).format(subbasin_records="\n".join(recs))
+        return _render(self)
+
+    def write_to(self, f: IO[str]):
+        head, tail = _split_template(self.template, "subbasin_records")
+        f.write(head)
+        write_lines(f, (f"    {sb}" for sb in self.subbasins))
+        f.write(tail)
 
 
 # For convenience
@@ -138,8 +349,13 @@ class HRUsCommand(RavenCommand):
     """
 
     def to_rv(self):
-        recs = [f"    {hru}" for hru in self.hrus]
-        return dedent(self.template).format(hru_records="\n".join(recs))
+        return _render(self)
+
+    def write_to(self, f: IO[str]):
+        head, tail = _split_template(self.template, "hru_records")
+        f.write(head)
+        write_lines(f, (f"    {hru}" for hru in self.hrus))
+        f.write(tail)
 
 
 # For convenience
@@ -172,7 +388,7 @@ class ReservoirCommand(RavenCommand):
 
     def to_rv(self):
         d = asdict(self)
-        return dedent(self.template).format(**d)
+        return _dedent(self.template).format(**d)
 
 
 @dataclass
@@ -197,7 +413,7 @@ class SubBasinGroupCommand(RavenCommand):
             for i in range(0, len(sbids), n_per_line)
         ]
         d["subbasin_ids"] = "\n    ".join([" ".join(sbids) for sbids in sbids_lines])
-        return dedent(self.template).format(**d)
+        return _dedent(self.template).format(**d)
 
 
 @dataclass
@@ -210,7 +426,7 @@ class SBGroupPropertyMultiplierCommand(RavenCommand):
     template = ":SBGroupPropertyMultiplier {group_name} {parameter_name} {mult}"
 
     def to_rv(self):
-        return dedent(self.template).format(**asdict(self))
+        return _dedent(self.template).format(**asdict(self))
 
 
 @dataclass
@@ -242,7 +458,7 @@ class ChannelProfileCommand(RavenCommand):
         d["roughness_zones"] = "\n".join(
             f"{INDENT * 2}{z[0]} {z[1]}" for z in d["roughness_zones"]
         )
-        return dedent(self.template).format(**d)
+        return _dedent(self.template).format(**d)
 
 
 @dataclass
@@ -312,7 +528,7 @@ class DataCommand(BaseDataCommand):
 
     def to_rv(self):
         d = self.asdict()
-        return dedent(self.template).format(**d)
+        return _dedent(self.template).format(**d)
 
 
 @dataclass
@@ -362,7 +578,7 @@ class GaugeCommand(RavenCommand):
         else:
             d["monthly_ave_temperature"] = ""
         d["data_cmds"] = "\n\n".join(map(str, self.data_cmds))  # type: ignore
-        return dedent(self.template).format(**d)
+        return _dedent(self.template).format(**d)
 
 
 @dataclass
@@ -384,6 +600,140 @@ class ObservationDataCommand(DataCommand):
     """
 
 
+class GridWeightsData(collections.abc.Sequence):
+    """Grid weights stored in three numpy arrays, used as the `data` of a `GridWeightsCommand`.
+
+    It behaves as the tuple of `(hru_id, cell_id, weight)` records it replaces, and gives access to the arrays to
+    compute on the weights of large grids without creating one Python tuple per weight.
+
+    Parameters
+    ----------
+    hru_ids : array_like
+      HRU ID of each weight.
+    cell_ids : array_like
+      Index of the grid cell of each weight (`ilat * nlon + ilon`).
+    weights : array_like
+      Fraction of the area of the HRU covered by the grid cell.
+    """
+
+    def __init__(self, hru_ids, cell_ids, weights):
+        self.hru_ids = np.asarray(hru_ids, dtype=np.int64)
+        self.cell_ids = np.asarray(cell_ids, dtype=np.int64)
+        self.weights = np.asarray(weights, dtype=float)
+        if not (
+            self.hru_ids.ndim == 1
+            and self.hru_ids.shape == self.cell_ids.shape == self.weights.shape
+        ):
+            raise ValueError(
+                "The HRU IDs, cell IDs and weights must be 1D arrays of the same length."
+            )
+
+    @classmethod
+    def from_records(cls, records) -> "GridWeightsData":
+        """Create the arrays from a sequence of `(hru_id, cell_id, weight)` records."""
+        if isinstance(records, cls):
+            return records
+        values = np.array(records, dtype=float).reshape(-1, 3)
+        return cls(values[:, 0], values[:, 1], values[:, 2])
+
+    @classmethod
+    def __get_validators__(cls):
+        # Accepted as is by the pydantic validation of `GridWeightsCommand`
+        yield cls._validate
+
+    @classmethod
+    def _validate(cls, value):
+        if not isinstance(value, cls):
+            raise TypeError(f"Expected {cls.__name__}")
+        return value
+
+    def __len__(self):
+        return len(self.weights)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return GridWeightsData(self.hru_ids[i], self.cell_ids[i], self.weights[i])
+        return int(self.hru_ids[i]), int(self.cell_ids[i]), float(self.weights[i])
+
+    def __iter__(self):
+        # Converted to Python values by chunks, to keep the memory constant when rendering large grids
+        for i in range(0, len(self), WRITE_CHUNK_SIZE):
+            chunk = slice(i, i + WRITE_CHUNK_SIZE)
+            yield from zip(
+                self.hru_ids[chunk].tolist(),
+                self.cell_ids[chunk].tolist(),
+                self.weights[chunk].tolist(),
+            )
+
+    def __eq__(self, other):
+        if isinstance(other, GridWeightsData):
+            return (
+                np.array_equal(self.hru_ids, other.hru_ids)
+                and np.array_equal(self.cell_ids, other.cell_ids)
+                and np.array_equal(self.weights, other.weights)
+            )
+        if isinstance(other, collections.abc.Sequence):
+            return len(self) == len(other) and all(
+                a == tuple(b) for a, b in zip(self, other)
+            )
+        return NotImplemented
+
+    __hash__ = None  # type: ignore
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({len(self)} weights)"
+
+    def row_sums(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the sorted HRU IDs and the sum of the weights of each HRU, which should be 1."""
+        ids, inverse = np.unique(self.hru_ids, return_inverse=True)
+        return ids, np.bincount(inverse, weights=self.weights, minlength=len(ids))
+
+    def normalized(self) -> "GridWeightsData":
+        """Return the weights scaled so that the weights of each HRU sum to 1."""
+        _, inverse = np.unique(self.hru_ids, return_inverse=True)
+        sums = np.bincount(inverse, weights=self.weights)
+        return GridWeightsData(
+            self.hru_ids, self.cell_ids, self.weights / sums[inverse]
+        )
+
+    def to_matrix(self, number_grid_cells: Optional[int] = None, canonical=True):
+        """Return the sorted HRU IDs and the weights as a sparse (HRU, cell) matrix.
+
+        Parameters
+        ----------
+        number_grid_cells : int, optional
+          Number of columns of the matrix. Defaults to the largest cell index plus one.
+        canonical : bool
+          If True, duplicate weights are summed. If False, the weights of each HRU are stored in the order of the
+          records and duplicates are kept, so that products with the matrix add up the terms of each HRU in the same
+          order as a loop over the records.
+
+        Returns
+        -------
+        np.ndarray
+          HRU ID of each row of the matrix.
+        scipy.sparse.csr_matrix
+          Weights of the cells (columns) of each HRU (rows).
+        """
+        from scipy import sparse
+
+        ids, inverse = np.unique(self.hru_ids, return_inverse=True)
+        if number_grid_cells is None:
+            number_grid_cells = int(self.cell_ids.max()) + 1 if len(self) else 0
+        shape = (len(ids), number_grid_cells)
+
+        if canonical:
+            m = sparse.csr_matrix((self.weights, (inverse, self.cell_ids)), shape=shape)
+        else:
+            order = np.argsort(inverse, kind="stable")
+            indptr = np.zeros(len(ids) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(inverse, minlength=len(ids)), out=indptr[1:])
+            m = sparse.csr_matrix(
+                (self.weights[order], self.cell_ids[order], indptr), shape=shape
+            )
+        return ids, m
+
+
 @dataclass
 class GridWeightsCommand(RavenCommand):
     """GridWeights command.
@@ -393,11 +743,14 @@ class GridWeightsCommand(RavenCommand):
 
     The default is to have a single cell that covers an entire single HRU, with a
     weight of 1.
+
+    The weights are either a tuple of `(hru_id, cell_id, weight)` records, or arrays
+    (`GridWeightsData`) for large grids, e.g. when parsed from a file.
     """
 
     number_hrus: int = 1
     number_grid_cells: int = 1
-    data: Tuple[Tuple[int, int, float], ...] = ((1, 0, 1.0),)
+    data: Union[GridWeightsData, Tuple[Tuple[int, int, float], ...]] = ((1, 0, 1.0),)
 
     template = """
     {indent}:GridWeights
@@ -418,18 +771,81 @@ class GridWeightsCommand(RavenCommand):
         """
         m = re.match(dedent(pat).strip(), s, re.DOTALL)
         n_hrus, n_grid_cells, data = m.groups()  # type: ignore
-        data = [d.strip().split() for d in data.split("\n")]
-        data = tuple((int(h), int(c), float(w)) for h, c, w in data)
-        return cls(
-            number_hrus=int(n_hrus), number_grid_cells=int(n_grid_cells), data=data
+        msg = "The grid weights must be rows of HRU ID, cell ID and weight."
+        try:
+            values = np.array(data.split(), dtype=float)
+        except ValueError:
+            raise ValueError(msg) from None
+        if values.size == 0 or values.size % 3:
+            raise ValueError(msg)
+        values = values.reshape(-1, 3)
+        return cls.from_arrays(
+            values[:, 0],
+            values[:, 1],
+            values[:, 2],
+            number_hrus=int(n_hrus),
+            number_grid_cells=int(n_grid_cells),
+        )
+
+    @classmethod
+    def from_arrays(
+        cls,
+        hru_ids,
+        cell_ids,
+        weights,
+        number_hrus: Optional[int] = None,
+        number_grid_cells: int = 1,
+    ) -> "GridWeightsCommand":
+        """Create the command from arrays of HRU IDs, cell IDs and weights (see `GridWeightsData`).
+
+        The number of HRUs defaults to the number of distinct HRU IDs.
+        """
+        data = GridWeightsData(hru_ids, cell_ids, weights)
+        if number_hrus is None:
+            number_hrus = len(np.unique(data.hru_ids))
+        return cls.construct(
+            number_hrus=int(number_hrus),
+            number_grid_cells=int(number_grid_cells),
+            data=data,
         )
 
+    def arrays(self) -> GridWeightsData:
+        """Return the weights as arrays, e.g. to check or normalize the sum of the weights of each HRU."""
+        return GridWeightsData.from_records(self.data)
+
     def to_rv(self, indent_level=0):
+        return _render(self, indent_level=indent_level)
+
+    def write_to(self, f: IO[str], indent_level=0):
         indent = INDENT * indent_level
-        d = asdict(self)
-        d["indent"] = indent
-        d["data"] = "\n".join(f"{indent}    {p[0]} {p[1]} {p[2]}" for p in self.data)
-        return dedent(self.template).strip().format(**d)
+        d = dict(
+            indent=indent,
+            number_hrus=self.number_hrus,
+            number_grid_cells=self.number_grid_cells,
+        )
+        head, tail = _split_template(self.template, "data", strip=True)
+        f.write(head.format(**d))
+        write_lines(
+            f, itertools.starmap(f"{indent}    {{}} {{}} {{}}".format, self.data)
+        )
+        f.write(tail.format(**d))
+
+
+@dataclass
+class RedirectToFileCommand(RavenCommand):
+    """RedirectToFile command.
+
+    Used in a `GriddedForcingCommand` or a `StationForcingCommand` to read the grid
+    weights from a separate file, which can then be shared by several forcing commands.
+    """
+
+    path: Union[str, Path]
+
+    template = "{indent}:RedirectToFile {path}"
+
+    def to_rv(self, indent_level=0):
+        indent = INDENT * indent_level
+        return self.template.format(indent=indent, path=self.path)
 
 
 @dataclass
@@ -437,7 +853,9 @@ class GriddedForcingCommand(BaseDataCommand):
     """GriddedForcing command (RVT)."""
 
     dim_names_nc: Tuple[str, str, str] = ("x", "y", "t")
-    grid_weights: GridWeightsCommand = GridWeightsCommand()
+    grid_weights: Union[
+        GridWeightsCommand, RedirectToFileCommand
+    ] = GridWeightsCommand()
 
     template = """
     :GriddedForcing {name}
@@ -455,7 +873,7 @@ class GriddedForcingCommand(BaseDataCommand):
     def to_rv(self):
         d = self.asdict()
         d["grid_weights"] = self.grid_weights.to_rv(indent_level=1)
-        return dedent(self.template).format(**d)
+        return _dedent(self.template).format(**d)
 
 
 @dataclass
@@ -463,7 +881,9 @@ class StationForcingCommand(BaseDataCommand):
     """StationForcing command (RVT)."""
 
     dim_names_nc: Tuple[str, str] = ("station", "time")
-    grid_weights: GridWeightsCommand = GridWeightsCommand()
+    grid_weights: Union[
+        GridWeightsCommand, RedirectToFileCommand
+    ] = GridWeightsCommand()
 
     template = """
     :StationForcing {name} {units}
@@ -481,7 +901,7 @@ class StationForcingCommand(BaseDataCommand):
     def to_rv(self):
         d = self.asdict()
         d["grid_weights"] = self.grid_weights.to_rv(indent_level=1)
-        return dedent(self.template).format(**d)
+        return _dedent(self.template).format(**d)
 
 
 @dataclass
@@ -636,11 +1056,11 @@ class HRUStateVariableTableCommand(RavenCommand):
             idx, *values = line
             idx = int(idx)
             values = list(map(float, values))
-            hru_states[idx] = cls.Record(*([idx] + values))
+            hru_states[idx] = cls.Record.construct(idx, *values)
         return cls(hru_states)
 
     def to_rv(self):
-        return dedent(self.template).format(
+        return _dedent(self.template).format(
             hru_states="\n    ".join(map(str, self.hru_states.values()))
         )
 
@@ -679,7 +1099,7 @@ class BasinIndexCommand(RavenCommand):
         """
         m = re.search(dedent(pat).strip(), s, re.DOTALL)
         index_name = re.split(r",|\s+", m.group(1).strip())
-        rec_values = {"index": index_name[0], "name": index_name[1]}
+        rec_values = {"index": int(index_name[0]), "name": index_name[1]}
         for line in m.group(2).strip().splitlines():
             all_values = filter(None, re.split(r",|\s+", line.strip()))
             cmd, *values = all_values
@@ -690,8 +1110,8 @@ class BasinIndexCommand(RavenCommand):
                 assert len(values) == 1
                 rec_values["rivulet_storage"] = float(values[0])
             else:
-                rec_values[cmd[1:].lower()] = tuple(values)
-        return cls(**rec_values)
+                rec_values[cmd[1:].lower()] = tuple(map(float, values))
+        return cls.construct(**rec_values)
 
     def to_rv(self):
         d = asdict(self)
@@ -702,7 +1122,7 @@ class BasinIndexCommand(RavenCommand):
                 d[k] = f":{q} {v}"
             else:
                 d[k] = ""
-        return dedent(self.template).format(**d)
+        return _dedent(self.template).format(**d)
 
 
 @dataclass
@@ -733,7 +1153,7 @@ class BasinStateVariablesCommand(RavenCommand):
         return cls(basin_states)
 
     def to_rv(self):
-        return dedent(self.template).format(
+        return _dedent(self.template).format(
             basin_states_list="\n".join(map(str, self.basin_states.values()))
         )
 
@@ -756,7 +1176,7 @@ class SoilClassesCommand(RavenCommand):
     """
 
     def to_rv(self):
-        return dedent(self.template).format(
+        return _dedent(self.template).format(
             soil_class_records="\n".join(map(str, self.soil_classes))
         )
 
@@ -787,7 +1207,7 @@ class SoilProfilesCommand(RavenCommand):
     """
 
     def to_rv(self):
-        return dedent(self.template).format(
+        return _dedent(self.template).format(
             soil_profile_records="\n".join(map(str, self.soil_profiles))
         )
 
@@ -815,7 +1235,7 @@ class VegetationClassesCommand(RavenCommand):
     """
 
     def to_rv(self):
-        return dedent(self.template).format(
+        return _dedent(self.template).format(
             vegetation_class_records="\n".join(map(str, self.vegetation_classes))
         )
 
@@ -842,7 +1262,7 @@ class LandUseClassesCommand(RavenCommand):
     """
 
     def to_rv(self):
-        return dedent(self.template).format(
+        return _dedent(self.template).format(
             land_use_class_records="\n".join(map(str, self.land_use_classes))
         )
 
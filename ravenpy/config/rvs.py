@@ -1,11 +1,27 @@
 import collections
 import datetime as dt
+import io
+import string
 from abc import ABC, abstractmethod
-from dataclasses import replace
+from contextlib import contextmanager
+from copy import copy
 from enum import Enum
+from functools import lru_cache
 from pathlib import Path
 from textwrap import dedent
-from typing import Any, Dict, List, Optional, Tuple, Union, cast
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    Union,
+    cast,
+)
 
 import cf_xarray
 import cftime
@@ -29,6 +45,7 @@ from ravenpy.config.commands import (
     HRUStateVariableTableCommand,
     LandUseClassesCommand,
     ObservationDataCommand,
+    RedirectToFileCommand,
     ReservoirCommand,
     SBGroupPropertyMultiplierCommand,
     SoilClassesCommand,
@@ -38,7 +55,104 @@ from ravenpy.config.commands import (
     SubBasinGroupCommand,
     SubBasinsCommand,
     VegetationClassesCommand,
+    write_lines,
 )
+from ravenpy.config.states import ModelState
+
+_MISSING = object()
+
+# Tables with more records than this are streamed to the RV files instead of being memoized (see `RV.write_to`)
+MAX_MEMOIZED_RECORDS = 10000
+
+_FORMATTER = string.Formatter()
+
+
+def _equal(a, b) -> bool:
+    """Return whether two attribute values render the same way."""
+    if a is b:
+        return True
+    if type(a) is not type(b):
+        return False
+    try:
+        return bool(a == b)
+    except (TypeError, ValueError):
+        # E.g. arrays
+        return False
+
+
+@lru_cache(maxsize=None)
+def _dedent(tmpl: str) -> str:
+    """Return the dedented template, computed once per template (the emulators can set their own templates)."""
+    return dedent(tmpl.lstrip("\n"))
+
+
+@lru_cache(maxsize=None)
+def _parse_tmpl(
+    tmpl: str,
+) -> List[Tuple[str, Optional[str], Optional[str], Optional[str]]]:
+    """Return the literal text and replacement fields of the dedented template."""
+    return list(_FORMATTER.parse(_dedent(tmpl)))
+
+
+@lru_cache(maxsize=None)
+def _property_names(cls) -> Tuple[str, ...]:
+    """Return the names of the properties of a RV class."""
+    return tuple(x for x in dir(cls) if isinstance(getattr(cls, x, None), property))
+
+
+def _records_key(records) -> List[Tuple[Any, ...]]:
+    """Return the values of the fields of records, to detect whether they were modified since they were rendered."""
+    return [tuple(r.__dict__.values()) for r in records]
+
+
+class _Stream:
+    """Template value written to the file by a function, instead of being rendered to a string."""
+
+    def __init__(self, write: Callable[[IO[str]], None]):
+        self.write = write
+
+
+class _TrackedDict(dict):
+    """Dictionary flagging an attribute of its RV as modified when its items are changed.
+
+    The states of the RVC held as arrays are converted to records before the change, so that it applies on top of
+    them (see `RVC._expand_state`).
+    """
+
+    def __init__(self, rv, name, *args):
+        super().__init__(*args)
+        self._rv = rv
+        self._name = name
+
+    def __reduce__(self):
+        # Copy and unpickle without calling `__setitem__` on a partially restored RV
+        return self.__class__, (self._rv, self._name, dict(self))
+
+    def _set_modified(self):
+        self._rv._expand_state()
+        self._rv.set_modified(self._name)
+
+    def __setitem__(self, key, value):
+        self._rv._expand_state()
+        if not _equal(self.get(key, _MISSING), value):
+            self._set_modified()
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._set_modified()
+        super().__delitem__(key)
+
+    def update(self, *args, **kwargs):
+        self._set_modified()
+        super().update(*args, **kwargs)
+
+    def pop(self, *args):
+        self._set_modified()
+        return super().pop(*args)
+
+    def clear(self):
+        self._set_modified()
+        super().clear()
 
 
 class RV(ABC):
@@ -53,6 +167,10 @@ class RV(ABC):
     """
 
     def __init__(self, config, **kwds):
+        # Names of the attributes modified since the RV was last rendered, which tells the model whether the
+        # RV file written for the previous simulation can be reused.
+        self._modified: Set[str] = set()
+
         # Each RV has a reference to their parent object in order to access sibling RVs.
         self._config = config
 
@@ -67,6 +185,59 @@ class RV(ABC):
         # (currently used with HBVEC and MOHYSE emulators, for values in their RVH)
         self._extra_attributes = {}
 
+        # Rendered text of the tables of records, keyed by attribute name (see `_render_records`)
+        self._fragments: Dict[str, Tuple[List[Tuple[Any, ...]], str]] = {}
+
+    def __setattr__(self, name, value):
+        # Property setters store their value in another attribute, which is tracked instead
+        if not isinstance(getattr(type(self), name, None), property) and not _equal(
+            self.__dict__.get(name, _MISSING), value
+        ):
+            self.__dict__.setdefault("_modified", set()).add(name)
+        super().__setattr__(name, value)
+
+    @property
+    def modified(self) -> Set[str]:
+        """Names of the attributes modified since the RV was last rendered."""
+        return self._modified
+
+    def set_modified(self, name: str):
+        """Flag an attribute as modified, e.g. after it has been changed in place.
+
+        Only assignments to the attributes of the RV (and to the items of the states of the RVC) are tracked. Changes
+        made in place to their values (e.g. `rvh.hrus[0].area = ...`) must be flagged with this method, or the RV file
+        written for the previous simulation of a run is reused.
+        """
+        self._modified.add(name)
+
+    def reset_modified(self):
+        """Forget the modifications, once the RV has been rendered."""
+        self._modified.clear()
+
+    def _render_records(
+        self, name: str, write: Callable[[Any, IO[str]], None], stream: bool = False
+    ) -> Union[str, _Stream]:
+        """Render the records of attribute `name` with `write`.
+
+        The text is memoized until the records are modified, which is checked by comparing the values of their fields
+        with those of the rendered records, much faster than rendering large tables (e.g. thousands of HRUs) again.
+        With `stream`, tables larger than `MAX_MEMOIZED_RECORDS` are instead written directly to the file.
+        """
+        records = getattr(self, name)
+        if stream and len(records) > MAX_MEMOIZED_RECORDS:
+            self._fragments.pop(name, None)
+            return _Stream(lambda f: write(records, f))
+
+        key = _records_key(records)
+        cached = self._fragments.get(name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        buf = io.StringIO()
+        write(records, buf)
+        text = buf.getvalue()
+        self._fragments[name] = (key, text)
+        return text
+
     def update(self, key, value):
         if hasattr(self, key):
             setattr(self, key, value)
@@ -75,6 +246,8 @@ class RV(ABC):
 
     def set_extra_attributes(self, **kwargs):
         for k, v in kwargs.items():
+            if not _equal(self._extra_attributes.get(k, _MISSING), v):
+                self.set_modified("_extra_attributes")
             self._extra_attributes[k] = v
 
     def get_extra_attribute(self, k):
@@ -91,10 +264,35 @@ class RV(ABC):
 
     @abstractmethod
     def to_rv(self, s: str, rv_type: str) -> str:
+        return self._header(rv_type) + s
+
+    def write_to(self, f: IO[str]):
+        """Write the rendered RV to a text file object.
+
+        The RVs holding large tables of records (e.g. the HRUs of the RVH) write them in chunks, so that the whole
+        file is never held in memory.
+        """
+        f.write(self.to_rv())  # type: ignore
+
+    def _write_tmpl(self, f: IO[str], d: Dict[str, Any], rv_type: str):
+        """Write the template of the RV formatted with `d`, writing the `_Stream` values directly to the file."""
+        f.write(self._header(rv_type))
+        for literal, name, spec, conversion in _parse_tmpl(self.tmpl):
+            f.write(literal)
+            if name is None:
+                continue
+            value, _ = _FORMATTER.get_field(name, (), d)
+            if isinstance(value, _Stream):
+                value.write(f)
+            else:
+                value = _FORMATTER.convert_field(value, conversion)
+                f.write(_FORMATTER.format_field(value, spec or ""))
+
+    def _header(self, rv_type: str) -> str:
         if not self._config:
             # In the case where the RV file has been created outside the context of a
             # Config object, don't include the header
-            return s
+            return ""
         d = {
             "rv_type": rv_type,
             "raven_version": self._config.model.raven_version,
@@ -110,7 +308,7 @@ class RV(ABC):
         if model_and_description:
             model_and_description = ": ".join(model_and_description)
             d["model_and_description"] = f"\n#\n# {model_and_description}"
-        return dedent(self.tmpl_header.lstrip("\n")).format(**d) + s
+        return _dedent(self.tmpl_header).format(**d)
 
 
 #########
@@ -130,10 +328,45 @@ class RVC(RV):
         super().__init__(config)
         self.hru_states: Dict[int, HRUState] = {}
         self.basin_states: Dict[int, BasinIndexCommand] = {}
+        # States rendered in place of the (empty) `hru_states` and `basin_states` tables
+        self.state: Optional[ModelState] = None
+
+    def __setattr__(self, name, value):
+        # The states are usually set item by item (e.g. in `derived_parameters`)
+        if name in ["hru_states", "basin_states"]:
+            # The other states held as arrays are kept, as records
+            if self.__dict__.get("state") is not None:
+                self._expand_state()
+            value = _TrackedDict(self, name, value)
+        super().__setattr__(name, value)
 
     def reset(self, **kwargs):
+        self.state = None
+        self.hru_states = {}
+        self.basin_states = {}
+
+    def set_state(self, state: ModelState):
+        """Set the initial states of all the HRUs and subbasins from arrays.
+
+        The states are only rendered to text when the RVC is written. Changing the `hru_states` or `basin_states`
+        afterwards converts them to records first (see `ModelState.to_records`).
+        """
+        self.state = None
         self.hru_states = {}
         self.basin_states = {}
+        self.state = state
+
+    def _expand_state(self):
+        """Convert the states held as arrays to records, in the `hru_states` and `basin_states` dictionaries."""
+        state = self.__dict__.get("state")
+        if state is not None:
+            self.state = None
+            # Filled in place, since one of them may be having its items set
+            for name, records in zip(
+                ["hru_states", "basin_states"], state.to_records()
+            ):
+                dict.update(getattr(self, name), records)
+                self.set_modified(name)
 
     def set_hru_state(self, hru_state: HRUState):
         self.hru_states[hru_state.index] = hru_state
@@ -141,6 +374,16 @@ class RVC(RV):
     def set_basin_state(self, basin_state: BasinIndexCommand):
         self.basin_states[basin_state.index] = basin_state
 
+    @property
+    def has_hru_states(self) -> bool:
+        """Whether initial HRU states are set, as records or arrays."""
+        return bool(self.hru_states) or self.state is not None
+
+    @property
+    def has_basin_states(self) -> bool:
+        """Whether initial basin states are set, as records or arrays."""
+        return bool(self.basin_states) or self.state is not None
+
     @classmethod
     def create_solution(cls, solution_str):
         rvc = RVC(None)
@@ -148,18 +391,26 @@ class RVC(RV):
         return rvc
 
     def parse_solution(self, solution_str):
+        self.state = None
         self.hru_states = HRUStateVariableTableCommand.parse(solution_str).hru_states
         self.basin_states = BasinStateVariablesCommand.parse(solution_str).basin_states
 
     def to_rv(self):
-        d = {
-            "hru_states": HRUStateVariableTableCommand(self.hru_states),
-            "basin_states": BasinStateVariablesCommand(self.basin_states),
-        }
+        hru_states: Any
+        basin_states: Any
+        # The records are empty while the states are held as arrays (see `_expand_state`)
+        if self.state is not None:
+            hru_states = self.state.hru_table()
+            basin_states = self.state.basin_table()
+        else:
+            hru_states = HRUStateVariableTableCommand(self.hru_states)
+            basin_states = BasinStateVariablesCommand(self.basin_states)
+
+        d = {"hru_states": hru_states, "basin_states": basin_states}
 
         d.update(self._extra_attributes)
 
-        return super().to_rv(dedent(self.tmpl.lstrip("\n")).format(**d), "RVC")
+        return super().to_rv(_dedent(self.tmpl).format(**d), "RVC")
 
 
 #########
@@ -199,10 +450,16 @@ class RVH(RV):
         ] = None
         self.reservoirs: Tuple[ReservoirCommand, ...] = ()
 
-    def to_rv(self):
+    def _tmpl_values(self, stream: bool = False) -> Dict[str, Any]:
         d = {
-            "subbasins": SubBasinsCommand(self.subbasins),
-            "hrus": HRUsCommand(self.hrus),
+            "subbasins": self._render_records(
+                "subbasins",
+                lambda r, f: SubBasinsCommand.construct(r).write_to(f),
+                stream,
+            ),
+            "hrus": self._render_records(
+                "hrus", lambda r, f: HRUsCommand.construct(r).write_to(f), stream
+            ),
             "land_subbasin_group": SubBasinGroupCommand("Land", self.land_subbasin_ids),
             "land_subbasin_property_multiplier": self.land_subbasin_property_multiplier
             or "",
@@ -215,8 +472,13 @@ class RVH(RV):
         }
 
         d.update(self._extra_attributes)
+        return d
 
-        return super().to_rv(dedent(self.tmpl.lstrip("\n")).format(**d), "RVH")
+    def to_rv(self):
+        return super().to_rv(_dedent(self.tmpl).format(**self._tmpl_values()), "RVH")
+
+    def write_to(self, f: IO[str]):
+        self._write_tmpl(f, self._tmpl_values(stream=True), "RVH")
 
 
 #########
@@ -511,12 +773,7 @@ class RVI(RV):
         a = list(filter(lambda x: not x.startswith("_"), self.__dict__))
 
         # Properties (computing values corresponding to attributes starting with "_')
-        p = list(
-            filter(
-                lambda x: isinstance(getattr(self.__class__, x, None), property),
-                dir(self),
-            )
-        )
+        p = list(_property_names(self.__class__))
 
         d = {attr: getattr(self, attr) for attr in a + p}
 
@@ -525,11 +782,7 @@ class RVI(RV):
 
         d.update(self._extra_attributes)
 
-        t = (
-            dedent(self._pre_tmpl.lstrip("\n"))
-            + dedent(self.tmpl.lstrip("\n"))
-            + dedent(self._post_tmpl.lstrip("\n"))
-        )
+        t = _dedent(self._pre_tmpl) + _dedent(self.tmpl) + _dedent(self._post_tmpl)
 
         return super().to_rv(t.format(**d), "RVI")
 
@@ -569,22 +822,31 @@ class RVP(RV):
         else:
             return super().update(key, value)
 
-    def to_rv(self):
+    def _tmpl_values(self, stream: bool = False) -> Dict[str, Any]:
         d = {
             "params": self.params,
             "soil_classes": SoilClassesCommand(self.soil_classes),
             "soil_profiles": SoilProfilesCommand(self.soil_profiles),
             "vegetation_classes": VegetationClassesCommand(self.vegetation_classes),
             "land_use_classes": LandUseClassesCommand(self.land_use_classes),
-            "channel_profiles": "\n\n".join(map(str, self.channel_profiles)),
+            "channel_profiles": self._render_records(
+                "channel_profiles",
+                lambda r, f: write_lines(f, map(str, r), sep="\n\n"),
+                stream,
+            ),
             "avg_annual_runoff": f":AvgAnnualRunoff {self.avg_annual_runoff}"
             if self.avg_annual_runoff
             else "",
         }
 
         d.update(self._extra_attributes)
+        return d
+
+    def to_rv(self):
+        return super().to_rv(_dedent(self.tmpl).format(**self._tmpl_values()), "RVP")
 
-        return super().to_rv(dedent(self.tmpl.lstrip("\n")).format(**d), "RVP")
+    def write_to(self, f: IO[str]):
+        self._write_tmpl(f, self._tmpl_values(stream=True), "RVP")
 
 
 #########
@@ -654,7 +916,12 @@ class RVT(RV):
         self._nc_elevation: Optional[xr.DataArray] = None
         self._number_grid_cells = 0
 
-    def _add_nc_variable(self, **kwargs):
+    def _add_nc_variable(self, trusted=False, **kwargs):
+        """Add the data command of a variable of a NetCDF file.
+
+        With `trusted`, the attributes, which were read from the file by `configure_from_nc_data`, are not validated.
+        The attributes specified by the user for the variable are always validated.
+        """
         std_name = kwargs.get("name", kwargs["var_name_nc"])
         # If the name is not the standard one, search for it
         # TODO: reorganize NC_VARS so that the keys are the Raven names
@@ -666,22 +933,24 @@ class RVT(RV):
             else:
                 assert False, f"{std_name} not found in the list of standard names"
         is_obs_var = kwargs.pop("is_observation", False)
-        cmd: BaseDataCommand
+        cmd_cls: Type[BaseDataCommand]
         if len(kwargs["dim_names_nc"]) == 1:
             if std_name == "water_volume_transport_in_river_channel" or is_obs_var:
-                cmd = ObservationDataCommand(**kwargs)
+                cmd_cls = ObservationDataCommand
             else:
-                cmd = DataCommand(**kwargs)
+                cmd_cls = DataCommand
         elif len(kwargs["dim_names_nc"]) == 2:
             if std_name == "water_volume_transport_in_river_channel" or is_obs_var:
-                cmd = ObservationDataCommand(**kwargs)
+                cmd_cls = ObservationDataCommand
             else:
-                cmd = StationForcingCommand(**kwargs)
+                cmd_cls = StationForcingCommand
         else:
-            cmd = GriddedForcingCommand(**kwargs)
+            cmd_cls = GriddedForcingCommand
+        cmd = cmd_cls.construct(**kwargs) if trusted else cmd_cls(**kwargs)
 
         spec = self._var_specs[std_name]
-        self._var_cmds[std_name] = replace(cmd, **spec)
+        self._var_cmds[std_name] = cmd.copy(spec, validate=True)
+        self.set_modified("_var_cmds")
 
     def set_nc_variables(self, nc_variables):
         """
@@ -715,6 +984,7 @@ class RVT(RV):
                             continue
                         nc_var = ds[var_name]
                         self._add_nc_variable(
+                            trusted=True,
                             name=std_name,
                             file_name_nc=fn,
                             data_type=RVT.NC_VARS[std_name]["raven"],
@@ -728,9 +998,63 @@ class RVT(RV):
     def update(self, key, value):
         if key in self._var_specs:
             self._var_specs[key].update(value)
+            self.set_modified("_var_specs")
             return True
         return super().update(key, value)
 
+    @property
+    def grid_weights_file(self) -> Optional[str]:
+        """Name of the file holding the grid weights of the forcing commands, while the model writes it.
+
+        If None, the grid weights are inlined in the forcing commands (see `redirect_grid_weights`).
+        """
+        return self.__dict__.get("_grid_weights_file")
+
+    @contextmanager
+    def redirect_grid_weights(self, path: Optional[str]):
+        """Refer to the grid weights of the forcing commands with `:RedirectToFile path` in this context.
+
+        The caller writes the grid weights returned by `forcing_grid_weights` to `path`, next to the RVT. This is not
+        a modification of the configuration, and outside of this context the weights are inlined.
+        """
+        # Bypass the tracking of the modified attributes
+        self.__dict__["_grid_weights_file"] = path
+        try:
+            yield
+        finally:
+            del self.__dict__["_grid_weights_file"]
+
+    @staticmethod
+    def _uses_forcing_grid_weights(cmd) -> bool:
+        """Return whether a forcing command uses the grid weights of the RVT, rather than its own."""
+        return (
+            isinstance(cmd, (GriddedForcingCommand, StationForcingCommand))
+            and isinstance(cmd.grid_weights, GridWeightsCommand)
+            and len(cmd.grid_weights.data) == 1
+        )
+
+    def forcing_grid_weights(self) -> Optional[GridWeightsCommand]:
+        """Return the grid weights shared by the forcing commands that do not define their own.
+
+        These are the `grid_weights` attribute if set, otherwise weights applying equally to all HRUs.
+        Returns None if no forcing command uses them.
+        """
+        if any(type(cmd) is DataCommand for cmd in self._var_cmds.values()):
+            # The forcing commands are not used when there is a gauge
+            return None
+        if not any(map(self._uses_forcing_grid_weights, self._var_cmds.values())):
+            return None
+        if self.grid_weights:
+            return self.grid_weights
+
+        # Construct default grid weights applying equally to all HRUs
+        data = [(hru.hru_id, self.nc_index, 1.0) for hru in self._config.rvh.hrus]
+        return GridWeightsCommand.construct(
+            number_hrus=len(data),
+            number_grid_cells=self._number_grid_cells,
+            data=tuple(data),
+        )
+
     def to_rv(self):
         """
         IMPORTANT NOTE: as this method is called at the last moment in the model lifecycle,
@@ -790,20 +1114,18 @@ class RVT(RV):
                 data_cmds=tuple(data_cmds),
             )  # type: ignore
         else:
-            # Construct default grid weights applying equally to all HRUs
-            data = [(hru.hru_id, self.nc_index, 1.0) for hru in self._config.rvh.hrus]
-            gw = self.grid_weights or GridWeightsCommand(
-                number_hrus=len(data),
-                number_grid_cells=self._number_grid_cells,
-                data=tuple(data),
-            )
+            # The grid weights are written once in a separate file when the model supports it,
+            # instead of being inlined in every forcing command
+            gw = self.forcing_grid_weights()
+            if self.grid_weights_file:
+                gw = RedirectToFileCommand(self.grid_weights_file)  # type: ignore
             cmds = []
             for var, cmd in self._var_cmds.items():
                 if cmd and not isinstance(cmd, ObservationDataCommand):
-                    # TODO: implement a RedirectToFile mechanism to avoid inlining the grid weights
-                    # multiple times as we do here
                     cmd = cast(Union[GriddedForcingCommand, StationForcingCommand], cmd)
-                    if len(cmd.grid_weights.data) == 1:
+                    if self._uses_forcing_grid_weights(cmd):
+                        # The command itself keeps its default grid weights
+                        cmd = copy(cmd)
                         cmd.grid_weights = gw
                     cmds.append(cmd)
             d["forcing_list"] = "\n".join(map(str, cmds))
@@ -827,7 +1149,7 @@ class RVT(RV):
                 d["observed_data"] = cmd  # type: ignore
                 break
 
-        return super().to_rv(dedent(self.tmpl.lstrip("\n")).format(**d), "RVT")
+        return super().to_rv(_dedent(self.tmpl).format(**d), "RVT")
 
 
 #########
@@ -924,18 +1246,13 @@ class OST(RV):
         a = list(filter(lambda x: not x.startswith("_"), self.__dict__))
 
         # Properties
-        p = list(
-            filter(
-                lambda x: isinstance(getattr(self.__class__, x, None), property),
-                dir(self),
-            )
-        )
+        p = list(_property_names(self.__class__))
 
         d = {attr: getattr(self, attr) for attr in a + p}
 
         d.update(self._extra_attributes)
 
-        return super().to_rv(dedent(self.tmpl.lstrip("\n")).format(**d), "OST")
+        return super().to_rv(_dedent(self.tmpl).format(**d), "OST")
 
 
 class Config:
@@ -981,3 +1298,12 @@ class Config:
             # because I don't want to burden the user with setting it.. but the problem
             # is that externally supplied rv files might not have it (to be discussed)
             self.rvi.run_name = None
+
+    @property
+    def modified(self) -> Dict[str, Set[str]]:
+        """Names of the attributes modified since the RVs were last rendered, keyed by RV."""
+        return {
+            rvx: getattr(self, rvx).modified
+            for rvx in ["rvc", "rvh", "rvi", "rvp", "rvt", "ost"]
+            if getattr(self, rvx).modified
+        }
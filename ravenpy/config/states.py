@@ -0,0 +1,750 @@
+"""
+Model states
+------------
+
+The `ModelState` class holds the states of the HRUs and subbasins of a model, as written by Raven in its solution file,
+in numpy arrays. Solution files are parsed much faster than with `RVC.parse_solution`, which creates one `HRUState`
+record per HRU, and the states can be saved to a compact binary snapshot (`.npz` or NetCDF) that is only rendered back
+to RVC text when a simulation is started from it (see `RVC.set_state`).
+
+The `StateEnsemble` class stacks the states of an ensemble of simulations (e.g. for data assimilation), and can be
+given to a model to start each parallel simulation from the states of one member.
+
+"""
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import xarray as xr
+
+from ravenpy.config import ConfigError
+from ravenpy.config.commands import BasinIndexCommand, HRUState
+
+# Number of values per line of the subbasin flow commands, as written by Raven
+_FLOW_VALUES_PER_LINE = 200
+
+_SPLIT = re.compile(r"[,\s]+")
+
+
+class ModelState:
+    """States of the HRUs and subbasins of a model.
+
+    Parameters
+    ----------
+    hru_index : sequence of int
+      Index of each HRU.
+    hru_values : array_like
+      Values of the state variables, of shape (HRU, variable).
+    attributes : sequence of str
+      Names of the state variables, as given by Raven (e.g. "SOIL[0]").
+    units : sequence of str, optional
+      Units of the state variables.
+    basin_index : sequence of int
+      Index of each subbasin.
+    basin_names : sequence of str, optional
+      Name of each subbasin.
+    channel_storage, rivulet_storage : array_like, optional
+      Channel and rivulet storage of each subbasin.
+    basin_flows : dict, optional
+      Flow histories of the subbasins, keyed by command name without colon (e.g. "Qout"). Each value is a tuple of the
+      concatenated values of all the subbasins and of the offsets of the values of each subbasin in that array, of
+      length n_basins + 1.
+    timestamp : str, optional
+      Time of the states, as written in the `:TimeStamp` line of solution files.
+
+    Examples
+    --------
+    >>> state = ModelState.load(model.outputs["solution"])
+    >>> state["SOIL[0]"] *= 1.1
+    >>> state.save("state.npz")
+    >>> model(ts, rvc="state.npz")
+    """
+
+    def __init__(
+        self,
+        hru_index: Sequence[int],
+        hru_values,
+        attributes: Sequence[str],
+        units: Optional[Sequence[str]] = None,
+        basin_index: Sequence[int] = (),
+        basin_names: Optional[Sequence[str]] = None,
+        channel_storage=None,
+        rivulet_storage=None,
+        basin_flows: Optional[Dict[str, Tuple[np.ndarray, np.ndarray]]] = None,
+        timestamp: Optional[str] = None,
+    ):
+        self.hru_index = np.asarray(hru_index, dtype=int)
+        self.attributes = list(attributes)
+        self.hru_values = np.asarray(hru_values, dtype=float).reshape(
+            len(self.hru_index), len(self.attributes)
+        )
+        self.units = list(units) if units is not None else [""] * len(attributes)
+
+        self.basin_index = np.asarray(basin_index, dtype=int)
+        nb = len(self.basin_index)
+        self.basin_names = list(basin_names) if basin_names is not None else [""] * nb
+        self.channel_storage = (
+            np.zeros(nb)
+            if channel_storage is None
+            else np.asarray(channel_storage, dtype=float)
+        )
+        self.rivulet_storage = (
+            np.zeros(nb)
+            if rivulet_storage is None
+            else np.asarray(rivulet_storage, dtype=float)
+        )
+        self.basin_flows = {
+            k: (np.asarray(v, dtype=float), np.asarray(o, dtype=int))
+            for k, (v, o) in (basin_flows or {}).items()
+        }
+        self.timestamp = timestamp
+
+    def __repr__(self):
+        return (
+            f"<{self.__class__.__name__}: {len(self.hru_index)} HRUs, {len(self.attributes)} variables, "
+            f"{len(self.basin_index)} subbasins>"
+        )
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """Return the values of a state variable for all the HRUs (a view).
+
+        Variables are named as in Raven (e.g. "SOIL[0]") or as the fields of `HRUState` (e.g. "soil0").
+        """
+        return self.hru_values[:, _column(self.attributes, name)]
+
+    def __setitem__(self, name: str, value):
+        self.hru_values[:, _column(self.attributes, name)] = value
+
+    def copy(self) -> "ModelState":
+        """Return a deep copy of the states."""
+        return self.__class__(
+            self.hru_index.copy(),
+            self.hru_values.copy(),
+            self.attributes,
+            self.units,
+            self.basin_index.copy(),
+            self.basin_names,
+            self.channel_storage.copy(),
+            self.rivulet_storage.copy(),
+            {k: (v.copy(), o.copy()) for k, (v, o) in self.basin_flows.items()},
+            self.timestamp,
+        )
+
+    @classmethod
+    def merge(cls, hru_state: "ModelState", basin_state: "ModelState") -> "ModelState":
+        """Return the HRU states of a model state with the subbasin states of another (see `StateEnsemble.merge`)."""
+        return cls(
+            hru_state.hru_index,
+            hru_state.hru_values,
+            hru_state.attributes,
+            hru_state.units,
+            basin_state.basin_index,
+            basin_state.basin_names,
+            basin_state.channel_storage,
+            basin_state.rivulet_storage,
+            basin_state.basin_flows,
+            hru_state.timestamp,
+        )
+
+    def basin_flow(self, key: str, i: int) -> np.ndarray:
+        """Return the values of flow command `key` (e.g. "Qout") of the i-th subbasin."""
+        values, offsets = self.basin_flows[key]
+        return values[offsets[i] : offsets[i + 1]]
+
+    # Parsing
+
+    @classmethod
+    def parse(cls, solution: str) -> "ModelState":
+        """Parse the content of a solution (or RVC) file.
+
+        The HRU state table is converted to floats in a single numpy call, and the subbasin states are read line by
+        line. Flow commands wrapped over multiple lines are supported.
+        """
+        timestamp = None
+        m = re.search(r"^\s*:TimeStamp[,\s]+(.+?)\s*$", solution, re.MULTILINE)
+        if m:
+            timestamp = m.group(1)
+
+        hru_block = _block(solution, "HRUStateVariableTable")
+        if hru_block is None:
+            raise ValueError("No :HRUStateVariableTable found in the solution.")
+        attributes, units, hru_index, hru_values = _parse_hru_table(hru_block)
+
+        basins: dict = {}
+        basin_block = _block(solution, "BasinStateVariables")
+        if basin_block is not None:
+            basins = _parse_basin_states(basin_block)
+
+        return cls(
+            hru_index,
+            hru_values,
+            attributes,
+            units,
+            timestamp=timestamp,
+            **basins,
+        )
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "ModelState":
+        """Load the states from a solution file (`.rvc`) or a snapshot written by `save` (`.npz` or `.nc`)."""
+        path = Path(path)
+        if path.suffix == ".npz":
+            with np.load(path, allow_pickle=False) as f:
+                return cls._from_arrays(dict(f))
+        elif path.suffix == ".nc":
+            with xr.open_dataset(path) as ds:
+                arrays = {k: ds[k].values for k in ds.variables}
+            return cls._from_arrays(arrays)
+        else:
+            return cls.parse(path.read_text())
+
+    # Serialization
+
+    def save(self, path: Union[str, Path]):
+        """Save the states to a binary snapshot (`.npz` or `.nc`), or to a solution file (`.rvc`)."""
+        path = Path(path)
+        if path.suffix == ".npz":
+            np.savez(path, **self._to_arrays())
+        elif path.suffix == ".nc":
+            self._to_dataset().to_netcdf(path)
+        elif path.suffix == ".rvc":
+            path.write_text(self.to_rv())
+        else:
+            raise ValueError(f"Unsupported state file format: {path.suffix}")
+
+    def _to_arrays(self) -> Dict[str, np.ndarray]:
+        arrays = {
+            "hru_index": self.hru_index,
+            "hru_values": self.hru_values,
+            "attributes": np.array(self.attributes, dtype=str),
+            "units": np.array(self.units, dtype=str),
+            "basin_index": self.basin_index,
+            "basin_names": np.array(self.basin_names, dtype=str),
+            "channel_storage": self.channel_storage,
+            "rivulet_storage": self.rivulet_storage,
+            "flow_keys": np.array(list(self.basin_flows), dtype=str),
+            "timestamp": np.array(self.timestamp or "", dtype=str),
+        }
+        for key, (values, offsets) in self.basin_flows.items():
+            arrays[f"flow_{key}"] = values
+            arrays[f"flow_{key}_offsets"] = offsets
+        return arrays
+
+    @classmethod
+    def _from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "ModelState":
+        flows = {
+            str(k): (arrays[f"flow_{k}"], arrays[f"flow_{k}_offsets"])
+            for k in np.atleast_1d(arrays["flow_keys"])
+            if k
+        }
+        return cls(
+            arrays["hru_index"],
+            arrays["hru_values"],
+            [str(a) for a in arrays["attributes"]],
+            [str(u) for u in arrays["units"]],
+            arrays["basin_index"],
+            [str(n) for n in arrays["basin_names"]],
+            arrays["channel_storage"],
+            arrays["rivulet_storage"],
+            flows,
+            str(arrays["timestamp"]) or None,
+        )
+
+    def _to_dataset(self) -> xr.Dataset:
+        dims = {
+            "hru_index": ("hru",),
+            "hru_values": ("hru", "variable"),
+            "attributes": ("variable",),
+            "units": ("variable",),
+            "basin_index": ("basin",),
+            "basin_names": ("basin",),
+            "channel_storage": ("basin",),
+            "rivulet_storage": ("basin",),
+            "flow_keys": ("flow",),
+            "timestamp": (),
+        }
+        variables = {}
+        for key, values in self._to_arrays().items():
+            if key.startswith("flow_") and key != "flow_keys":
+                dim = key if key.endswith("_offsets") else f"{key}_values"
+                variables[key] = ((dim,), values)
+            else:
+                variables[key] = (dims[key], values)
+        return xr.Dataset(variables, attrs={"title": "Raven model states"})
+
+    # Rendering
+
+    def hru_table(self) -> str:
+        """Return the `:HRUStateVariableTable` command."""
+        rows = [
+            f"    {i}," + ",".join(map(repr, values))
+            for i, values in zip(self.hru_index.tolist(), self.hru_values.tolist())
+        ]
+        return "\n".join(
+            [
+                ":HRUStateVariableTable",
+                "    :Attributes," + ",".join(self.attributes),
+                "    :Units," + ",".join(self.units),
+                *rows,
+                ":EndHRUStateVariableTable",
+            ]
+        )
+
+    def basin_table(self) -> str:
+        """Return the `:BasinStateVariables` command."""
+        lines = [":BasinStateVariables"]
+        for i, (index, name) in enumerate(
+            zip(self.basin_index.tolist(), self.basin_names)
+        ):
+            lines.append(f"    :BasinIndex {index} {name}".rstrip())
+            lines.append(f"        :ChannelStorage {self.channel_storage[i]!r}")
+            lines.append(f"        :RivuletStorage {self.rivulet_storage[i]!r}")
+            for key in self.basin_flows:
+                values = self.basin_flow(key, i).tolist()
+                if not values:
+                    continue
+                chunks = [
+                    " ".join(map(_format_value, values[j : j + _FLOW_VALUES_PER_LINE]))
+                    for j in range(0, len(values), _FLOW_VALUES_PER_LINE)
+                ]
+                lines.append(f"        :{key} " + "\n            ".join(chunks))
+        lines.append(":EndBasinStateVariables")
+        return "\n".join(lines)
+
+    def to_rv(self) -> str:
+        """Return the states as RVC text."""
+        return self.hru_table() + "\n\n" + self.basin_table() + "\n"
+
+    def to_records(self) -> Tuple[Dict[int, HRUState], Dict[int, BasinIndexCommand]]:
+        """Return the states as `HRUState` and `BasinIndexCommand` records, keyed by index.
+
+        The state variables are matched to the fields of `HRUState` by name (e.g. "SOIL[0]" to `soil0`).
+
+        Raises
+        ------
+        ConfigError
+          If a state variable or a subbasin flow command has no equivalent record field.
+        """
+        fields = [_field_name(a) for a in self.attributes]
+        unknown = set(fields) - set(HRUState.__dataclass_fields__)  # type: ignore
+        if unknown:
+            raise ConfigError(
+                f"State variables {sorted(unknown)} cannot be represented as HRUState records."
+            )
+        unknown = {k.lower() for k in self.basin_flows} - {"qout", "qin", "qlat"}
+        if unknown:
+            raise ConfigError(
+                f"Subbasin states {sorted(unknown)} cannot be represented as BasinIndexCommand records."
+            )
+
+        hru_states = {
+            i: HRUState.construct(index=i, **dict(zip(fields, values)))
+            for i, values in zip(self.hru_index.tolist(), self.hru_values.tolist())
+        }
+        basin_states = {}
+        for i, index in enumerate(self.basin_index.tolist()):
+            flows = {
+                k.lower(): tuple(self.basin_flow(k, i).tolist())
+                for k in self.basin_flows
+            }
+            basin_states[index] = BasinIndexCommand.construct(
+                index=index,
+                name=self.basin_names[i],
+                channel_storage=float(self.channel_storage[i]),
+                rivulet_storage=float(self.rivulet_storage[i]),
+                **{k: v for k, v in flows.items() if v},
+            )
+        return hru_states, basin_states
+
+
+class StateEnsemble:
+    """States of an ensemble of simulations of the same model, e.g. the members of a data assimilation ensemble.
+
+    The states of all the members are stored in arrays with a leading member dimension. The members share the same
+    HRUs, state variables and subbasins, as well as the length of the flow histories of the subbasins.
+
+    Parameters
+    ----------
+    hru_index : sequence of int
+      Index of each HRU.
+    hru_values : array_like
+      Values of the state variables, of shape (member, HRU, variable).
+    attributes : sequence of str
+      Names of the state variables, as given by Raven (e.g. "SOIL[0]").
+    units : sequence of str, optional
+      Units of the state variables.
+    basin_index : sequence of int
+      Index of each subbasin.
+    basin_names : sequence of str, optional
+      Name of each subbasin.
+    channel_storage, rivulet_storage : array_like, optional
+      Channel and rivulet storage, of shape (member, subbasin).
+    basin_flows : dict, optional
+      Flow histories of the subbasins, keyed by command name. Each value is a tuple of the concatenated values of all
+      the subbasins, of shape (member, values), and of the offsets of the values of each subbasin (see `ModelState`).
+    timestamps : sequence of str, optional
+      Time of the states of each member.
+
+    Examples
+    --------
+    >>> states = StateEnsemble.repeat(model.state, 25)
+    >>> states.set("soil0", states.get("soil0") * np.random.normal(1, 0.1, (25, 1)))
+    >>> model(ts, hru_state=states, nc_index=range(25))
+    >>> states = model.get_state_ensemble()
+    """
+
+    def __init__(
+        self,
+        hru_index: Sequence[int],
+        hru_values,
+        attributes: Sequence[str],
+        units: Optional[Sequence[str]] = None,
+        basin_index: Sequence[int] = (),
+        basin_names: Optional[Sequence[str]] = None,
+        channel_storage=None,
+        rivulet_storage=None,
+        basin_flows: Optional[Dict[str, Tuple[np.ndarray, np.ndarray]]] = None,
+        timestamps: Optional[Sequence[Optional[str]]] = None,
+    ):
+        self.hru_index = np.asarray(hru_index, dtype=int)
+        self.attributes = list(attributes)
+        self.hru_values = np.asarray(hru_values, dtype=float)
+        n = self.hru_values.shape[0]
+        self.hru_values = self.hru_values.reshape(
+            n, len(self.hru_index), len(self.attributes)
+        )
+        self.units = list(units) if units is not None else [""] * len(attributes)
+
+        self.basin_index = np.asarray(basin_index, dtype=int)
+        nb = len(self.basin_index)
+        self.basin_names = list(basin_names) if basin_names is not None else [""] * nb
+        self.channel_storage = (
+            np.zeros((n, nb))
+            if channel_storage is None
+            else np.asarray(channel_storage, dtype=float).reshape(n, nb)
+        )
+        self.rivulet_storage = (
+            np.zeros((n, nb))
+            if rivulet_storage is None
+            else np.asarray(rivulet_storage, dtype=float).reshape(n, nb)
+        )
+        self.basin_flows = {
+            k: (np.asarray(v, dtype=float).reshape(n, -1), np.asarray(o, dtype=int))
+            for k, (v, o) in (basin_flows or {}).items()
+        }
+        self.timestamps = list(timestamps) if timestamps is not None else [None] * n
+
+    def __repr__(self):
+        return (
+            f"<{self.__class__.__name__}: {len(self)} members, {len(self.hru_index)} HRUs, "
+            f"{len(self.attributes)} variables, {len(self.basin_index)} subbasins>"
+        )
+
+    def __len__(self):
+        return self.hru_values.shape[0]
+
+    def __getitem__(self, i: int) -> ModelState:
+        """Return the states of the i-th member, as views on the arrays of the ensemble."""
+        if not -len(self) <= i < len(self):
+            raise IndexError(i)
+        return ModelState(
+            self.hru_index,
+            self.hru_values[i],
+            self.attributes,
+            self.units,
+            self.basin_index,
+            self.basin_names,
+            self.channel_storage[i],
+            self.rivulet_storage[i],
+            {k: (v[i], o) for k, (v, o) in self.basin_flows.items()},
+            self.timestamps[i],
+        )
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    @classmethod
+    def from_states(cls, states: Sequence[ModelState]) -> "StateEnsemble":
+        """Stack the states of multiple simulations of the same model.
+
+        Raises
+        ------
+        ValueError
+          If the states do not have the same HRUs, state variables, subbasins or length of flow histories.
+        """
+        if not states:
+            raise ValueError("At least one state is required.")
+        ref = states[0]
+        for st in states[1:]:
+            if (
+                st.attributes != ref.attributes
+                or not np.array_equal(st.hru_index, ref.hru_index)
+                or not np.array_equal(st.basin_index, ref.basin_index)
+                or st.basin_flows.keys() != ref.basin_flows.keys()
+                or any(
+                    not np.array_equal(st.basin_flows[k][1], o)
+                    for k, (_, o) in ref.basin_flows.items()
+                )
+            ):
+                raise ValueError("The states do not have the same layout.")
+
+        return cls(
+            ref.hru_index,
+            np.stack([st.hru_values for st in states]),
+            ref.attributes,
+            ref.units,
+            ref.basin_index,
+            ref.basin_names,
+            np.stack([st.channel_storage for st in states]),
+            np.stack([st.rivulet_storage for st in states]),
+            {
+                k: (np.stack([st.basin_flows[k][0] for st in states]), o)
+                for k, (_, o) in ref.basin_flows.items()
+            },
+            [st.timestamp for st in states],
+        )
+
+    @classmethod
+    def repeat(cls, state: ModelState, n: int) -> "StateEnsemble":
+        """Return an ensemble of `n` copies of the same states."""
+
+        def rep(a):
+            return np.repeat(a[np.newaxis], n, axis=0)
+
+        return cls(
+            state.hru_index,
+            rep(state.hru_values),
+            state.attributes,
+            state.units,
+            state.basin_index,
+            state.basin_names,
+            rep(state.channel_storage),
+            rep(state.rivulet_storage),
+            {k: (rep(v), o) for k, (v, o) in state.basin_flows.items()},
+            [state.timestamp] * n,
+        )
+
+    def hru_view(self) -> "StateEnsemble":
+        """Return the HRU states of the members, without their subbasin states, as views on the ensemble arrays."""
+        return self.__class__(
+            self.hru_index,
+            self.hru_values,
+            self.attributes,
+            self.units,
+            timestamps=self.timestamps,
+        )
+
+    def basin_view(self) -> "StateEnsemble":
+        """Return the subbasin states of the members, without their HRU states, as views on the ensemble arrays."""
+        return self.__class__(
+            (),
+            self.hru_values[:, :0, :0],
+            (),
+            basin_index=self.basin_index,
+            basin_names=self.basin_names,
+            channel_storage=self.channel_storage,
+            rivulet_storage=self.rivulet_storage,
+            basin_flows=self.basin_flows,
+            timestamps=self.timestamps,
+        )
+
+    @classmethod
+    def merge(
+        cls, hru_states: "StateEnsemble", basin_states: "StateEnsemble"
+    ) -> "StateEnsemble":
+        """Return the HRU states of an ensemble with the subbasin states of another.
+
+        The arrays are shared with both ensembles, e.g. the `hru_view` and `basin_view` of the same ensemble.
+
+        Raises
+        ------
+        ValueError
+          If the ensembles do not have the same number of members.
+        """
+        if len(hru_states) != len(basin_states):
+            raise ValueError("The ensembles do not have the same number of members.")
+        return cls(
+            hru_states.hru_index,
+            hru_states.hru_values,
+            hru_states.attributes,
+            hru_states.units,
+            basin_states.basin_index,
+            basin_states.basin_names,
+            basin_states.channel_storage,
+            basin_states.rivulet_storage,
+            basin_states.basin_flows,
+            hru_states.timestamps,
+        )
+
+    def _hru_positions(self, hru: Optional[Union[int, Sequence[int]]]):
+        if hru is None:
+            return slice(None)
+        pos = {idx: i for i, idx in enumerate(self.hru_index.tolist())}
+        try:
+            return pos[hru] if np.isscalar(hru) else [pos[h] for h in hru]  # type: ignore
+        except KeyError as err:
+            raise KeyError(f"HRU {err.args[0]}") from None
+
+    def get(
+        self,
+        name: Union[str, Sequence[str]],
+        hru: Optional[Union[int, Sequence[int]]] = None,
+    ) -> np.ndarray:
+        """Return the values of one or more state variables of all the members.
+
+        Parameters
+        ----------
+        name : str or sequence of str
+          Name of the state variable(s), as in Raven (e.g. "SOIL[0]") or as the fields of `HRUState` (e.g. "soil0").
+        hru : int or sequence of int, optional
+          Index of the HRU(s). By default, all the HRUs.
+
+        Returns
+        -------
+        ndarray
+          Array of shape (member, HRU) for a single variable, or (member, HRU, variable) for a sequence of variables,
+          without the HRU dimension if `hru` is a single index.
+        """
+        cols = (
+            _column(self.attributes, name)
+            if isinstance(name, str)
+            else [_column(self.attributes, n) for n in name]
+        )
+        return self.hru_values[:, self._hru_positions(hru)][..., cols]
+
+    def set(
+        self,
+        name: Union[str, Sequence[str]],
+        value,
+        hru: Optional[Union[int, Sequence[int]]] = None,
+    ):
+        """Set the values of one or more state variables of all the members.
+
+        The values are broadcast against the array returned by `get` with the same arguments.
+        """
+        cols = (
+            _column(self.attributes, name)
+            if isinstance(name, str)
+            else [_column(self.attributes, n) for n in name]
+        )
+        rows = self._hru_positions(hru)
+        if isinstance(rows, slice):
+            self.hru_values[:, rows, cols] = value
+        else:
+            # Fancy indexing on both axes would pair the rows and columns instead of taking their product
+            view = self.hru_values[:, rows]
+            view[..., cols] = value
+            self.hru_values[:, rows] = view
+
+
+def _field_name(attribute: str) -> str:
+    """Return the name of the `HRUState` field of a Raven state variable, e.g. "soil0" for "SOIL[0]"."""
+    return re.sub(r"[\[\]]", "", attribute).lower()
+
+
+def _column(attributes: List[str], name: str) -> int:
+    """Return the position of a state variable, given its Raven or `HRUState` field name."""
+    if name in attributes:
+        return attributes.index(name)
+    fields = [_field_name(a) for a in attributes]
+    if name in fields:
+        return fields.index(name)
+    raise KeyError(name)
+
+
+def _format_value(v: float) -> str:
+    # The first value of the flow commands is a count
+    return str(int(v)) if v.is_integer() else repr(v)
+
+
+def _block(text: str, name: str) -> Optional[str]:
+    """Return the content of the `:<name>` ... `:End<name>` block of a RV file."""
+    start = text.find(f":{name}")
+    if start < 0:
+        return None
+    start += len(name) + 1
+    end = text.find(f":End{name}", start)
+    if end < 0:
+        raise ValueError(f":End{name} not found.")
+    return text[start:end]
+
+
+def _parse_hru_table(block: str) -> Tuple[List[str], List[str], np.ndarray, np.ndarray]:
+    attributes: List[str] = []
+    units: List[str] = []
+    rows = []
+    for line in block.strip().splitlines():
+        line = line.strip()
+        if line.startswith(":Attributes"):
+            attributes = [a for a in _SPLIT.split(line)[1:] if a]
+        elif line.startswith(":Units"):
+            units = [u for u in _SPLIT.split(line)[1:] if u]
+        elif line and not line.startswith("#"):
+            rows.append(line)
+
+    ncol = len(attributes) + 1
+    text = " ".join(rows).replace(",", " ")
+    msg = "The HRU state table does not have one value per attribute on each row."
+    try:
+        values = np.array(text.split(), dtype=float)
+    except ValueError:
+        raise ValueError(msg) from None
+    if values.size != len(rows) * ncol:
+        raise ValueError(msg)
+    values = values.reshape(len(rows), ncol)
+    return attributes, units, values[:, 0].astype(int), values[:, 1:]
+
+
+def _parse_basin_states(block: str) -> dict:
+    index: List[int] = []
+    names: List[str] = []
+    channel: List[float] = []
+    rivulet: List[float] = []
+    flows: Dict[str, List[List[str]]] = {}
+
+    key = None
+    for line in block.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith(":BasinIndex"):
+            idx, _, name = line[len(":BasinIndex") :].strip(" ,").partition(",")
+            if not name:
+                idx, _, name = idx.partition(" ")
+            index.append(int(idx))
+            names.append(name.strip())
+            channel.append(0.0)
+            rivulet.append(0.0)
+            for values in flows.values():
+                values.append([])
+            key = None
+        elif line.startswith(":"):
+            cmd, *values = filter(None, _SPLIT.split(line))
+            key = cmd[1:]
+            if key == "ChannelStorage":
+                channel[-1] = float(values[0])
+            elif key == "RivuletStorage":
+                rivulet[-1] = float(values[0])
+            else:
+                if key not in flows:
+                    flows[key] = [[] for _ in index]
+                flows[key][-1].extend(values)
+        elif key in flows:
+            # Continuation of a flow command wrapped over multiple lines
+            flows[key][-1].extend(filter(None, _SPLIT.split(line)))  # type: ignore
+
+    basin_flows = {}
+    for k, per_basin in flows.items():
+        offsets = np.cumsum([0] + [len(v) for v in per_basin])
+        basin_flows[k] = (
+            np.array([x for v in per_basin for x in v], dtype=float),
+            offsets,
+        )
+    return {
+        "basin_index": index,
+        "basin_names": names,
+        "channel_storage": channel,
+        "rivulet_storage": rivulet,
+        "basin_flows": basin_flows,
+    }
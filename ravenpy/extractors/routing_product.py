@@ -1,29 +1,39 @@
+import os
 import warnings
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List
+from typing import List, Optional, Tuple
 
 from ravenpy.utilities import gis_import_error_message
 
 try:
     import geopandas
-    from osgeo import __version__ as osgeo_version  # noqa
-    from osgeo import ogr, osr  # noqa
-    from shapely import wkt
+    import shapely
+    from pyproj import Transformer
 except (ImportError, ModuleNotFoundError) as e:
     msg = gis_import_error_message.format(Path(__file__).stem)
     raise ImportError(msg) from e
 
 import netCDF4 as nc4
 import numpy as np
+import pandas as pd
 
+from ravenpy.__version__ import __version__
 from ravenpy.config.commands import (
     ChannelProfileCommand,
     GridWeightsCommand,
+    GridWeightsData,
     HRUsCommand,
     ReservoirCommand,
     SubBasinsCommand,
 )
+from ravenpy.utilities.cache import content_key
+from ravenpy.utilities.grid_weights import GridWeightsCache
+
+# Number of chunks of HRUs per process computing grid weights in parallel, balancing the load of the processes when
+# the HRUs of some chunks are larger or intersect more grid cells
+CHUNKS_PER_JOB = 4
 
 
 class RoutingProductShapefileExtractor:
@@ -295,6 +305,90 @@ class RoutingProductShapefileExtractor:
         )
 
 
+def _frame_fingerprint(df) -> List[bytes]:
+    """Return the parts identifying the geometries, attributes and CRS of a GeoDataFrame in a cache key."""
+    attrs = df.drop(columns=df.geometry.name)
+    return [
+        str(df.crs).encode(),
+        repr(list(attrs.columns)).encode(),
+        pd.util.hash_pandas_object(attrs).to_numpy().tobytes(),
+        b"".join(shapely.to_wkb(df.geometry.to_numpy())),
+    ]
+
+
+def _compute_grid_weights(
+    grid_cells, basins, hru_ids, area_error_threshold, cell_ids=None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Compute the weights of the grid cells intersecting each basin.
+
+    Parameters
+    ----------
+    grid_cells : np.ndarray
+      Geometries of the grid cells.
+    basins : np.ndarray
+      Geometries of the basins (HRUs), in the coordinate reference system of the grid cells.
+    hru_ids : np.ndarray
+      IDs of the basins.
+    area_error_threshold : float
+      Mismatch between the area of a basin and the sum of the areas of its intersections with the grid cells above which
+      its weights are not adjusted to sum up to 1.
+    cell_ids : np.ndarray, optional
+      Increasing IDs of the grid cells. Defaults to their index.
+
+    Returns
+    -------
+    (np.ndarray, np.ndarray, np.ndarray)
+      HRU IDs, cell IDs and weights, sorted by basin and cell ID.
+    """
+    if cell_ids is None:
+        cell_ids = np.arange(len(grid_cells))
+
+    area_basin = shapely.area(basins)
+    # "fake" buffer to avoid invalid polygons and weirdos dumped by ArcGIS
+    buffered = shapely.buffer(basins, 0.0)
+
+    tree = shapely.STRtree(grid_cells)
+    ibasin, icell = tree.query(buffered, predicate="intersects")
+    # Cells of each HRU in increasing cell ID, as in the original algorithm
+    order = np.lexsort((icell, ibasin))
+    ibasin, icell = ibasin[order], icell[order]
+
+    area_intersect = shapely.area(
+        shapely.intersection(grid_cells[icell], buffered[ibasin])
+    )
+    area_all = np.bincount(ibasin, weights=area_intersect, minlength=len(basins))
+
+    # mismatch between area of subbasin (routing product) and sum of all contributions of grid cells (model output)
+    error = (area_basin - area_all) / area_basin
+
+    # record all basins with errors larger 5% (if basin is larger than 0.5 km2), otherwise adjust such that weights
+    # sum up to 1.0
+    keep_error = (np.abs(error) > area_error_threshold) & (area_basin > 500000.0)
+
+    valid = area_intersect > 0
+    ibasin, icell = ibasin[valid], icell[valid]
+    weight = area_intersect[valid] / area_basin[ibasin]
+    weight = np.where(keep_error[ibasin], weight, weight * 1.0 / (1.0 - error[ibasin]))
+
+    return hru_ids[ibasin], cell_ids[icell], weight
+
+
+def _compute_grid_weights_wkb(
+    grid_cells_wkb, basins_wkb, hru_ids, area_error_threshold, cell_ids
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Compute the weights of a chunk of basins in a worker process, from the WKB of the geometries.
+
+    See `_compute_grid_weights`.
+    """
+    return _compute_grid_weights(
+        shapely.from_wkb(grid_cells_wkb),
+        shapely.from_wkb(basins_wkb),
+        hru_ids,
+        area_error_threshold,
+        cell_ids,
+    )
+
+
 class RoutingProductGridWeightExtractor:
 
     """
@@ -320,6 +414,7 @@ class RoutingProductGridWeightExtractor:
         gauge_ids=None,
         sub_ids=None,
         area_error_threshold=AREA_ERROR_THRESHOLD,
+        cache: Optional[GridWeightsCache] = None,
     ):
         self._dim_names = tuple(dim_names)
         self._var_names = tuple(var_names)
@@ -328,6 +423,10 @@ class RoutingProductGridWeightExtractor:
         self._gauge_ids = gauge_ids or []
         self._sub_ids = sub_ids or []
         self._area_error_threshold = area_error_threshold
+        # Opt-in cache of the extracted weights, keyed by the fingerprint of the inputs
+        self.cache = cache
+        # Memoized by `fingerprint`, since `extract` modifies the inputs
+        self._fingerprint: Optional[str] = None
 
         assert not (
             self._gauge_ids and self._sub_ids
@@ -356,7 +455,79 @@ class RoutingProductGridWeightExtractor:
             routing_file_path = f"zip://{routing_file_path}"
         self._routing_data = geopandas.read_file(routing_file_path)
 
-    def extract(self) -> GridWeightsCommand:
+    def fingerprint(self) -> str:
+        """Return a hash of the inputs determining the grid weights.
+
+        The hash covers the coordinates of the grid (or the geometries and `netcdf_input_field` of the input shapefile),
+        the geometries and attributes of the routing data, the HRU ID field, the gauge or subbasin IDs and the area
+        error threshold, as well as the version of RavenPy. It is computed once, from the inputs as they were read,
+        before `extract` modifies them.
+        """
+        if self._fingerprint is not None:
+            return self._fingerprint
+
+        parts = [
+            __version__,
+            repr(
+                (
+                    self._routing_id_field,
+                    sorted(self._gauge_ids),
+                    sorted(self._sub_ids),
+                    self._area_error_threshold,
+                )
+            ),
+        ]
+
+        if self._input_is_netcdf:
+            parts.append(repr(self._dim_names))
+            for name in self._var_names:
+                var = self._input_data.variables[name]
+                values = np.ascontiguousarray(np.ma.getdata(var[:]))
+                parts += [
+                    repr((var.dimensions, values.shape, values.dtype.str)),
+                    values.tobytes(),
+                ]
+        else:
+            parts += _frame_fingerprint(self._input_data)
+            parts.append(self._netcdf_input_field)
+
+        parts += _frame_fingerprint(self._routing_data)
+
+        self._fingerprint = content_key(*parts)
+        return self._fingerprint
+
+    def extract(
+        self, jobs: Optional[int] = 1, refresh_cache: bool = False
+    ) -> GridWeightsCommand:
+        """Extract the grid weights of the HRUs of the routing data.
+
+        If the extractor has a `cache`, the weights are loaded from it when they have already been extracted from the
+        same inputs (see `fingerprint`), and stored in it otherwise.
+
+        Parameters
+        ----------
+        jobs : int, optional
+          Number of processes computing the grid weights of chunks of HRUs in parallel. If None, the number of CPUs.
+          The weights do not depend on the number of jobs.
+        refresh_cache : bool
+          If True, the weights are extracted even if they are found in the cache, and replace them.
+        """
+        jobs = jobs or os.cpu_count() or 1
+
+        if self.cache is None:
+            return self._extract(jobs)
+
+        key = self.fingerprint()
+        gw = None if refresh_cache else self.cache.load(key)
+        if gw is None:
+            gw = self._extract(jobs)
+            self.cache.save(key, gw)
+        return gw
+
+    def _extract(self, jobs: int) -> GridWeightsCommand:
+        # The inputs are modified below
+        self.fingerprint()
+
         self._prepare_input_data()
 
         # Read routing data
@@ -447,81 +618,73 @@ class RoutingProductGridWeightExtractor:
         # construct all grid cell polygons
         # -------------------------------
 
-        grid_cell_geom_gpd_wkt = self._compute_grid_cell_polygons()
+        grid_cells, cell_ids = self._compute_grid_cell_polygons()
 
         # -------------------------------
         # Derive overlay and calculate weights
         # -------------------------------
 
-        grid_weights = []
-
-        for _, row in self._routing_data.iterrows():
-
-            poly = ogr.CreateGeometryFromWkt(wkt.dumps(row.geometry))
-
-            area_basin = poly.Area()
-            # bounding box around basin (for easy check of proximity)
-            enve_basin = poly.GetEnvelope()
-
-            area_all = 0.0
-            # ncells = 0
-
-            row_grid_weights = []
-
-            for ilat in range(self._nlat):
-                for ilon in range(self._nlon):
-
-                    # bounding box around grid-cell (for easy check of proximity)
-                    enve_gridcell = grid_cell_geom_gpd_wkt[ilat][ilon].GetEnvelope()
-
-                    grid_is_close = self._check_proximity_of_envelops(
-                        enve_gridcell, enve_basin
-                    )
-
-                    # this check decreases runtime DRASTICALLY (from ~6h to ~1min)
-                    if not grid_is_close:
-                        continue
-
-                    # grid_cell_area = grid_cell_geom_gpd_wkt[ilat][ilon].Area()
-
-                    # "fake" buffer to avoid invalid polygons and weirdos dumped by ArcGIS
-                    inter = grid_cell_geom_gpd_wkt[ilat][ilon].Intersection(
-                        poly.Buffer(0.0)
-                    )
-
-                    area_intersect = inter.Area()
+        return GridWeightsCommand(
+            number_hrus=len(self._routing_data),
+            number_grid_cells=self._nlon * self._nlat,
+            data=self._compute_grid_weights(grid_cells, cell_ids, jobs),
+        )
 
-                    area_all += area_intersect
+    def _compute_grid_weights(
+        self, grid_cells, cell_ids, jobs: int = 1
+    ) -> GridWeightsData:
+        """Compute the weights of the grid cells intersecting each HRU of the routing data.
 
-                    if area_intersect > 0:
-                        hru_id = int(row[self._routing_id_field])
-                        cell_id = ilat * self._nlon + ilon
-                        weight = area_intersect / area_basin
-                        row_grid_weights.append((hru_id, cell_id, weight))
+        The grid cells intersecting each HRU are found with a spatial index (`shapely.STRtree`), and the areas of all
+        the intersections are computed at once. The weights are in the same order, and have the same values, as those
+        of the original algorithm, which intersected each HRU with every grid cell whose envelope overlaps its own, up to
+        the rounding of the areas.
 
-            # mismatch between area of subbasin (routing product) and sum of all contributions of grid cells (model output)
-            error = (area_basin - area_all) / area_basin
+        With more than one job, the HRUs are split in contiguous chunks whose weights are computed in a pool of
+        processes. Each process receives the geometries of its HRUs and of the grid cells whose envelopes overlap them
+        (as WKB), and the weights of the chunks are concatenated in the order of the HRUs, so that they are the same
+        whatever the number of jobs.
 
-            if abs(error) > self._area_error_threshold and area_basin > 500000.0:
-                # record all basins with errors larger 5% (if basin is larger than 0.5 km2)
-                # error_dict[int(ibasin[key_colname])] = [error, area_basin]
-                grid_weights += row_grid_weights
+        Parameters
+        ----------
+        grid_cells : np.ndarray
+          Geometries of the grid cells, in the coordinate reference system of the routing data.
+        cell_ids : np.ndarray
+          Increasing IDs of the grid cells.
+        jobs : int
+          Number of processes computing the weights.
+        """
+        basins = self._routing_data.geometry.to_numpy()
+        hru_ids = self._routing_data[self._routing_id_field].to_numpy().astype(int)
+
+        n_chunks = min(len(basins), jobs * CHUNKS_PER_JOB)
+        if jobs <= 1 or n_chunks <= 1:
+            return GridWeightsData(
+                *_compute_grid_weights(
+                    grid_cells, basins, hru_ids, self._area_error_threshold, cell_ids
+                )
+            )
 
-            else:
-                # adjust such that weights sum up to 1.0
-                for hru_id, cell_id, weight in row_grid_weights:
-                    corrected_weight = weight * 1.0 / (1.0 - error)
-                    grid_weights.append((hru_id, cell_id, corrected_weight))
+        tree = shapely.STRtree(grid_cells)
+        chunks = []
+        for idx in np.array_split(np.arange(len(basins)), n_chunks):
+            # Candidate cells of the chunk, from the overlap of the envelopes (the "fake" buffer of the HRUs cannot
+            # extend them)
+            icell = np.unique(tree.query(basins[idx])[1])
+            chunks.append(
+                (
+                    shapely.to_wkb(grid_cells[icell]),
+                    shapely.to_wkb(basins[idx]),
+                    hru_ids[idx],
+                    self._area_error_threshold,
+                    cell_ids[icell],
+                )
+            )
 
-                # if error < 1.0:
-                #     area_all *= 1.0 / (1.0 - error)
-                # error = 0.0
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(_compute_grid_weights_wkb, *zip(*chunks)))
 
-        return GridWeightsCommand(
-            number_hrus=len(self._routing_data),
-            number_grid_cells=self._nlon * self._nlat,
-            data=tuple(grid_weights),
-        )
+        return GridWeightsData(*(np.concatenate(arrays) for arrays in zip(*results)))
 
     def _prepare_input_data(self):
 
@@ -584,97 +747,65 @@ class RoutingProductGridWeightExtractor:
             # number of shapes in model "discretization" shapefile (not routing toolbox shapefile)
             self._nlat = self._input_data.geometry.count()  # only for consistency
 
-    def _compute_grid_cell_polygons(self):
-
-        grid_cell_geom_gpd_wkt: List[List[List[ogr.Geometry]]] = [
-            [[] for ilon in range(self._nlon)] for ilat in range(self._nlat)
-        ]
+    def _compute_grid_cell_polygons(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the polygons of the grid cells, in the coordinate reference system of the routing data, and their IDs.
 
+        The cells of a NetCDF grid are created at once from their corners, projected with pyproj. Only the cells whose
+        envelopes overlap the total bounds of the routing data are created, and their IDs (`ilat * nlon + ilon`) are
+        returned with them. The polygons of a shapefile are ordered by their `netcdf_input_field`.
+        """
         if self._input_is_netcdf:
-
-            lath = self._lath
-            lonh = self._lonh
-
-            for ilat in range(self._nlat):
-
-                for ilon in range(self._nlon):
-
-                    # -------------------------
-                    # EPSG:3035   needs a swap before and after transform ...
-                    # -------------------------
-                    # gridcell_edges = [ [lath[ilat,ilon]    , lonh[ilat,  ilon]    ],            # for some reason need to switch lat/lon that transform works
-                    #                    [lath[ilat+1,ilon]  , lonh[ilat+1,ilon]    ],
-                    #                    [lath[ilat+1,ilon+1], lonh[ilat+1,ilon+1]  ],
-                    #                    [lath[ilat,ilon+1]  , lonh[ilat,  ilon+1]  ]]
-
-                    # tmp = self._routing_data_to_geometry(gridcell_edges, epsg=crs_caea)
-                    # tmp.SwapXY()              # switch lat/lon back
-                    # grid_cell_geom_gpd_wkt[ilat][ilon] = tmp
-
-                    # -------------------------
-                    # EPSG:3573   does not need a swap after transform ... and is much faster than transform with EPSG:3035
-                    # -------------------------
-                    #
-                    # Windows            Python 3.8.5 GDAL 3.1.3 --> lat/lon (Ming)
-                    # MacOS 10.15.6      Python 3.8.5 GDAL 3.1.3 --> lat/lon (Julie)
-                    # Graham             Python 3.8.2 GDAL 3.0.4 --> lat/lon (Julie)
-                    # Graham             Python 3.6.3 GDAL 2.2.1 --> lon/lat (Julie)
-                    # Ubuntu 18.04.2 LTS Python 3.6.8 GDAL 2.2.3 --> lon/lat (Etienne)
-                    #
-                    if osgeo_version < "3.0":
-                        gridcell_edges = [
-                            [
-                                lonh[ilat, ilon],
-                                lath[ilat, ilon],
-                            ],  # for some reason need to switch lat/lon that transform works
-                            [lonh[ilat + 1, ilon], lath[ilat + 1, ilon]],
-                            [lonh[ilat + 1, ilon + 1], lath[ilat + 1, ilon + 1]],
-                            [lonh[ilat, ilon + 1], lath[ilat, ilon + 1]],
-                        ]
-                    else:
-                        gridcell_edges = [
-                            [
-                                lath[ilat, ilon],
-                                lonh[ilat, ilon],
-                            ],  # for some reason lat/lon order works
-                            [lath[ilat + 1, ilon], lonh[ilat + 1, ilon]],
-                            [lath[ilat + 1, ilon + 1], lonh[ilat + 1, ilon + 1]],
-                            [lath[ilat, ilon + 1], lonh[ilat, ilon + 1]],
-                        ]
-
-                    tmp = self._shape_to_geometry(
-                        gridcell_edges, epsg=RoutingProductGridWeightExtractor.CRS_CAEA
-                    )
-                    grid_cell_geom_gpd_wkt[ilat][ilon] = tmp
-
-        else:
-
-            for ishape in range(self._nlat):
-
-                idx = np.where(self._input_data[self._netcdf_input_field] == ishape)[0]
-                if len(idx) == 0:
-                    # print(
-                    #     "Polygon ID = {} not found in '{}'. Numbering of shapefile attribute '{}' needs to be [0 ... {}-1].".format(
-                    #         ishape, input_file, key_colname_model, nshapes
-                    #     )
-                    # )
-                    raise ValueError("Polygon ID not found.")
-                if len(idx) > 1:
-                    # print(
-                    #     "Polygon ID = {} found multiple times in '{}' but needs to be unique. Numbering of shapefile attribute '{}' needs to be [0 ... {}-1].".format(
-                    #         ishape, input_file, key_colname_model, nshapes
-                    #     )
-                    # )
-                    raise ValueError("Polygon ID not unique.")
-                idx = idx[0]
-                poly = self._input_data.loc[idx].geometry
-                grid_cell_geom_gpd_wkt[ishape][0] = ogr.CreateGeometryFromWkt(
-                    wkt.dumps(poly)
-                ).Buffer(
-                    0.0
-                )  # We add an empty buffer here to fix problems with bad polygon topology (actually caused by ESRI's historical incompetence)
-
-        return grid_cell_geom_gpd_wkt
+            # Same coordinates as the OGR transform of each cell of the original algorithm (lon/lat order with GDAL 2,
+            # lat/lon order with GDAL 3)
+            transformer = Transformer.from_crs(
+                RoutingProductGridWeightExtractor.CRS_LLDEG,
+                RoutingProductGridWeightExtractor.CRS_CAEA,
+                always_xy=True,
+            )
+            x, y = transformer.transform(self._lonh, self._lath)
+
+            # Corners of the cells, in the order of the original algorithm:
+            # (ilat, ilon), (ilat + 1, ilon), (ilat + 1, ilon + 1), (ilat, ilon + 1)
+            def corners(a):
+                return np.stack(
+                    [a[:-1, :-1], a[1:, :-1], a[1:, 1:], a[:-1, 1:]], axis=-1
+                ).reshape(-1, 4)
+
+            x, y = corners(x), corners(y)
+
+            # The edges of the cells are straight lines between the projected corners, so the envelope of a cell is
+            # the one of its corners
+            xmin, ymin, xmax, ymax = self._routing_data.total_bounds
+            inside = (
+                (x.min(axis=1) <= xmax)
+                & (x.max(axis=1) >= xmin)
+                & (y.min(axis=1) <= ymax)
+                & (y.max(axis=1) >= ymin)
+            )
+            cell_ids = np.flatnonzero(inside)
+
+            # Closed rings
+            ring = [0, 1, 2, 3, 0]
+            coords = np.stack([x[cell_ids][:, ring], y[cell_ids][:, ring]], axis=-1)
+            return shapely.polygons(coords), cell_ids
+
+        # Polygon IDs need to be unique and numbered [0 ... nshapes-1]
+        ids = self._input_data[self._netcdf_input_field].to_numpy()
+        in_range = np.isin(ids, np.arange(self._nlat))
+        counts = np.bincount(ids[in_range].astype(int), minlength=self._nlat)
+        invalid = np.flatnonzero(counts != 1)
+        if len(invalid):
+            if counts[invalid[0]] == 0:
+                raise ValueError("Polygon ID not found.")
+            raise ValueError("Polygon ID not unique.")
+
+        rows = np.empty(self._nlat, dtype=int)
+        rows[ids[in_range].astype(int)] = np.flatnonzero(in_range)
+
+        # We add an empty buffer here to fix problems with bad polygon topology (actually caused by ESRI's historical
+        # incompetence)
+        grid_cells = shapely.buffer(self._input_data.geometry.to_numpy()[rows], 0.0)
+        return grid_cells, np.arange(self._nlat)
 
     def _create_gridcells_from_centers(self, lat, lon):
 
@@ -683,18 +814,17 @@ class RoutingProductGridWeightExtractor:
         nlat = np.shape(lat)[0]
         lonh = np.empty((nlat + 1, nlon + 1), dtype=np.float64)
         lath = np.empty((nlat + 1, nlon + 1), dtype=np.float64)
-        tmp1 = [
-            [(lat[ii + 1, jj + 1] - lat[ii, jj]) / 2 for jj in range(nlon - 1)]
-            + [(lat[ii + 1, nlon - 1] - lat[ii, nlon - 2]) / 2]
-            for ii in range(nlat - 1)
-        ]
-        tmp2 = [
-            [(lon[ii + 1, jj + 1] - lon[ii, jj]) / 2 for jj in range(nlon - 1)]
-            + [(lon[ii + 1, nlon - 1] - lon[ii, nlon - 2]) / 2]
-            for ii in range(nlat - 1)
-        ]
-        dlat = np.array(tmp1 + [tmp1[-1]])
-        dlon = np.array(tmp2 + [tmp2[-1]])
+
+        def half_steps(a):
+            # Half of the diagonal steps between the centers, the last column using the step from the previous
+            # column, and the last row repeating the previous row
+            d = np.column_stack(
+                [(a[1:, 1:] - a[:-1, :-1]) / 2, (a[1:, -1] - a[:-1, -2]) / 2]
+            )
+            return np.vstack([d, d[-1:]])
+
+        dlat = half_steps(lat)
+        dlon = half_steps(lon)
         lonh[0:nlat, 0:nlon] = lon - dlon
         lath[0:nlat, 0:nlon] = lat - dlat
 
@@ -720,50 +850,6 @@ class RoutingProductGridWeightExtractor:
 
         return [lath, lonh]
 
-    def _shape_to_geometry(self, shape_from_jsonfile, epsg=None):
-
-        # converts shape read from shapefile to geometry
-        # epsg :: integer EPSG code
-
-        ring_shape = ogr.Geometry(ogr.wkbLinearRing)
-
-        for ii in shape_from_jsonfile:
-            ring_shape.AddPoint_2D(ii[0], ii[1])
-        # close ring
-        ring_shape.AddPoint_2D(shape_from_jsonfile[0][0], shape_from_jsonfile[0][1])
-
-        poly_shape = ogr.Geometry(ogr.wkbPolygon)
-        poly_shape.AddGeometry(ring_shape)
-
-        if epsg:
-            source = osr.SpatialReference()
-            # usual lat/lon projection
-            source.ImportFromEPSG(RoutingProductGridWeightExtractor.CRS_LLDEG)
-
-            target = osr.SpatialReference()
-            target.ImportFromEPSG(epsg)  # any projection to convert to
-
-            transform = osr.CoordinateTransformation(source, target)
-            poly_shape.Transform(transform)
-
-        return poly_shape
-
-    def _check_proximity_of_envelops(self, gridcell_envelop, shape_envelop):
-
-        # checks if two envelops are in proximity (intersect)
-
-        # minX  --> env[0]
-        # maxX  --> env[1]
-        # minY  --> env[2]
-        # maxY  --> env[3]
-
-        return (
-            gridcell_envelop[0] <= shape_envelop[1]
-            and gridcell_envelop[1] >= shape_envelop[0]
-            and gridcell_envelop[2] <= shape_envelop[3]
-            and gridcell_envelop[3] >= shape_envelop[2]
-        )
-
     def _check_gridcell_in_proximity_of_shape(
         self, gridcell_edges, shape_from_jsonfile
     ):
@@ -1,5 +1,8 @@
 import os
 
 from .base import Ostrich, Raven, RavenError, get_average_annual_runoff
+from .cache import ResultCache
 from .emulators import *
 from .multimodel import RavenMultiModel
+from .profiling import ProcessUsage, RunProfile
+from .results import RunResult
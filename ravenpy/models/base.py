@@ -6,8 +6,7 @@ The `Raven` class is the base class that implements model setup, execution and o
 class is the base class adapting `Raven` to work with the Ostrich calibration tool.
 
 """
-import collections
-import csv
+import asyncio
 import datetime as dt
 import operator
 import os
@@ -16,11 +15,15 @@ import shutil
 import stat
 import subprocess
 import tempfile
+import time
+import weakref
 import zipfile
 from collections import OrderedDict
-from dataclasses import astuple, fields, is_dataclass, replace
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from dataclasses import astuple, dataclass, fields, is_dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Union, cast
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union, cast
 from warnings import warn
 
 import numpy as np
@@ -31,25 +34,49 @@ import ravenpy
 from ravenpy.config.commands import (
     DataCommand,
     GriddedForcingCommand,
+    GridWeightsCommand,
     HRUsCommand,
     ObservationDataCommand,
     StationForcingCommand,
 )
 from ravenpy.config.rvs import RVC, Config
+from ravenpy.config.states import ModelState, StateEnsemble
+
+from .cache import ResultCache
+from .profiling import ProcessUsage, RunProfile
+from .results import RunResult
 
 RAVEN_EXEC_PATH = os.getenv("RAVENPY_RAVEN_BINARY_PATH") or shutil.which("raven")
 OSTRICH_EXEC_PATH = os.getenv("RAVENPY_OSTRICH_BINARY_PATH") or shutil.which("ostrich")
 
 RAVEN_NO_DATA_VALUE = -1.2345
 
+# Versions of the Raven binaries, keyed by binary path and modification time
+_raven_versions: Dict[Tuple[str, int], str] = {}
+
+# Maximum number of processes running at the same time for all the asynchronous runs of an event loop
+MAX_CONCURRENT_RUNS = (
+    int(os.getenv("RAVENPY_MAX_CONCURRENT_RUNS", 0)) or os.cpu_count() or 1
+)
+
+# Lines of the RV files holding the rendering time, which differ every time the same configuration is rendered
+_VOLATILE_LINES = re.compile(r"^(:CreationDate|:NetCDFAttribute history).*$", re.M)
+
+_async_semaphores: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
 
 class RavenError(Exception):
     """
     This is an error that is meant to be raised whenever a message of type "ERROR" is found
     in the Raven_errors.txt file resulting from a Raven (i.e. the C program) run.
+
+    The `errors` attribute holds the error messages keyed by parallel simulation index, or by model identifier for
+    a `RavenMultiModel`.
     """
 
-    pass
+    def __init__(self, *args, errors: Optional[Dict[Any, List[str]]] = None):
+        super().__init__(*args)
+        self.errors = errors or {}
 
 
 class RavenWarning(Warning):
@@ -61,6 +88,53 @@ class RavenWarning(Warning):
     pass
 
 
+@dataclass
+class _ModelRun:
+    """Description of one Raven (or Ostrich) process, i.e. one element of the parallel dimension."""
+
+    psim: int
+    cmd: List
+    cwd: Path
+    output_path: Path
+    inputs: Tuple[Path, ...] = ()
+    proc: Optional[Union[subprocess.Popen, asyncio.subprocess.Process]] = None
+    # Key of the simulation in the result cache, and whether its outputs were restored from it
+    cache_key: Optional[str] = None
+    cached: bool = False
+    # Wall time of the process, in seconds
+    wall: Optional[float] = None
+    # Resources used by the process
+    usage: Optional[ProcessUsage] = None
+
+
+def _communicate(proc: subprocess.Popen, input=None):
+    """Send `input` to the process, wait for it to terminate and return the resources it used.
+
+    Where `os.wait4` is available, the process is reaped with it once its output has been read, so as to get the
+    `resource.struct_rusage` of this process alone. Elsewhere, the process is reaped by `Popen.communicate` and None
+    is returned.
+    """
+    if not hasattr(os, "wait4"):
+        proc.communicate(input=input)
+        return None
+
+    if proc.stdin is not None:
+        try:
+            if input:
+                proc.stdin.write(input)
+            proc.stdin.close()
+        except BrokenPipeError:
+            # The process exited without reading its input
+            pass
+    if proc.stdout is not None:
+        proc.stdout.read()
+        proc.stdout.close()
+
+    _, sts, rusage = os.wait4(proc.pid, 0)
+    proc.returncode = -os.WTERMSIG(sts) if os.WIFSIGNALED(sts) else os.WEXITSTATUS(sts)
+    return rusage
+
+
 class Raven:
     """RAVEN hydrological model wrapper.
 
@@ -83,6 +157,9 @@ class Raven:
         "region_id",
     ]
 
+    # Whether the simulations can be executed in `scratch_dir`
+    _supports_scratch = True
+
     # This is just to satisfy mypy, which wants to know about this internal class defined
     # by the emulators (which are Raven subclasses)
     Params: Any
@@ -98,43 +175,29 @@ class Raven:
         Directory for the model configuration and outputs. If None, a temporary directory will be created.
         """
 
-        if not RAVEN_EXEC_PATH:
-            raise RuntimeError(
-                "Could not find raven binary in PATH, and RAVENPY_RAVEN_BINARY_PATH env variable is not set"
-            )
-
-        if not OSTRICH_EXEC_PATH:
-            raise RuntimeError(
-                "Could not find ostrich binary in PATH, and RAVENPY_OSTRICH_BINARY_PATH env variable is not set"
-            )
-
-        self.raven_exec = RAVEN_EXEC_PATH
-        self.ostrich_exec = OSTRICH_EXEC_PATH
-
-        # Get version from Raven binary CLI output
-        out = subprocess.check_output([self.raven_exec], input="\n", text=True)
-        match = re.search(r"Version (\S+) ", out)
-        if match:
-            self.raven_version = match.groups()[0]
-        else:
-            raise AttributeError(f"Raven version not found: {out}")
-
-        # Remove this file that has been produced by the previous raven call to get the version
-        try:
-            os.remove("Raven_errors.txt")
-        except OSError:
-            pass
+        # The binaries and the Raven version are only resolved when first needed
+        self._raven_exec: Optional[str] = None
+        self._ostrich_exec: Optional[str] = None
+        self._raven_version: Optional[str] = None
 
         self.workdir = Path(os.path.realpath(workdir or tempfile.mkdtemp()))
 
         # Individual files for all simulations
         self.ind_outputs: Dict[str, List[Path]] = {}
-        # Aggregated files
-        self.outputs: Dict[str, Union[Path, str]] = {}
+        # Aggregated files (NetCDF outputs of parallel simulations are lazily concatenated datasets)
+        self.outputs: Dict[str, Union[Path, str, xr.Dataset]] = {}
+        # Cached accessor to the outputs of the last run
+        self._results: Optional[RunResult] = None
 
         # Explicit paths of every rendered RV file
         self._rv_paths: List[Path] = []
 
+        # Paths of the RV files written for the previous simulation of the current run, keyed by extension
+        self._rv_written: Dict[str, Path] = {}
+
+        # Grid weights written for the previous simulation of the current run, and their path
+        self._grid_weights_written: Optional[Tuple[GridWeightsCommand, Path]] = None
+
         # Directory logic
         # Top directory inside workdir. This is where Ostrich and its config and templates are stored.
         self.model_dir = "model"  # Path to the model configuration files.
@@ -156,8 +219,103 @@ class Raven:
         self._psim = 0
         self._pdim = ""  # Parallel dimension (either initparam, params or region)
 
+        # Maximum number of Raven processes running at the same time (if None, the number of CPUs)
+        self.max_workers: Optional[int] = None
+
+        # Opt-in cache of simulation outputs, keyed by the content of the simulation inputs
+        self.cache: Optional[ResultCache] = None
+
+        # Output files of the simulations of the last run, keyed by parallel simulation index
+        self._run_outputs: Dict[int, Dict[str, List[Path]]] = {}
+
+        # Resources used by the processes of the last run, keyed by parallel simulation index
+        self._run_usage: Dict[int, ProcessUsage] = {}
+
+        # Messages of the Raven_errors.txt file of each simulation of the last run (see `parse_raven_messages`),
+        # keyed by parallel simulation index
+        self.raven_messages: Dict[int, Dict[str, Any]] = {}
+
+        # Local directory (e.g. /dev/shm) in which the simulations are executed instead of the work directory.
+        # The outputs are copied to the final directory, then the execution directory is removed.
+        self.scratch_dir: Optional[Union[str, Path]] = os.getenv("RAVENPY_SCRATCH_DIR")
+
+        # Outputs copied from the scratch directory (e.g. ["hydrograph"]). If None, all outputs are copied.
+        self.scratch_outputs: Optional[Sequence[str]] = None
+
+        # Execution directory in `scratch_dir` of the current run, and whether the last run was executed in it
+        self._scratch_path: Optional[Path] = None
+        self._scratch_run = False
+
+        # Whether to record the time spent in the phases of each run (see `timings`)
+        self.profile: bool = os.getenv("RAVENPY_PROFILE", "").lower() in [
+            "1",
+            "true",
+            "yes",
+        ]
+
+        # JSON lines file to which the timings of each run are appended (enables profiling)
+        self.profile_file: Optional[Union[str, Path]] = os.getenv(
+            "RAVENPY_PROFILE_FILE"
+        )
+
+        # Timings of the last run, if profiled
+        self.timings: Optional[RunProfile] = None
+
         self.config = Config(model=self)
 
+    @property
+    def raven_exec(self) -> str:
+        """Path to the Raven binary."""
+        if self._raven_exec is None:
+            if not RAVEN_EXEC_PATH:
+                raise RuntimeError(
+                    "Could not find raven binary in PATH, and RAVENPY_RAVEN_BINARY_PATH env variable is not set"
+                )
+            self._raven_exec = RAVEN_EXEC_PATH
+        return self._raven_exec
+
+    @raven_exec.setter
+    def raven_exec(self, value):
+        self._raven_exec = value
+        self._raven_version = None
+
+    @property
+    def ostrich_exec(self) -> str:
+        """Path to the Ostrich binary."""
+        if self._ostrich_exec is None:
+            if not OSTRICH_EXEC_PATH:
+                raise RuntimeError(
+                    "Could not find ostrich binary in PATH, and RAVENPY_OSTRICH_BINARY_PATH env variable is not set"
+                )
+            self._ostrich_exec = OSTRICH_EXEC_PATH
+        return self._ostrich_exec
+
+    @ostrich_exec.setter
+    def ostrich_exec(self, value):
+        self._ostrich_exec = value
+
+    @property
+    def raven_version(self) -> str:
+        """Version of the Raven binary."""
+        if self._raven_version is None:
+            self._raven_version = get_raven_version(self.raven_exec)
+        return self._raven_version
+
+    @raven_version.setter
+    def raven_version(self, value):
+        # Set the version without probing the binary, until `raven_exec` is changed
+        self._raven_version = value
+
+    @property
+    def grid_weights_file(self) -> Optional[str]:
+        """Name of the file holding the grid weights shared by the forcing commands of the RVT.
+
+        When the model writes the RV files of a simulation, the file is written next to the RVT, whose forcing
+        commands refer to it with `:RedirectToFile` instead of inlining the weights. None if the model inlines the
+        weights (e.g. `Ostrich`, which only copies the RV files to the directory in which it runs Raven).
+        """
+        return f"{self.identifier}_grid_weights.rvt"
+
     @property
     def output_path(self):
         return self.model_path / self.output_dir
@@ -220,23 +378,87 @@ class Raven:
             self.config.set_rv_file(fn)
 
     def _dump_rv(self):
-        """Write configuration files to disk."""
-
-        # identifier = self.config.identifier
+        """Write configuration files to disk.
 
-        for rvx in ["rvt", "rvh", "rvp", "rvc", "rvi"]:
-            rvo = getattr(self.config, rvx)
-            if rvo.is_ostrich_tmpl:
-                fn = self.exec_path / f"{self.identifier}.{rvx}.tpl"
-            else:
-                fn = self.model_path / f"{self.identifier}.{rvx}"
-            with open(fn, "w") as f:
+        The RV files that were not modified since the previous simulation of the run are not rendered again, but
+        hard-linked from the directory of the previous simulation. Changes made in place to the records of an RV
+        (e.g. `rvh.hrus[0].area = ...`) are not tracked, and must be flagged with `RV.set_modified`.
+        """
+        rvxs = ["rvt", "rvh", "rvp", "rvc", "rvi"]
+        modified = {rvx: bool(getattr(self.config, rvx).modified) for rvx in rvxs}
+
+        # The RVT is rendered using the HRUs of the RVH
+        modified["rvt"] |= modified["rvh"]
+
+        # The forcing commands of the RVT refer to the grid weights written next to it
+        with self.config.rvt.redirect_grid_weights(self.grid_weights_file):
+            for rvx in rvxs:
+                rvo = getattr(self.config, rvx)
+                if rvo.is_ostrich_tmpl:
+                    fn = self.exec_path / f"{self.identifier}.{rvx}.tpl"
+                else:
+                    fn = self.model_path / f"{self.identifier}.{rvx}"
                 self._rv_paths.append(fn)
-                content = rvo.content or rvo.to_rv()
+
+                previous = self._rv_written.get(rvx)
+                if previous and not modified[rvx]:
+                    if previous != fn:
+                        _link_or_copy(previous, fn)
+                    if rvx == "rvt" and self._grid_weights_written:
+                        self._link_grid_weights(self._grid_weights_written[1])
+                    continue
+
+                # The file might be hard-linked to the file of another simulation
+                if os.path.lexists(fn):
+                    os.remove(fn)
+                # The rendered RV is streamed to the file, without holding large tables in memory
+                with open(fn, "w") as f:
+                    if rvo.content:
+                        f.write(rvo.content)
+                    else:
+                        rvo.write_to(f)
+                    empty = f.tell() == 0
                 assert (
-                    content.strip()
+                    not empty
                 ), f"{rvx} has no content! (did you forget to use `RV.set_tmpl`?)"
-                f.write(content)
+
+                rvo.reset_modified()
+                self._rv_written[rvx] = fn
+
+                if rvx == "rvt":
+                    self._dump_grid_weights()
+
+    def _dump_grid_weights(self):
+        """Write the grid weights shared by the forcing commands of the RVT.
+
+        The file is only written once for all the simulations of a run using the same grid weights, and hard-linked
+        in the directory of the other simulations.
+        """
+        gw = self.config.rvt.forcing_grid_weights()
+        if gw is None or not self.grid_weights_file:
+            self._grid_weights_written = None
+            return
+
+        if self._grid_weights_written:
+            previous_gw, previous = self._grid_weights_written
+            if gw is previous_gw or gw == previous_gw:
+                self._link_grid_weights(previous)
+                return
+
+        fn = self.model_path / self.grid_weights_file
+        if os.path.lexists(fn):
+            os.remove(fn)
+        with open(fn, "w") as f:
+            gw.write_to(f)
+        self._rv_paths.append(fn)
+        self._grid_weights_written = (gw, fn)
+
+    def _link_grid_weights(self, previous: Path):
+        """Hard-link the grid weights file of a previous simulation in the model directory."""
+        fn = self.model_path / previous.name
+        if fn != previous:
+            _link_or_copy(previous, fn)
+        self._rv_paths.append(fn)
 
     def setup(self, overwrite=False):
         """Create directory structure to store model input files, executable and output results.
@@ -247,7 +469,24 @@ class Raven:
         model/
         output/
 
+        If `scratch_dir` is set, the execution directory is instead created in `scratch_dir`, and removed once the
+        outputs have been copied to the final directory.
         """
+        self._close_outputs()
+        self._cleanup_scratch()
+        self.timings = (
+            RunProfile(self.identifier) if self.profile or self.profile_file else None
+        )
+        if self.scratch_dir and self._supports_scratch:
+            os.makedirs(self.scratch_dir, exist_ok=True)
+            self._scratch_path = Path(
+                tempfile.mkdtemp(prefix="ravenpy-", dir=self.scratch_dir)
+            )
+            self.exec_path = self._scratch_path
+        else:
+            self.exec_path = self.workdir / "exec"
+        self._scratch_run = self._scratch_path is not None
+
         if overwrite:
             if self.model_path.exists():
                 shutil.rmtree(str(self.exec_path))
@@ -271,14 +510,16 @@ class Raven:
           Run index (starts at 1)
         """
         # Compute derived parameters
-        self.derived_parameters()
+        with self._timer("derived_parameters", self.psim):
+            self.derived_parameters()
 
         # Write configuration files in model directory
         if not self.model_path.exists():
             os.makedirs(self.model_path)
             os.makedirs(self.output_path)
 
-        self._dump_rv()
+        with self._timer("_dump_rv", self.psim):
+            self._dump_rv()
 
         # Create symbolic link to input files
         for fn in ts:
@@ -291,7 +532,7 @@ class Raven:
 
         return self.bash_cmd
 
-    def run(self, ts, overwrite=False, **kwds):
+    def run(self, ts, overwrite=False, max_workers=None, **kwds):
         """Run the model.
 
         Parameters
@@ -300,19 +541,44 @@ class Raven:
           Sequence of input file paths. Symbolic links to those files will be created in the model directory.
         overwrite : bool
           Whether or not to overwrite existing model and output files.
+        max_workers : int, optional
+          Maximum number of Raven processes running at the same time. Defaults to `self.max_workers`, or to the
+          number of CPUs if it is not set.
         **kwds : dict
-          Raven parameters used to fill configuration file templates.
+          Raven parameters used to fill configuration file templates. The parallel parameters (`params`,
+          `hru_state`, `basin_state`, `nc_index`, ...) can be given one value per simulation. The `hru_state` (or
+          `basin_state`) can also be a `StateEnsemble`, whose members set all the initial HRU and basin states of
+          each simulation. If both are a `StateEnsemble`, the HRU states of `hru_state` are combined with the basin
+          states of `basin_state` (see `StateEnsemble.merge`).
+
+        Returns
+        -------
+        list
+          The completed processes, in parallel simulation order (None for the simulations whose outputs were
+          restored from `self.cache`).
 
         Create a work directory with a model/ and output/ subdirectories, write the configuration files in model/ and
         launch the Raven executable. If the configuration files are templates, values can be formatted by passing
         dictionaries keyed by their extension.
 
+        Simulations along the parallel dimension are launched as worker slots free up, and the output files of each
+        simulation are collected as soon as it completes.
+
         Examples
         --------
         >>> r = Raven()
         >>> r.configure(rvi='path to template', rvp='...'}
         >>> r.run(ts, start_date=dt.datetime(2000, 1, 1), area=1000, X1=67)
 
+        """
+        runs = self._prepare_runs(ts, **kwds)
+        max_workers = max_workers or self.max_workers or os.cpu_count() or 1
+        return self._execute_runs(runs, max_workers)
+
+    def _prepare_runs(self, ts, **kwds) -> Iterator[_ModelRun]:
+        """Update the configuration with the run parameters and return an iterator over the parallel simulations.
+
+        The configuration files of each simulation are only written to disk when the iterator reaches it.
         """
         if isinstance(ts, (str, Path)):
             ts = [ts]
@@ -326,7 +592,10 @@ class Raven:
                 hru_attrs[k] = v[0] if isinstance(v, list) else v
         if hru_attrs:
             assert len(self.config.rvh.hrus) == 1
-            self.config.rvh.hrus = (replace(self.config.rvh.hrus[0], **hru_attrs),)
+            # Only the new attributes are validated
+            self.config.rvh.hrus = (
+                self.config.rvh.hrus[0].copy(hru_attrs, validate=True),
+            )
 
         # Case for potentially parallel parameters
         pdict = {}
@@ -340,6 +609,11 @@ class Raven:
                     pdict[p] = np.atleast_1d(val)
                 else:
                     pdict[p] = np.atleast_2d(val)
+            elif isinstance(val, StateEnsemble):
+                # The states of each member, as views on the arrays of the ensemble
+                pdict[p] = np.empty(len(val), dtype=object)
+                for i, state in enumerate(val):
+                    pdict[p][i] = state
             else:
                 pdict[p] = np.atleast_1d(val)
 
@@ -388,101 +662,421 @@ class Raven:
         if ts_ncs and self.config.rvt._auto_nc_configure:
             self.config.rvt.configure_from_nc_data(ts_ncs)
 
+        return self._iter_runs(tuple(map(Path, ts)), pdict, nloops)
+
+    def _iter_runs(self, ts, pdict, nloops) -> Iterator[_ModelRun]:
+        # All the RV files are written for the first simulation
+        self._rv_paths = []
+        self._rv_written = {}
+        self._grid_weights_written = None
+
         # Loop over parallel parameters - sets self.rvi.run_index
-        procs = []
         for self.psim in range(nloops):
-            for key, val in pdict.items():
-                if val[self.psim] is not None:
-                    if key == "hru_state":
-                        self.config.rvc.set_hru_state(val[self.psim])
-                    elif key == "basin_state":
-                        self.config.rvc.set_basin_state(val[self.psim])
-                    else:
-                        self.config.update(key, val[self.psim])
+            values = {
+                key: val[self.psim]
+                for key, val in pdict.items()
+                if val[self.psim] is not None
+            }
+            hru_state, basin_state = values.get("hru_state"), values.get("basin_state")
+            if isinstance(hru_state, ModelState) and isinstance(
+                basin_state, ModelState
+            ):
+                # e.g. the `hru_view` and `basin_view` of an ensemble
+                values["hru_state"] = ModelState.merge(hru_state, basin_state)
+                del values["basin_state"]
+
+            # The states of a `StateEnsemble` member replace all the HRU and basin states, so they are set before the
+            # single HRU and basin state records
+            for key, val in sorted(
+                values.items(), key=lambda kv: not isinstance(kv[1], ModelState)
+            ):
+                if isinstance(val, ModelState):
+                    self.config.rvc.set_state(val)
+                elif key == "hru_state":
+                    self.config.rvc.set_hru_state(val)
+                elif key == "basin_state":
+                    self.config.rvc.set_basin_state(val)
+                else:
+                    self.config.update(key, val)
+
+            with self._timer("setup_model_run", self.psim):
+                cmd = self.setup_model_run(ts)
+
+            # Left by a previous run in the same directory
+            err_file = self.output_path / "Raven_errors.txt"
+            if err_file.exists():
+                err_file.unlink()
+
+            yield _ModelRun(
+                psim=self.psim,
+                cmd=cmd,
+                cwd=self.cmd_path,
+                output_path=self.output_path,
+                inputs=ts,
+            )
 
-            cmd = self.setup_model_run(tuple(map(Path, ts)))
+    def _execute_runs(self, runs: Iterator[_ModelRun], max_workers: int) -> List:
+        """Execute the simulations with at most `max_workers` processes running at the same time.
 
-            procs.append(
-                subprocess.Popen(
-                    cmd,
-                    cwd=self.cmd_path,
-                    stdin=subprocess.PIPE,
-                    stdout=subprocess.PIPE,
-                    universal_newlines=True,
-                )
-            )
+        The next simulation is only set up once a worker slot is available, and the outputs of every simulation are
+        collected as soon as it completes, while the others are still running.
+        """
+        self._reset_runs()
+        done_runs = self._execute_model_runs(((self, run) for run in runs), max_workers)
+        return [
+            run.proc for run in sorted(done_runs[self], key=operator.attrgetter("psim"))
+        ]
+
+    @staticmethod
+    def _execute_model_runs(
+        runs: Iterator[Tuple["Raven", _ModelRun]], max_workers: int
+    ) -> Dict["Raven", List[_ModelRun]]:
+        """Execute the simulations of one or more models in a single pool of `max_workers` processes.
+
+        Each simulation is collected by the model that set it up. Returns the completed simulations of each model.
+        """
+        done_runs: Dict[Raven, List[_ModelRun]] = {}
 
-        return procs
+        def collect(model, run):
+            done_runs.setdefault(model, []).append(model._collect_run(run))
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending: Dict[Future, Raven] = {}
+            for model, run in runs:
+                if model._restore_run(run):
+                    collect(model, run)
+                    continue
+                while len(pending) >= max_workers:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for f in done:
+                        collect(pending.pop(f), f.result())
+                pending[executor.submit(Raven._execute_run, run)] = model
+
+            for f in wait(pending).done:
+                collect(pending[f], f.result())
+
+        return done_runs
+
+    def _reset_runs(self):
+        """Forget the outputs and messages of the simulations of the previous run."""
+        self._run_outputs = {}
+        self._run_usage = {}
+        self.raven_messages = {}
+
+    @staticmethod
+    def _execute_run(run: _ModelRun) -> _ModelRun:
+        """Launch the process of a single simulation and wait for it to complete."""
+        start = time.perf_counter()
+        run.proc = subprocess.Popen(
+            run.cmd,
+            cwd=run.cwd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+        )
+        # When Raven errors right away (for instance if it's missing an RV file)
+        # it asks for a RETURN to exit
+        rusage = _communicate(run.proc, input="\n")
+        run.wall = time.perf_counter() - start
+        if rusage is not None:
+            run.usage = ProcessUsage.from_rusage(run.psim, rusage, run.wall)
+        return run
+
+    def _collect_run(self, run: _ModelRun) -> _ModelRun:
+        """Store the messages and output files of a completed simulation."""
+        if run.usage is not None:
+            self._run_usage[run.psim] = run.usage
+        if self.timings is not None and run.wall is not None:
+            cpu = run.usage.cpu_time if run.usage is not None else None
+            self.timings.add("execute", run.psim, run.wall, cpu)
+
+        err_file = run.output_path / "Raven_errors.txt"
+        self.raven_messages[run.psim] = parse_raven_messages(
+            err_file.read_text() if err_file.exists() else ""
+        )
+
+        patterns = self._output_patterns(self.config.rvi.run_name or "")
+        self._run_outputs[run.psim] = {
+            key: sorted(f.absolute() for f in run.output_path.glob(pattern))
+            for key, pattern in patterns.items()
+        }
+        if run.cache_key and not run.cached:
+            self._store_run(run)
+        return run
+
+    def _cache_key(self, run: _ModelRun) -> str:
+        """Return the key identifying the inputs of a simulation in the result cache."""
+        rvs = [
+            _VOLATILE_LINES.sub("", fn.read_text())
+            for fn in sorted(run.cwd.glob(f"{self.identifier}*.rv?"))
+        ]
+        forcings = sorted(self.cache.file_signature(fn) for fn in run.inputs)  # type: ignore
+        return self.cache.key(  # type: ignore
+            self.raven_version, self.identifier, *rvs, *forcings
+        )
+
+    def _restore_run(self, run: _ModelRun) -> bool:
+        """Restore the outputs of a simulation from the result cache. Return whether they were found."""
+        if self.cache is None:
+            return False
+        run.cache_key = self._cache_key(run)
+        run.cached = self.cache.restore(run.cache_key, run.output_path)
+        return run.cached
+
+    def _store_run(self, run: _ModelRun):
+        """Store the outputs of a successful simulation in the result cache."""
+        messages = self.raven_messages[run.psim]
+        if messages["ERROR"] or not messages["SIMULATION COMPLETE"]:
+            return
+        err_file = run.output_path / "Raven_errors.txt"
+        files = [f for fns in self._run_outputs[run.psim].values() for f in fns]
+        self.cache.store(run.cache_key, files + [err_file])  # type: ignore
 
     def __call__(self, ts, overwrite=False, **kwds):
         self.setup(overwrite)
 
-        procs = self.run(ts, overwrite, **kwds)
+        try:
+            self.run(ts, overwrite, **kwds)
+
+            self._finalize()
+        finally:
+            self._cleanup_scratch()
+            self._write_profile()
+
+    async def arun(self, ts, overwrite=False, **kwds):
+        """Run the model asynchronously.
+
+        This is the coroutine equivalent of calling the model: `await model.arun(ts, **kwds)` behaves like
+        `model(ts, **kwds)`, but the processes are launched with `asyncio.create_subprocess_exec`, so that many
+        simulations can be multiplexed in a single event loop. The number of processes running at the same time is
+        bounded by a semaphore shared by all the asynchronous runs of the event loop (see `MAX_CONCURRENT_RUNS`).
+
+        Cancelling the task kills the processes that are still running.
+        """
+        self.setup(overwrite)
+
+        semaphore = _get_async_semaphore()
+        self._reset_runs()
+        tasks: List[asyncio.Future] = []
+        try:
+            try:
+                for run in self._prepare_runs(ts, **kwds):
+                    if self._restore_run(run):
+                        self._collect_run(run)
+                        continue
+                    await semaphore.acquire()
+                    task = asyncio.ensure_future(self._aexecute_run(run))
+                    # Released when the task is done, even if it is cancelled before it starts
+                    task.add_done_callback(lambda _: semaphore.release())
+                    tasks.append(task)
+                await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+
+            self._finalize()
+        finally:
+            self._cleanup_scratch()
+            self._write_profile()
+
+    async def _aexecute_run(self, run: _ModelRun) -> _ModelRun:
+        """Launch the process of a single simulation, wait for it to complete and collect its outputs."""
+        start = time.perf_counter()
+        run.proc = await asyncio.create_subprocess_exec(
+            *map(str, run.cmd),
+            cwd=run.cwd,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+        )
+        try:
+            # When Raven errors right away it asks for a RETURN to exit
+            await run.proc.communicate(input=b"\n")
+        except asyncio.CancelledError:
+            run.proc.kill()
+            await run.proc.wait()
+            raise
 
-        for proc in procs:
-            # When Raven errors right away (for instance if it's missing an RV file)
-            # it asks for a RETURN to exit
-            proc.communicate(input="\n")
-            proc.wait()
+        run.wall = time.perf_counter() - start
+        return self._collect_run(run)
 
-        messages = self.extract_raven_messages()
+    def _finalize(self):
+        """Check the messages emitted by Raven and store the output files."""
+        with self._timer("extract_raven_messages"):
+            messages = self.extract_raven_messages()
 
         if messages["ERROR"]:
-            raise RavenError("\n".join(messages["ERROR"]))
+            raise RavenError("\n".join(messages["ERROR"]), errors=self._raven_errors())
 
         for msg in messages["WARNING"]:
             warn(msg, category=RavenWarning)
 
         assert messages["SIMULATION COMPLETE"]
 
-        self.parse_results()
+        with self._timer("parse_results"):
+            self.parse_results()
+
+    def _timer(self, phase: str, psim: Optional[int] = None):
+        """Return a context manager recording the time spent in a phase of the run, if it is profiled."""
+        if self.timings is None:
+            return nullcontext()
+        return self.timings.timer(phase, psim)
+
+    def _write_profile(self):
+        """Append the timings of the last run to `profile_file`, if set."""
+        if self.timings is not None and self.profile_file:
+            self.timings.write_jsonl(self.profile_file)
 
     def resume(self, solution=None):
         """Set the initial state to the state at the end of the last run.
 
         Parameters
         ----------
-        solution : str, Path
-          Path to solution file. If None, will use solution from last model run if any.
+        solution : str, Path, ModelState
+          Path to solution file, or to a state snapshot (`.npz` or `.nc`, see `ModelState.save`), or the states
+          themselves. If None, will use solution from last model run if any.
         """
         if solution is None:
             fn = self.outputs["solution"]
         else:
             fn = solution
 
-        self.config.rvc.parse_solution(Path(fn).read_text())
+        if isinstance(fn, ModelState):
+            self.config.rvc.set_state(fn)
+        elif Path(fn).suffix in [".npz", ".nc"]:
+            self.config.rvc.set_state(ModelState.load(fn))
+        else:
+            self.config.rvc.parse_solution(Path(fn).read_text())
+
+    def _raven_errors(self) -> Dict[Any, List[str]]:
+        """Return the error messages of the last run, keyed by parallel simulation index."""
+        return {
+            psim: msgs["ERROR"]
+            for psim, msgs in self.raven_messages.items()
+            if msgs["ERROR"]
+        }
 
     def parse_results(self, path=None, run_name=None):
         """Store output files in the self.outputs dictionary."""
         # Output files default names. The actual output file names will be composed of the run_name and the default
         # name.
-        path = path or self.exec_path
         run_name = run_name or self.config.rvi.run_name or ""
-        patterns = {
-            "hydrograph": f"{run_name}*Hydrographs.nc",
-            "storage": f"{run_name}*WatershedStorage.nc",
-            "solution": f"{run_name}*solution.rvc",
-            "diagnostics": f"{run_name}*Diagnostics.csv",
-        }
+        patterns = self._output_patterns(run_name)
+
+        self._close_outputs()
 
         for key, pattern in patterns.items():
+            if (
+                self._scratch_run
+                and self.scratch_outputs is not None
+                and key not in self.scratch_outputs
+            ):
+                # Left in the scratch directory, which is removed after the run
+                self.ind_outputs.pop(key, None)
+                self.outputs.pop(key, None)
+                continue
+
             # There are no diagnostics if a streamflow time series is not provided.
             try:
-                fns = self._get_output(pattern, path=path)
+                if path is None and self._run_outputs:
+                    # Outputs collected as the simulations completed, in parallel simulation order
+                    fns = self._get_run_output(key, pattern)
+                else:
+                    fns = self._get_output(pattern, path=path or self.exec_path)
+                    fns.sort()
             except UserWarning as exc:
                 if key != "diagnostics":
                     raise exc
                 else:
                     continue
 
-            fns.sort()
+            if self._scratch_path:
+                fns = [self._promote_output(fn) for fn in fns]
+
             self.ind_outputs[key] = fns
             self.outputs[key] = self._merge_output(fns, pattern.replace("*", "_ALL_"))
 
         self.outputs["rv_config"] = self._merge_output(self._rv_paths, "rv.zip")
 
+    def _promote_output(self, fn: Path) -> Path:
+        """Copy an output file from the scratch directory to the final directory."""
+        out = self.final_path / fn.relative_to(self.exec_path / self.model_dir)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(fn, out)
+        return out
+
+    def _close_outputs(self):
+        """Close the outputs of the last run, before their files are overwritten."""
+        if self._results is not None:
+            self._results.close()
+            self._results = None
+        for out in self.outputs.values():
+            if isinstance(out, xr.Dataset):
+                out.close()
+
+    def materialize(
+        self, path: Union[str, Path], key: str = "hydrograph", format: str = "netcdf"
+    ) -> Path:
+        """Write an output to a single file.
+
+        The NetCDF outputs of parallel simulations are lazily concatenated views over the files of the individual
+        simulations, and no merged file is written by default. Use this method when a single file is needed.
+
+        Parameters
+        ----------
+        path : str or Path
+          Path of the new file (a directory for zarr).
+        key : {"hydrograph", "storage"}
+          Output to write.
+        format : {"netcdf", "zarr"}
+          File format. Writing zarr stores requires the `zarr` package.
+
+        Returns
+        -------
+        Path
+          Path of the new file.
+        """
+        if format not in ["netcdf", "zarr"]:
+            raise ValueError(f"Unsupported format: {format}")
+
+        path = Path(path)
+        out = self.outputs[key]
+        with (out if isinstance(out, xr.Dataset) else xr.open_dataset(out)) as ds:
+            if format == "netcdf":
+                ds.to_netcdf(path)
+            else:
+                ds.to_zarr(path, mode="w")
+        return path
+
+    def _cleanup_scratch(self):
+        """Remove the scratch execution directory of the last run, if any.
+
+        The execution directory is then the final directory, and the outputs collected from the simulations are the
+        copies promoted to the final directory, so that the outputs of the run can be parsed again. The RV files are
+        only kept in the `rv_config` archive.
+        """
+        if self._scratch_path:
+            model_dir = self.exec_path / self.model_dir
+            for outputs in self._run_outputs.values():
+                for key, fns in outputs.items():
+                    promoted = (
+                        self.final_path / fn.relative_to(model_dir) for fn in fns
+                    )
+                    outputs[key] = [fn for fn in promoted if fn.exists()]
+            rv_config = self.outputs.get("rv_config")
+            self._rv_paths = [rv_config] if rv_config else []
+
+            shutil.rmtree(self._scratch_path, ignore_errors=True)
+            self._scratch_path = None
+            self.exec_path = self.final_path
+
     def _merge_output(self, files, name):
-        """Merge multiple output files into one if possible, otherwise return a list of files."""
+        """Merge multiple output files into one if possible, otherwise return a list of files.
+
+        NetCDF files are merged into a lazily concatenated dataset, backed by dask arrays reading the original
+        files: no new file is written (see `materialize`).
+        """
         # If there is only one file, return its name directly.
         from .multimodel import RavenMultiModel
 
@@ -493,12 +1087,16 @@ class Raven:
         outfn = self.final_path / name
 
         if name.endswith(".nc") and not isinstance(self, RavenMultiModel):
-            ds = [xr.open_dataset(fn) for fn in files]
             try:
                 # We aggregate along the pdim dimensions.
-                out = xr.concat(ds, self._pdim, data_vars="all")
-                out.to_netcdf(outfn)
-                return outfn
+                return xr.open_mfdataset(
+                    files,
+                    combine="nested",
+                    concat_dim=self._pdim,
+                    data_vars="all",
+                    coords="different",
+                    compat="equals",
+                )
             except (ValueError, KeyError):
                 pass
 
@@ -518,33 +1116,38 @@ class Raven:
 
     def extract_raven_messages(self):
         """
-        Parse all the Raven_errors and extract the messages, structured by types.
+        Return the messages of all the simulations of the last run, structured by types.
+
+        The messages of each simulation are parsed when it completes (see `raven_messages`). If the run has multiple
+        simulations, the messages are prefixed with the index of the simulation that emitted them, and the
+        simulation is only complete if all the simulations are.
         """
-        err_filepaths = self.exec_path.rglob("Raven_errors.txt")
-        messages = {
-            "ERROR": [],
-            "WARNING": [],
-            "ADVISORY": [],
-            "SIMULATION COMPLETE": False,
+        return merge_raven_messages(self.raven_messages)
+
+    @staticmethod
+    def _output_patterns(run_name):
+        """Return the glob patterns of the output files, keyed by output type."""
+        # The actual output file names are composed of the run_name and the default name.
+        return {
+            "hydrograph": f"{run_name}*Hydrographs.nc",
+            "storage": f"{run_name}*WatershedStorage.nc",
+            "solution": f"{run_name}*solution.rvc",
+            "diagnostics": f"{run_name}*Diagnostics.csv",
         }
-        for p in err_filepaths:
-            # The error message for an unknown command is exceptionally on two lines
-            # (the second starts with a triple space)
-            for m in re.findall("^([A-Z ]+) :(.+)(?:\n   (.+))?", p.read_text(), re.M):
-                if m[0] == "SIMULATION COMPLETE":
-                    messages["SIMULATION COMPLETE"] = True
-                    continue
-                msg_type = m[0]
-                msg = f"{m[1]} {m[2]}".strip()
-                if (
-                    msg
-                    == "Errors found in input data. See Raven_errors.txt for details"
-                ):
-                    # Skip this one because it's a bit circular
-                    continue
-                messages[msg_type].append(msg)  # type: ignore
 
-        return messages
+    def _get_run_output(self, key, pattern):
+        """Return the output files of type `key` collected from the simulations of the last run."""
+        files = [
+            f
+            for psim in sorted(self._run_outputs)
+            for f in self._run_outputs[psim][key]
+        ]
+
+        if len(files) == 0:
+            if not self.config.rvi.suppress_output:
+                raise UserWarning(f"No output files for {pattern} in {self.exec_path}.")
+
+        return files
 
     def _get_output(self, pattern, path):
         """Match actual output files to known expected files.
@@ -559,57 +1162,65 @@ class Raven:
 
         return [f.absolute() for f in files]
 
+    def _process_usage(self) -> List[ProcessUsage]:
+        """Return the resources used by the processes of the last run, in parallel simulation order."""
+        return [self._run_usage[psim] for psim in sorted(self._run_usage)]
+
+    @property
+    def results(self) -> RunResult:
+        """Outputs of the last run, each opened or parsed once and cached until the next run or `RunResult.close`."""
+        if self._results is None:
+            self._results = RunResult(
+                self.outputs,
+                self.ind_outputs,
+                self._process_usage(),
+                pdim=self._pdim or None,
+                periods=[p.name for p in self.config.rvi._evaluation_periods],
+            )
+        return self._results
+
     @property
     def q_sim(self):
-        """Return a view of the hydrograph time series.
+        """Return the hydrograph time series.
 
-        This view will be overwritten by successive calls to `run`. To make a copy of this DataArray that will
-        persist in memory, use `q_sim.copy(deep=True)`.
+        The time series is read once and cached (see `results`), and is replaced by successive calls to `run`.
         """
-        if isinstance(self.hydrograph, list):
-            return [h.q_sim for h in self.hydrograph]
-
-        return self.hydrograph.q_sim
+        return self.results.q_sim
 
     @property
     def hydrograph(self):
         """Return a view of the current output file.
 
         If the model is run multiple times, hydrograph will point to the latest version. To store the results of
-        multiple runs, either create different model instances or explicitly copy the file to another disk location.
+        multiple runs, either create different model instances or explicitly copy the file to another disk location
+        (see `materialize`).
         """
-        hydrograph = cast(Path, self.outputs["hydrograph"])
-        if hydrograph.suffix == ".nc":
-            return xr.open_dataset(hydrograph)
-        elif hydrograph.suffix == ".zip":
-            return [xr.open_dataset(fn) for fn in self.ind_outputs["hydrograph"]]
-        else:
-            raise ValueError
+        return self.results.hydrograph
 
     @property
     def storage(self):
-        storage = cast(Path, self.outputs["storage"])
-        if storage.suffix == ".nc":
-            return xr.open_dataset(storage)
-        elif storage.suffix == ".zip":
-            return [xr.open_dataset(fn) for fn in self.ind_outputs["storage"]]
-        else:
-            raise ValueError
+        return self.results.storage
 
     @property
     def solution(self):
-        solution = cast(Path, self.outputs["solution"])
-        if solution.suffix == ".rvc":
-            return RVC.create_solution(solution.read_text())
-        elif solution.suffix == ".zip":
-            return [
-                RVC.create_solution(fn.read_text())
-                for fn in self.ind_outputs["solution"]
-            ]
+        return self.results.solution
+
+    @property
+    def state(self):
+        """Final model states as arrays (see `RunResult.state`)."""
+        return self.results.state
+
+    def get_state_ensemble(self) -> StateEnsemble:
+        """Return the final states of all the simulations of the last run, stacked along the member dimension."""
+        state = self.state
+        return StateEnsemble.from_states(state if isinstance(state, list) else [state])
 
     def get_final_state(self, hru_index=1, basin_index=1):
         """Return model state at the end of simulation.
 
+        The states are returned as `HRUState` and `BasinIndexCommand` records. See `get_state_ensemble` to get the
+        states of all the simulations as arrays.
+
         Parameters
         ----------
         hru_index : None, int
@@ -632,22 +1243,14 @@ class Raven:
         """Return a nested dictionary of performance metrics keyed by diagnostic name and period. The default period
         is called "ALL".
         """
-        diag = []
-        out = collections.defaultdict(list)
-        for fn in self.ind_outputs["diagnostics"]:
-            with open(fn) as f:
-                reader = csv.reader(f.readlines())
-                header = next(reader)
-                for row in reader:
-                    for (key, val) in zip(header, row):
-                        if "DIAG" in key:
-                            val = float(val)  # type: ignore
-                        out[key].append(val)
-
-                out.pop("")
+        return self.results.diagnostics
 
-            diag.append(out)
-        return diag if len(diag) > 1 else diag[0]
+    @property
+    def diagnostics_dataset(self) -> xr.Dataset:
+        """Return the performance metrics of all the simulations as a dataset indexed by the parallel dimension,
+        metric and evaluation period (see `RunResult.diagnostics_dataset`).
+        """
+        return self.results.diagnostics_dataset
 
 
 class Ostrich(Raven):
@@ -669,6 +1272,10 @@ class Ostrich(Raven):
     >>> r.configure()
     """
 
+    # The save_best.sh script copies the best solution to the final directory using a path relative to the work
+    # directory
+    _supports_scratch = False
+
     def __init__(self, *args, **kwds):
         kwds["identifier"] = kwds.get("identifier", "ostrich-generic")
         super().__init__(*args, **kwds)
@@ -697,6 +1304,15 @@ class Ostrich(Raven):
         """Path to Ostrich parallel process directory."""
         return self.exec_path / "processor_0"  # /'model' / 'output' ?
 
+    @property
+    def grid_weights_file(self):
+        # Ostrich only copies the RV files in the directory in which it runs Raven
+        return None
+
+    def _restore_run(self, run):
+        """Calibration results are not cached."""
+        return False
+
     def write_save_best(self):
         fn = self.exec_path / "save_best.sh"
         fn.write_text(save_best)
@@ -874,6 +1490,89 @@ class Ostrich(Raven):
         return np.loadtxt(self.outputs["params_seq"], skiprows=1)[-1, 2:]
 
 
+def _link_or_copy(src: Path, dst: Path):
+    """Hard-link `src` to `dst`, or copy it if the file system does not support hard links."""
+    if os.path.lexists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+def get_raven_version(raven_exec: Union[str, Path]) -> str:
+    """Return the version of a Raven binary.
+
+    The binary is only run once for a given path and modification time, the version being stored in a
+    process-wide registry.
+    """
+    path = os.path.realpath(raven_exec)
+    key = (path, os.stat(path).st_mtime_ns)
+    if key not in _raven_versions:
+        # Raven writes a Raven_errors.txt file in its working directory
+        with tempfile.TemporaryDirectory() as tmpdir:
+            out = subprocess.check_output([path], input="\n", text=True, cwd=tmpdir)
+        match = re.search(r"Version (\S+) ", out)
+        if not match:
+            raise AttributeError(f"Raven version not found: {out}")
+        _raven_versions[key] = match.groups()[0]
+    return _raven_versions[key]
+
+
+def parse_raven_messages(text: str) -> Dict[str, Any]:
+    """Extract the messages of a Raven_errors.txt file content, structured by types."""
+    messages: Dict[str, Any] = {
+        "ERROR": [],
+        "WARNING": [],
+        "ADVISORY": [],
+        "SIMULATION COMPLETE": False,
+    }
+    # The error message for an unknown command is exceptionally on two lines
+    # (the second starts with a triple space)
+    for m in re.findall("^([A-Z ]+) :(.+)(?:\n   (.+))?", text, re.M):
+        if m[0] == "SIMULATION COMPLETE":
+            messages["SIMULATION COMPLETE"] = True
+            continue
+        msg_type = m[0]
+        msg = f"{m[1]} {m[2]}".strip()
+        if msg == "Errors found in input data. See Raven_errors.txt for details":
+            # Skip this one because it's a bit circular
+            continue
+        messages[msg_type].append(msg)
+
+    return messages
+
+
+def merge_raven_messages(
+    messages: Dict[Any, Dict[str, Any]], label: str = "Simulation"
+) -> Dict[str, Any]:
+    """Merge the messages of multiple simulations, keyed by simulation, into the structure of `parse_raven_messages`.
+
+    If there are multiple simulations, the messages are prefixed with the label and key of their simulation.
+    """
+    merged: Dict[str, Any] = {
+        "ERROR": [],
+        "WARNING": [],
+        "ADVISORY": [],
+        "SIMULATION COMPLETE": bool(messages)
+        and all(m["SIMULATION COMPLETE"] for m in messages.values()),
+    }
+    for key, msgs in messages.items():
+        prefix = f"{label} {key}: " if len(messages) > 1 else ""
+        for msg_type in ["ERROR", "WARNING", "ADVISORY"]:
+            merged[msg_type].extend(prefix + msg for msg in msgs[msg_type])
+
+    return merged
+
+
+def _get_async_semaphore() -> asyncio.Semaphore:
+    """Return the semaphore bounding the number of processes launched by asynchronous runs in the running loop."""
+    loop = asyncio.get_running_loop()
+    if loop not in _async_semaphores:
+        _async_semaphores[loop] = asyncio.Semaphore(MAX_CONCURRENT_RUNS)
+    return _async_semaphores[loop]
+
+
 def get_diff_level(files):
     """Return the lowest hierarchical file parts level at which there are differences among file paths."""
 
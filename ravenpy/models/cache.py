@@ -0,0 +1,93 @@
+"""
+Result cache
+------------
+
+The `ResultCache` class is an opt-in on-disk cache of simulation outputs. Entries are keyed by a hash of everything that
+determines the outcome of a Raven run (rendered configuration files, forcing files and Raven version), so that
+simulations that have already been run with the exact same inputs can be restored without launching Raven.
+
+"""
+import hashlib
+import os
+import shutil
+from pathlib import Path
+from typing import Union
+
+from ravenpy.utilities.cache import DiskCache, content_key
+
+_default_cache_dir = Path.home() / ".raven_cache" / "results"
+
+
+class ResultCache(DiskCache):
+    """Content-addressed cache of Raven simulation outputs.
+
+    Every entry is a directory holding copies of the output files of one simulation. The least recently used entries
+    are evicted when the total size of the cache exceeds `max_size`.
+
+    Parameters
+    ----------
+    path : str or Path, optional
+      Directory in which the cached outputs are stored.
+    max_size : int
+      Maximum size of the cache, in bytes.
+    checksum : bool
+      If True, forcing files are identified by a checksum of their content, otherwise by their path,
+      modification time and size.
+
+    Examples
+    --------
+    >>> model = GR4JCN()
+    >>> model.cache = ResultCache(max_size=2 ** 30)
+    >>> model(ts, params=params)  # Runs Raven
+    >>> model(ts, params=params)  # Restores the outputs from the cache
+    >>> model.cache.hits
+    1
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path] = _default_cache_dir,
+        max_size: int = 2**30,
+        checksum: bool = False,
+    ):
+        super().__init__(path, max_size)
+        self.checksum = checksum
+
+    @staticmethod
+    def key(*parts: Union[str, bytes]) -> str:
+        """Return the cache key identifying the given content (see `content_key`)."""
+        return content_key(*parts)
+
+    def file_signature(self, fn: Union[str, Path]) -> str:
+        """Return a string identifying the content of a (forcing) file."""
+        if not os.path.exists(fn):
+            # URLs (e.g. OPeNDAP links) are identified by their address only
+            return str(fn)
+
+        fn = os.path.realpath(fn)
+        if self.checksum:
+            h = hashlib.sha256()
+            with open(fn, "rb") as f:
+                for chunk in iter(lambda: f.read(2**20), b""):
+                    h.update(chunk)
+            return f"{fn}:{h.hexdigest()}"
+
+        st = os.stat(fn)
+        return f"{fn}:{st.st_mtime_ns}:{st.st_size}"
+
+    def restore(self, key: str, path: Union[str, Path]) -> bool:
+        """Copy the files of a cache entry to `path`. Return whether the entry was found."""
+        entry = self.path / key
+        if not entry.is_dir():
+            self.misses += 1
+            return False
+
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        for fn in entry.iterdir():
+            shutil.copyfile(fn, path / fn.name)
+
+        # The modification time of the entry tracks its last use
+        os.utime(entry)
+        self.hits += 1
+        return True
@@ -273,15 +273,16 @@ class CANADIANSHIELD(Raven):
 
         self.config.rvh.hrus[0].area *= params.par_x34
         self.config.rvh.hrus[1].area *= 1.0 - params.par_x34
+        self.config.rvh.set_modified("hrus")
 
         soil0 = params.par_x01 * 1000.0 * 0.5
         soil1 = params.par_x02 * 1000.0 * 0.5
         soil2 = params.par_x03 * 1000.0 * 0.5
         self.config.rvc.set_hru_state(
-            HRUState(index=1, soil0=soil0, soil1=soil1, soil2=soil2)
+            HRUState.construct(index=1, soil0=soil0, soil1=soil1, soil2=soil2)
         )
         self.config.rvc.set_hru_state(
-            HRUState(index=2, soil0=soil0, soil1=0, soil2=soil2)
+            HRUState.construct(index=2, soil0=soil0, soil1=0.0, soil2=soil2)
         )
 
         self.config.rvt.rain_correction = params.par_x32
@@ -582,6 +583,7 @@ class CANADIANSHIELD_OST(Ostrich, CANADIANSHIELD):
 
         self.config.rvh.hrus[0].area = "par_area_organic_SB1"  # type: ignore
         self.config.rvh.hrus[1].area = "par_area_bedrock_SB1"  # type: ignore
+        self.config.rvh.set_modified("hrus")
 
         self.config.rvc.set_hru_state(HRUState(index=1))
         self.config.rvc.hru_states[1].soil0 = "par_half_x01"  # type: ignore
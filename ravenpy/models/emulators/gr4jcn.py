@@ -193,7 +193,7 @@ class GR4JCN(Raven):
         # subbassin_id -> has at least one LakeHRU
         sb_contains_lake = defaultdict(lambda: False)
 
-        if not self.config.rvc.hru_states:
+        if not self.config.rvc.has_hru_states:
             # If self.rvc.hru_states is set, it means that we are using `resume()` and we don't
             # want to interfere
 
@@ -202,24 +202,26 @@ class GR4JCN(Raven):
 
             for hru in self.config.rvh.hrus:
                 if isinstance(hru, GR4JCN.LandHRU) or hru.hru_type == "land":
-                    self.config.rvc.hru_states[hru.hru_id] = HRUState(
+                    self.config.rvc.hru_states[hru.hru_id] = HRUState.construct(
                         index=hru.hru_id, soil0=soil0, soil1=soil1
                     )
                 elif isinstance(hru, GR4JCN.LakeHRU) or hru.hru_type == "lake":
-                    self.config.rvc.hru_states[hru.hru_id] = HRUState(index=hru.hru_id)
+                    self.config.rvc.hru_states[hru.hru_id] = HRUState.construct(
+                        index=hru.hru_id
+                    )
                     sb_contains_lake[hru.subbasin_id] = True
                 else:
                     raise Exception(
                         "Type of HRU must be either `GR4JCN.LandHRU` or `GR4JCN.LakeHRU`"
                     )
 
-        if not self.config.rvc.basin_states:
+        if not self.config.rvc.has_basin_states:
             # If self.rvc.basin_states is set, it means that we are using `resume()` and we don't
             # want to interfere
             for sb in self.config.rvh.subbasins:
-                self.config.rvc.basin_states[sb.subbasin_id] = BasinIndexCommand(
-                    index=sb.subbasin_id
-                )
+                self.config.rvc.basin_states[
+                    sb.subbasin_id
+                ] = BasinIndexCommand.construct(index=sb.subbasin_id)
 
 
 class GR4JCN_OST(Ostrich, GR4JCN):
@@ -264,12 +264,12 @@ class HBVEC(Raven):
         self._monthly_average()
 
         # Default initial conditions if none are given
-        if not self.config.rvc.hru_states:
+        if not self.config.rvc.has_hru_states:
             soil2 = 0.50657
-            self.config.rvc.hru_states[1] = HRUState(soil2=soil2)
+            self.config.rvc.hru_states[1] = HRUState.construct(soil2=soil2)
 
-        if not self.config.rvc.basin_states:
-            self.config.rvc.basin_states[1] = BasinIndexCommand()
+        if not self.config.rvc.has_basin_states:
+            self.config.rvc.basin_states[1] = BasinIndexCommand.construct()
 
     # TODO: Support index specification and unit changes.
     def _monthly_average(self):
@@ -201,10 +201,10 @@ class HMETS(Raven):
             SUM_SNOW_SWI=params.SNOW_SWI_MAX,
         )
 
-        if not self.config.rvc.hru_states:
+        if not self.config.rvc.has_hru_states:
             soil0 = params.TOPSOIL * 0.5
             soil1 = params.PHREATIC * 0.5
-            self.config.rvc.hru_states[1] = HRUState(soil0=soil0, soil1=soil1)
+            self.config.rvc.hru_states[1] = HRUState.construct(soil0=soil0, soil1=soil1)
 
 
 class HMETS_OST(Ostrich, HMETS):
@@ -1,11 +1,17 @@
+import operator
+import os
 from pathlib import Path
 from typing import List
 
-from .base import Raven
+from .base import Raven, merge_raven_messages
 from .emulators import get_model
 
 
 class RavenMultiModel(Raven):
+
+    # The models are executed in the execution directory of the work directory
+    _supports_scratch = False
+
     def __init__(self, models, workdir=None):
         """Create multi-model raven instance.
 
@@ -39,11 +45,30 @@ class RavenMultiModel(Raven):
         for m in self._models:
             m.resume(solution)
 
-    def run(self, ts, overwrite=False, **kwds):
+    def extract_raven_messages(self):
+        return merge_raven_messages(
+            {m.identifier: m.extract_raven_messages() for m in self._models},
+            label="Model",
+        )
+
+    def _raven_errors(self):
+        """Return the error messages of the last run, keyed by model identifier."""
+        errors = {
+            m.identifier: m.extract_raven_messages()["ERROR"] for m in self._models
+        }
+        return {ident: msgs for ident, msgs in errors.items() if msgs}
+
+    def run(self, ts, overwrite=False, max_workers=None, **kwds):
         """Run model.
 
+        The simulations of all the models are executed in a single pool of `max_workers` processes (see `Raven.run`),
+        so that the models run at the same time.
+
         Parameters
         ----------
+        max_workers : int, optional
+          Maximum number of Raven processes running at the same time. Defaults to `self.max_workers`, or to the
+          number of CPUs if it is not set.
         kwds : dict
           model_name : array
             Parameter array.
@@ -57,17 +82,31 @@ class RavenMultiModel(Raven):
         for m in self._models:
             p[m.identifier] = kwds.pop(m.identifier, None)
 
-        procs = []
+        model_runs = []
         for m in self._models:
             # Add params to kwds if passed in run.
             kw = kwds.copy()
             if p[m.identifier]:
                 kw["params"] = p[m.identifier]
 
-            procs.extend(m.run(ts, **kw))
+            model_runs.append((m, m._prepare_runs(ts, **kw)))
+            m._reset_runs()
+
+        max_workers = max_workers or self.max_workers or os.cpu_count() or 1
+        done_runs = self._execute_model_runs(
+            ((m, run) for m, runs in model_runs for run in runs), max_workers
+        )
 
+        procs = []
+        for m in self._models:
+            runs = sorted(done_runs.get(m, []), key=operator.attrgetter("psim"))
+            procs.extend(run.proc for run in runs)
         return procs
 
+    def _process_usage(self):
+        """Return the resources used by the processes of the last run, for each model in turn."""
+        return [u for m in self._models for u in m._process_usage()]
+
     def parse_results(self):
         # The Raven parent class uses `run_name` as the glob prefix, but here
         # since we have multiple models (with each its own config.rvi.run_name)
@@ -80,6 +119,8 @@ class RavenMultiModel(Raven):
             "diagnostics": "*Diagnostics.csv",
         }
 
+        self._close_outputs()
+
         for key, pattern in patterns.items():
             # There are no diagnostics if a streamflow time series is not provided.
             try:
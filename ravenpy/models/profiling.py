@@ -0,0 +1,164 @@
+"""
+Run profiling
+-------------
+
+The `RunProfile` class records the wall and CPU time spent in the phases of a model run (rendering the configuration,
+running Raven, parsing the outputs, etc.). Profiling is opt-in, see `Raven.profile`.
+
+The `ProcessUsage` class holds the resources (peak memory, CPU time) used by each Raven process, which are always
+recorded where the platform supports it (see `RunResult.usage`).
+
+"""
+import datetime as dt
+import json
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+
+@dataclass
+class PhaseTiming:
+    """Time spent in one phase of a model run."""
+
+    phase: str
+    # Parallel simulation index, None for the phases covering all the simulations of the run
+    psim: Optional[int]
+    # Wall time, in seconds
+    wall: float
+    # CPU time, in seconds (None if it was not measured)
+    cpu: Optional[float]
+
+
+class RunProfile:
+    """Timings of the phases of a model run.
+
+    The CPU time of the phases executed in Python is the time of the thread executing them, and that of the Raven
+    processes (`execute`) is their user and system time, when available (see `ProcessUsage`). The phases are nested:
+    `setup_model_run` includes `derived_parameters` and `_dump_rv`.
+
+    Parameters
+    ----------
+    identifier : str
+      Identifier of the profiled model.
+
+    Examples
+    --------
+    >>> model.profile = True
+    >>> model(ts, params=params)
+    >>> model.timings.summary()["execute"]
+    {'count': 1, 'wall': 0.52, 'cpu': 0.49}
+    """
+
+    def __init__(self, identifier: str = ""):
+        self.identifier = identifier
+        self.start = dt.datetime.now()
+        self.records: List[PhaseTiming] = []
+
+    def add(
+        self, phase: str, psim: Optional[int], wall: float, cpu: Optional[float] = None
+    ):
+        """Record the time spent in a phase."""
+        self.records.append(PhaseTiming(phase, psim, wall, cpu))
+
+    @contextmanager
+    def timer(self, phase: str, psim: Optional[int] = None):
+        """Context manager recording the wall and CPU time spent in its body."""
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        try:
+            yield
+        finally:
+            self.add(phase, psim, time.perf_counter() - wall, time.thread_time() - cpu)
+
+    def summary(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """Return the number of records and the total wall and CPU times, keyed by phase."""
+        out: Dict[str, Dict[str, Optional[float]]] = defaultdict(
+            lambda: {"count": 0, "wall": 0.0, "cpu": None}
+        )
+        for rec in self.records:
+            s = out[rec.phase]
+            s["count"] += 1  # type: ignore
+            s["wall"] += rec.wall  # type: ignore
+            if rec.cpu is not None:
+                s["cpu"] = (s["cpu"] or 0.0) + rec.cpu
+        return dict(out)
+
+    def to_dicts(self) -> List[dict]:
+        """Return the records as dictionaries, including the model identifier and the start time of the run."""
+        run = {"identifier": self.identifier, "start": self.start.isoformat()}
+        return [dict(run, **asdict(rec)) for rec in self.records]
+
+    def write_jsonl(self, path: Union[str, Path]):
+        """Append the records to a JSON lines file, one JSON object per record."""
+        with open(path, "a") as f:
+            for rec in self.to_dicts():
+                f.write(json.dumps(rec) + "\n")
+
+
+@dataclass
+class ProcessUsage:
+    """Resources used by the process of one simulation.
+
+    On Linux, the peak memory of a process is at least the memory used by the Python process launching it, which the
+    kernel accounts to the child when it starts. Memory blow-ups of the simulations are still visible, but `max_rss`
+    is not accurate for processes using less memory than the Python process.
+    """
+
+    psim: int
+    # Peak resident set size, in bytes
+    max_rss: int
+    # User and system CPU time, in seconds
+    user_time: float
+    system_time: float
+    # Wall time, in seconds
+    wall: Optional[float] = None
+
+    @classmethod
+    def from_rusage(cls, psim: int, rusage, wall: Optional[float] = None):
+        """Create from the `resource.struct_rusage` of a terminated process."""
+        # ru_maxrss is in kilobytes, except on macOS
+        scale = 1 if sys.platform == "darwin" else 1024
+        return cls(
+            psim=psim,
+            max_rss=rusage.ru_maxrss * scale,
+            user_time=rusage.ru_utime,
+            system_time=rusage.ru_stime,
+            wall=wall,
+        )
+
+    @property
+    def cpu_time(self) -> float:
+        """Total CPU time, in seconds."""
+        return self.user_time + self.system_time
+
+
+def summarize_usage(usage: Sequence[ProcessUsage]) -> Dict[str, Any]:
+    """Return aggregate statistics of the resources used by the processes of a run.
+
+    Parameters
+    ----------
+    usage : sequence of ProcessUsage
+      Resources used by each process.
+
+    Returns
+    -------
+    dict
+      Number of processes, maximum and mean peak memory (bytes), total user, system and CPU time (seconds), and total
+      and maximum wall time (seconds).
+    """
+    n = len(usage)
+    walls = [u.wall for u in usage if u.wall is not None]
+    return {
+        "count": n,
+        "max_rss": max((u.max_rss for u in usage), default=0),
+        "mean_rss": sum(u.max_rss for u in usage) / n if n else 0.0,
+        "user_time": sum(u.user_time for u in usage),
+        "system_time": sum(u.system_time for u in usage),
+        "cpu_time": sum(u.cpu_time for u in usage),
+        "wall": sum(walls),
+        "max_wall": max(walls, default=0.0),
+    }
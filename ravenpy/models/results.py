@@ -0,0 +1,291 @@
+"""
+Run results
+-----------
+
+The `RunResult` class gives access to the outputs of a model run. Each output is opened or parsed on first access only,
+so that repeatedly accessing e.g. the simulated streamflow does not reopen files or parse them again.
+
+"""
+import collections
+import csv
+import io
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union, cast
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from ravenpy.config.rvs import RVC
+from ravenpy.config.states import ModelState
+
+from .profiling import ProcessUsage, summarize_usage
+
+
+class RunResult:
+    """Outputs of a model run, opened once and cached.
+
+    The NetCDF outputs are opened on first access and kept open until `close` is called, and the values of their
+    variables are only read from disk once. The solution and diagnostics files are parsed once. The object can be used
+    as a context manager to close the files on exit. Accessing an output after `close` opens it again.
+
+    Parameters
+    ----------
+    outputs : dict
+      Aggregated outputs keyed by output type (see `Raven.outputs`).
+    ind_outputs : dict
+      Output files of the individual simulations keyed by output type (see `Raven.ind_outputs`).
+    usage : sequence of ProcessUsage, optional
+      Resources used by the processes of the simulations.
+    pdim : str, optional
+      Name of the parallel dimension of the run.
+    periods : sequence of str
+      Names of the evaluation periods of the diagnostics, besides the default "ALL" period.
+
+    Examples
+    --------
+    >>> model(ts, params=params)
+    >>> with model.results as res:
+    ...     for i in range(10):
+    ...         res.q_sim.isel(time=i)  # The hydrograph file is read only once
+    """
+
+    def __init__(
+        self,
+        outputs: Dict[str, Union[Path, str, xr.Dataset]],
+        ind_outputs: Dict[str, List[Path]],
+        usage: Optional[Sequence[ProcessUsage]] = None,
+        pdim: Optional[str] = None,
+        periods: Sequence[str] = (),
+    ):
+        self.outputs = outputs
+        self.ind_outputs = ind_outputs
+        self._usage = list(usage or [])
+        self.pdim = pdim
+        self.periods = list(periods)
+        self._cache: Dict[str, Any] = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Close the opened output files and clear the cached outputs."""
+        for key in ("hydrograph", "storage"):
+            ds = self._cache.get(key)
+            for d in ds if isinstance(ds, list) else [ds]:
+                if isinstance(d, xr.Dataset):
+                    d.close()
+        self._cache.clear()
+
+    def _cached(self, key: str, load: Callable[[], Any]) -> Any:
+        """Return the cached value for `key`, loading it on first access."""
+        try:
+            return self._cache[key]
+        except KeyError:
+            value = self._cache[key] = load()
+            return value
+
+    def _open_dataset(self, key: str):
+        out = self.outputs[key]
+        if isinstance(out, xr.Dataset):
+            return out
+        out = cast(Path, out)
+        if out.suffix == ".nc":
+            return xr.open_dataset(out)
+        elif out.suffix == ".zip":
+            return [xr.open_dataset(fn) for fn in self.ind_outputs[key]]
+        else:
+            raise ValueError
+
+    @property
+    def usage(self) -> List[ProcessUsage]:
+        """Resources used by the process of each simulation, in parallel simulation order.
+
+        For a `RavenMultiModel`, the simulations of each model follow those of the previous model.
+
+        The simulations restored from the result cache, and those executed asynchronously (see `Raven.arun`) or on
+        platforms without `os.wait4`, are missing.
+        """
+        return self._usage
+
+    def usage_summary(self) -> Dict[str, Any]:
+        """Return aggregate statistics of the resources used by the processes of the run (see `summarize_usage`)."""
+        return summarize_usage(self._usage)
+
+    @property
+    def hydrograph(self):
+        """Hydrograph dataset, or list of datasets if the outputs of the simulations could not be concatenated."""
+        return self._cached("hydrograph", lambda: self._open_dataset("hydrograph"))
+
+    @property
+    def storage(self):
+        """Watershed storage dataset, or list of datasets if the outputs of the simulations could not be concatenated."""
+        return self._cached("storage", lambda: self._open_dataset("storage"))
+
+    @property
+    def q_sim(self):
+        """Simulated streamflow."""
+
+        def load():
+            if isinstance(self.hydrograph, list):
+                return [h.q_sim for h in self.hydrograph]
+            return self.hydrograph.q_sim
+
+        return self._cached("q_sim", load)
+
+    @property
+    def solution(self):
+        """Final model states, parsed from the solution file(s)."""
+
+        def load():
+            solution = cast(Path, self.outputs["solution"])
+            if solution.suffix == ".rvc":
+                return RVC.create_solution(solution.read_text())
+            elif solution.suffix == ".zip":
+                return [
+                    RVC.create_solution(fn.read_text())
+                    for fn in self.ind_outputs["solution"]
+                ]
+
+        return self._cached("solution", load)
+
+    @property
+    def state(self):
+        """Final model states, parsed from the solution file(s) into arrays (see `ModelState`)."""
+
+        def load():
+            solution = cast(Path, self.outputs["solution"])
+            if solution.suffix == ".zip":
+                return [ModelState.load(fn) for fn in self.ind_outputs["solution"]]
+            return ModelState.load(solution)
+
+        return self._cached("state", load)
+
+    @property
+    def diagnostics(self):
+        """Performance metrics keyed by diagnostic name and period (see `Raven.diagnostics`)."""
+        return self._cached("diagnostics", self._read_diagnostics)
+
+    @property
+    def diagnostics_dataset(self) -> xr.Dataset:
+        """Performance metrics of all the simulations as a single array (see `load_diagnostics`)."""
+
+        def load():
+            files = self.ind_outputs["diagnostics"]
+            dim = (self.pdim or "run") if len(files) > 1 else None
+            return load_diagnostics(files, dim=dim, periods=self.periods)
+
+        return self._cached("diagnostics_dataset", load)
+
+    def _read_diagnostics(self):
+        diag = []
+        out = collections.defaultdict(list)
+        for fn in self.ind_outputs["diagnostics"]:
+            with open(fn) as f:
+                reader = csv.reader(f.readlines())
+                header = next(reader)
+                for row in reader:
+                    for (key, val) in zip(header, row):
+                        if "DIAG" in key:
+                            val = float(val)  # type: ignore
+                        out[key].append(val)
+
+                out.pop("")
+            diag.append(out)
+        return diag if len(diag) > 1 else diag[0]
+
+
+def load_diagnostics(
+    files: Sequence[Union[str, Path]],
+    dim: Optional[str] = None,
+    periods: Sequence[str] = (),
+) -> xr.Dataset:
+    """Read the Diagnostics.csv files of the simulations of a run into a dataset.
+
+    The simulations of a run share the same configuration, and thus the same layout of diagnostics files: the values
+    of all the files are parsed at once.
+
+    Parameters
+    ----------
+    files : sequence of str or Path
+      Diagnostics files, in parallel simulation order.
+    dim : str, optional
+      Name of the dimension along which the files are stacked. If None, there must be a single file.
+    periods : sequence of str
+      Names of the evaluation periods, besides the default "ALL" period.
+
+    Returns
+    -------
+    xr.Dataset
+      Dataset whose `diagnostics` variable has dimensions (`dim`, metric, period). If the files hold the diagnostics of
+      multiple observation series, there is an additional `observation` dimension, otherwise the observation series is
+      a scalar coordinate.
+    """
+    if dim is None and len(files) != 1:
+        raise ValueError("A dimension name is required to load multiple files.")
+
+    texts = [Path(fn).read_text() for fn in files]
+    header, _, body = texts[0].partition("\n")
+    metrics = [m for m in header.strip().split(",")[2:] if m]
+    labels = [row.split(",", 1)[0] for row in body.splitlines() if row.strip()]
+
+    values = np.empty((0, len(metrics)))
+    if labels:
+        # The rows of all the files, without their header
+        rows = "".join(t.partition("\n")[2] for t in texts)
+        values = pd.read_csv(
+            io.StringIO(rows),
+            header=None,
+            usecols=range(2, 2 + len(metrics)),
+            dtype=float,
+        ).to_numpy()
+    if values.shape[0] != len(files) * len(labels):
+        raise ValueError("The diagnostics files do not have the same layout.")
+    values = values.reshape(len(files), len(labels), len(metrics))
+
+    observations: List[str] = []
+    all_periods: List[str] = []
+    index = []
+    for label in labels:
+        obs, period = _split_diagnostics_label(label, ["ALL", *periods])
+        for names, name in ((observations, obs), (all_periods, period)):
+            if name not in names:
+                names.append(name)
+        index.append((observations.index(obs), all_periods.index(period)))
+
+    # (file, observation, period, metric)
+    out = np.full(
+        (len(files), len(observations), len(all_periods), len(metrics)), np.nan
+    )
+    iobs, iper = np.array(index, dtype=int).reshape(-1, 2).T
+    out[:, iobs, iper] = values
+
+    da = xr.DataArray(
+        out.transpose(0, 3, 2, 1),
+        dims=(dim or "run", "metric", "period", "observation"),
+        coords={"metric": metrics, "period": all_periods, "observation": observations},
+    )
+    if len(observations) == 1:
+        da = da.squeeze("observation")
+    if dim is None:
+        da = da.squeeze("run", drop=True)
+    return xr.Dataset({"diagnostics": da})
+
+
+def _split_diagnostics_label(label: str, periods: Sequence[str]) -> Tuple[str, str]:
+    """Split the label of a diagnostics row into the observation series and evaluation period names.
+
+    Raven labels the rows `<observation>_<period>[<location>]`, and the rows of aggregated diagnostics
+    `<statistic>_<observation>_<period>[_<group>]`.
+    """
+    for period in sorted(periods, key=len, reverse=True):
+        token = f"_{period}"
+        i = label.rfind(token)
+        end = i + len(token)
+        if i > 0 and label[end : end + 1] in ["[", "_", ""]:
+            return label[:i] + label[end:], period
+    # Files written by versions of Raven without evaluation periods
+    return label, "ALL"
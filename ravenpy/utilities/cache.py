@@ -0,0 +1,104 @@
+"""
+Disk cache
+----------
+
+The `DiskCache` class is the base of the on-disk caches of RavenPy (`ravenpy.models.cache.ResultCache` and
+`ravenpy.utilities.grid_weights.GridWeightsCache`). Every entry is a directory named by a hash of the inputs it was
+computed from (see `content_key`), and the least recently used entries are evicted when the cache grows too large.
+
+"""
+import hashlib
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Iterable, Union
+
+
+def content_key(*parts: Union[str, bytes]) -> str:
+    """Return the cache key identifying the given content."""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode() if isinstance(part, str) else part)
+        # Separator to avoid collisions between concatenated parts
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class DiskCache:
+    """Directory of cache entries with least recently used eviction.
+
+    The modification time of an entry tracks its last use. Subclasses load the entries and count the `hits` and
+    `misses`.
+
+    Parameters
+    ----------
+    path : str or Path
+      Directory in which the entries are stored.
+    max_size : int
+      Maximum size of the cache, in bytes.
+    """
+
+    def __init__(self, path: Union[str, Path], max_size: int = 2**30):
+        self.path = Path(path).expanduser()
+        self.max_size = max_size
+
+        self.hits = 0
+        self.misses = 0
+
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def store(self, key: str, files: Iterable[Union[str, Path]]):
+        """Store copies of the files under the given key, then evict entries if the cache is too large."""
+        entry = self.path / key
+        if entry.exists():
+            return
+
+        # Copy to a temporary directory first so that concurrent readers never see incomplete entries
+        tmp = Path(tempfile.mkdtemp(prefix=".tmp-", dir=self.path))
+        for fn in files:
+            shutil.copyfile(fn, tmp / Path(fn).name)
+        try:
+            tmp.rename(entry)
+        except OSError:
+            # Another process stored the same entry in the meantime
+            shutil.rmtree(tmp, ignore_errors=True)
+
+        self.evict()
+
+    def discard(self, key: str):
+        """Remove the entry stored under the given key, if any."""
+        shutil.rmtree(self.path / key, ignore_errors=True)
+
+    @property
+    def size(self) -> int:
+        """Total size of the cached files, in bytes."""
+        return sum(size for _, _, size in self._entries())
+
+    def evict(self):
+        """Remove the least recently used entries until the cache size is below `max_size`."""
+        entries = sorted(self._entries(), key=lambda e: e[1])
+        total = sum(size for _, _, size in entries)
+        for entry, _, size in entries:
+            if total <= self.max_size:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        """Remove all entries and reset the hit and miss counters."""
+        for entry, _, _ in self._entries():
+            shutil.rmtree(entry, ignore_errors=True)
+        self.hits = 0
+        self.misses = 0
+
+    def _entries(self):
+        """Yield (path, last use time, size) for every entry of the cache."""
+        for entry in self.path.iterdir():
+            if entry.name.startswith(".") or not entry.is_dir():
+                continue
+            try:
+                size = sum(fn.stat().st_size for fn in entry.iterdir())
+                yield entry, entry.stat().st_mtime, size
+            except FileNotFoundError:
+                # Evicted by another process
+                continue
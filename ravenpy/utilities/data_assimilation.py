@@ -7,12 +7,13 @@ import datetime as dt
 import math
 import os
 from copy import deepcopy
-from dataclasses import replace
 from typing import Dict, List, Sequence, Tuple, Union
 
 import numpy as np
 import xarray as xr
 
+from ravenpy.config.states import StateEnsemble
+
 """
 model = Raven model instance, preset with parameters etc.
 xa = the set of state variables. In this case, soil0 and soil1 from GR4JCN. Will eventually need to update for other models, other variables
@@ -46,10 +47,12 @@ def assimilate(
       Perturbed time series.
     keys : tuple
       Name of hru_state attributes to be assimilated, for example ("soil0", "soil1").
-    basin_states : sequence
-      Model initial conditions, BasinStateVariables instances.
-    hru_states : sequence
-      Model initial conditions, HRUStateVariables instances.
+    basin_states : StateEnsemble or sequence
+      Model initial conditions, either the subbasin states of all the members (e.g. `StateEnsemble.basin_view`) or
+      one BasinIndexCommand instance per member.
+    hru_states : StateEnsemble or sequence
+      Model initial conditions, either the HRU states of all the members (e.g. `StateEnsemble.hru_view`) or one
+      HRUState instance per member.
     q_obs : xarray.Dataset
       The actual observed streamflow over the entire period.
     ts : str, Path, list
@@ -61,20 +64,19 @@ def assimilate(
 
     if len(basin_states) != len(hru_states):
         raise ValueError("`basin_states` and `hru_states` must have the same length.")
+    # The members of ensembles and the records are combined for each simulation (see `Raven.run`)
+    states = {"hru_state": hru_states, "basin_state": basin_states}
 
     model = deepcopy(model)
 
     # Number of members
-    n_members = len(basin_states)
+    n_members = len(hru_states)
 
     # Run simulation with perturbed inputs
-    model(ts, hru_state=hru_states, basin_state=basin_states, nc_index=range(n_members))
+    model(ts, nc_index=range(n_members), **states)
 
     # Extract final states (n_states, n_members)
-    f_hru_states, f_basin_states = model.get_final_state()
-    x_matrix = np.array(
-        [[getattr(state, key) for key in keys] for state in f_hru_states]
-    ).T
+    x_matrix = model.get_state_ensemble().get(keys, hru=1).T
 
     # Sanity check
     if x_matrix.shape != (len(keys), n_members):
@@ -315,9 +317,9 @@ def assimilation_initialization(
       The hydrological model with the internal states after the n_members simulations.
     np.array
       Array of state variables used overwrite the current initial states.
-    ravenpy.Raven.hru_states instance
+    StateEnsemble
       The Raven model states for the hru information (size n_members)
-    ravenpy.Raven.basin_states instance
+    StateEnsemble
       The Raven model states for the basin information (size n_members).
     """
     # Set model options
@@ -356,12 +358,10 @@ def assimilation_initialization(
     model([ts])
     """
     # Extract final model states
-    hru_state, basin_state = model.get_final_state()
-    xa = n_members * [getattr(hru_state, key) for key in assim_var]
-    hru_states = n_members * [hru_state]
-    basin_states = n_members * [basin_state]
+    states = StateEnsemble.repeat(model.state, n_members)
+    xa = n_members * states.get(assim_var, hru=1)[0].tolist()
 
-    return model, xa, hru_states, basin_states
+    return model, xa, states.hru_view(), states.basin_view()
 
 
 def sequential_assimilation(
@@ -387,9 +387,9 @@ def sequential_assimilation(
     ----------
     model : ravenpy.Raven instance
       The hydrological model with the internal states after the n_members simulations.
-    hru_states : ravenpy.Raven.hru_states instance
+    hru_states : StateEnsemble or sequence
       The Raven model states containing the initial ensemble hru information (size n_members)
-    basin_states : ravenpy.Raven.basin_states instance
+    basin_states : StateEnsemble or sequence
       The Raven model states containing the initial ensemble basin information (size n_members).
     p_fn : string
       Path to the perturbed forcing data netcdf file.
@@ -411,9 +411,9 @@ def sequential_assimilation(
     -------
     xarray.DataArray
         Array of assimilated streamflows for the full period duration. Size is n_members x time.
-    ravenpy.Raven.hru_states instance
+    StateEnsemble
         The Raven model states for the hru information at the end of the period (size n_members)
-    ravenpy.Raven.basin_states instance
+    StateEnsemble
         The Raven model states for the basin information at the end of the period (size n_members).
     """
 
@@ -445,11 +445,9 @@ def sequential_assimilation(
         model.config.rvi.start_date = sd
 
         # Get new initial conditions and feed assimilated values
-        hru_states, basin_states = model.get_final_state()
-        hru_states = [
-            replace(hru_states[i], **dict(zip(assim_var, xa[:, i])))
-            for i in range(n_members)
-        ]
+        states = model.get_state_ensemble()
+        states.set(assim_var, xa.T, hru=1)
+        hru_states, basin_states = states.hru_view(), states.basin_view()
 
     q_assim = xr.concat(q_assim, dim="time")
 
@@ -1,12 +1,35 @@
+import json
+import os
+import subprocess
+import sys
+import time
 import zipfile
 from pathlib import Path
+from unittest import mock
 
 import numpy as np
+import pandas as pd
 import pytest
+import xarray as xr
 
 import ravenpy
-from ravenpy.models import Ostrich, Raven, RavenError
-from ravenpy.models.base import get_diff_level
+from ravenpy.models import (
+    Ostrich,
+    ProcessUsage,
+    Raven,
+    RavenError,
+    ResultCache,
+    RunProfile,
+    RunResult,
+)
+from ravenpy.models.base import (
+    _communicate,
+    get_diff_level,
+    merge_raven_messages,
+    parse_raven_messages,
+)
+from ravenpy.models.profiling import summarize_usage
+from ravenpy.models.results import load_diagnostics
 from ravenpy.utilities.testdata import get_local_testdata
 
 has_singularity = False  # ravenpy.raven_simg.exists()
@@ -55,6 +78,48 @@ class TestRaven:
 
         assert model.config.rvi.raven_version == model.raven_version
 
+        model.raven_version = "3.0.1"
+        assert model.raven_version == "3.0.1"
+
+        # Probed again for another binary
+        model.raven_exec = model.raven_exec
+        assert model.raven_version == model.config.rvi.raven_version
+
+    def test_raven_version_registry(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(ravenpy.models.base, "_raven_versions", {})
+
+        calls = []
+        check_output = ravenpy.models.base.subprocess.check_output
+
+        def probe(*args, **kwds):
+            calls.append(kwds["cwd"])
+            return check_output(*args, **kwds)
+
+        monkeypatch.setattr(ravenpy.models.base.subprocess, "check_output", probe)
+
+        versions = {Raven().raven_version for _ in range(3)}
+        assert len(versions) == 1
+        assert len(calls) == 1
+        assert calls[0] != str(tmp_path)
+
+        # The probe does not leave a Raven_errors.txt file in the current directory
+        assert not (tmp_path / "Raven_errors.txt").exists()
+
+    def test_construction_spawns_no_process(self, tmp_path, monkeypatch):
+        # Warm the version registry
+        assert Raven().raven_version
+
+        def spawn(*args, **kwds):
+            raise AssertionError("A process was spawned")
+
+        for name in ["run", "check_output", "Popen"]:
+            monkeypatch.setattr(ravenpy.models.base.subprocess, name, spawn)
+
+        model = Raven(workdir=tmp_path)
+        assert model.raven_version
+        assert not any(tmp_path.iterdir())
+
     def test_gr4j(self):
         rvs = get_local_testdata("raven-gr4j-cemaneige/raven-gr4j-salmon.rv?")
         ts = get_local_testdata(
@@ -101,6 +166,30 @@ class TestRaven:
         z = zipfile.ZipFile(model.outputs["rv_config"])
         assert len(z.filelist) == 5
 
+    def test_result_cache(self, tmp_path):
+        rvs = get_local_testdata("raven-gr4j-cemaneige/raven-gr4j-salmon.rv?")
+        ts = get_local_testdata(
+            "raven-gr4j-cemaneige/Salmon-River-Near-Prince-George_meteo_daily.nc"
+        )
+        cache = ResultCache(tmp_path / "cache")
+
+        model = Raven()
+        model.configure(rvs)
+        model.cache = cache
+        model(ts)
+        assert (cache.hits, cache.misses) == (0, 1)
+
+        cached = Raven()
+        cached.configure(rvs)
+        cached.cache = cache
+        procs = cached.run(ts)
+        assert procs == [None]
+        assert (cache.hits, cache.misses) == (1, 1)
+
+        cached.parse_results()
+        np.testing.assert_array_equal(cached.q_sim, model.q_sim)
+        assert cached.solution.to_rv() == model.solution.to_rv()
+
     @pytest.mark.skipif(not has_singularity, reason="Singularity is not available.")
     def test_singularity(self):
         rvs = get_local_testdata("raven-gr4j-cemaneige/raven-gr4j-salmon.rv?")
@@ -397,6 +486,23 @@ class TestOstrich:
         assert len(z.filelist) == 7
 
 
+def test_merge_raven_messages():
+    msgs = {
+        0: parse_raven_messages("WARNING : w0\nSIMULATION COMPLETE :)\n"),
+        1: parse_raven_messages("ERROR : e1\nSIMULATION COMPLETE :)\n"),
+    }
+    merged = merge_raven_messages(msgs)
+    assert merged["ERROR"] == ["Simulation 1: e1"]
+    assert merged["WARNING"] == ["Simulation 0: w0"]
+    assert merged["SIMULATION COMPLETE"]
+
+    assert merge_raven_messages({0: msgs[0]})["WARNING"] == ["w0"]
+
+    msgs[2] = parse_raven_messages("")
+    assert not merge_raven_messages(msgs)["SIMULATION COMPLETE"]
+    assert not merge_raven_messages({})["SIMULATION COMPLETE"]
+
+
 def test_get_diff_level():
     fn = Path("/") / "a" / "b" / "c.txt"
     files = [fn, Path("/") / "a" / "b" / "d.txt"]
@@ -411,3 +517,186 @@ def test_get_diff_level():
     assert get_diff_level(files) == 2
     assert files[0].relative_to(Path(*fn.parts[:2])) == Path("b/c.txt")
     assert files[1].relative_to(Path(*files[1].parts[:2])) == Path("b1/b2/c.txt")
+
+
+class TestResultCache:
+    def test_store_restore(self, tmp_path):
+        out = tmp_path / "output"
+        out.mkdir()
+        fns = [out / "run_Hydrographs.nc", out / "Raven_errors.txt"]
+        for fn in fns:
+            fn.write_text(fn.name)
+
+        cache = ResultCache(tmp_path / "cache")
+        key = cache.key("rvi content", "rvh content")
+        assert key != cache.key("rvi contentrvh content")
+
+        assert not cache.restore(key, tmp_path / "restored")
+        cache.store(key, fns)
+        assert cache.restore(key, tmp_path / "restored")
+        assert (tmp_path / "restored" / "run_Hydrographs.nc").read_text() == fns[0].name
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_file_signature(self, tmp_path):
+        fn = tmp_path / "forcing.nc"
+        fn.write_text("a")
+
+        cache = ResultCache(tmp_path / "cache", checksum=True)
+        sig = cache.file_signature(fn)
+        fn.write_text("b")
+        assert cache.file_signature(fn) != sig
+
+        url = "https://example.org/forcing.nc"
+        assert cache.file_signature(url) == url
+
+    def test_lru_eviction(self, tmp_path):
+        fn = tmp_path / "out.nc"
+        fn.write_bytes(b"x" * 100)
+
+        cache = ResultCache(tmp_path / "cache", max_size=250)
+        cache.store("a", [fn])
+        cache.store("b", [fn])
+
+        # Make "a" the most recently used entry
+        os.utime(cache.path / "b", (0, 0))
+        assert cache.restore("a", tmp_path / "restored")
+
+        cache.store("c", [fn])
+        assert cache.size == 200
+        assert not (cache.path / "b").exists()
+        assert (cache.path / "a").exists()
+
+        cache.clear()
+        assert cache.size == 0
+        assert cache.hits == 0
+
+
+class TestRunResult:
+    @staticmethod
+    def write_hydrograph(path):
+        fn = path / "run_Hydrographs.nc"
+        xr.Dataset(
+            {"q_sim": (("time", "nbasins"), np.random.rand(365, 2))},
+            coords={"time": pd.date_range("2000-01-01", periods=365)},
+        ).to_netcdf(fn)
+        return fn
+
+    def test_cached_access(self, tmp_path, monkeypatch):
+        fn = self.write_hydrograph(tmp_path)
+        res = RunResult({"hydrograph": fn}, {"hydrograph": [fn]})
+
+        # Repeated accesses do not reopen the file
+        open_dataset = mock.Mock(wraps=xr.open_dataset)
+        monkeypatch.setattr(ravenpy.models.results.xr, "open_dataset", open_dataset)
+        q = res.q_sim
+        assert res.q_sim is q
+        assert res.hydrograph is res.hydrograph
+        assert open_dataset.call_count == 1
+
+    def test_close(self, tmp_path):
+        fn = self.write_hydrograph(tmp_path)
+        with RunResult({"hydrograph": fn}, {"hydrograph": [fn]}) as res:
+            q = res.q_sim
+            ds = res.hydrograph
+        assert res._cache == {}
+
+        # Outputs are opened again after `close`
+        assert res.hydrograph is not ds
+        xr.testing.assert_identical(res.q_sim, q)
+        res.close()
+
+
+class TestRunProfile:
+    def test_summary(self, tmp_path):
+        prof = RunProfile("gr4jcn")
+        for psim in range(2):
+            with prof.timer("_dump_rv", psim):
+                pass
+            prof.add("execute", psim, 1.5)
+
+        summary = prof.summary()
+        assert summary["_dump_rv"]["count"] == 2
+        assert summary["_dump_rv"]["cpu"] >= 0
+        assert summary["execute"] == {"count": 2, "wall": 3.0, "cpu": None}
+
+        fn = tmp_path / "timings.jsonl"
+        prof.write_jsonl(fn)
+        prof.write_jsonl(fn)
+        lines = [json.loads(line) for line in fn.read_text().splitlines()]
+        assert len(lines) == 8
+        assert lines[1]["phase"] == "execute"
+        assert lines[1]["psim"] == 0
+        assert lines[1]["identifier"] == "gr4jcn"
+
+    @pytest.mark.skipif(not hasattr(os, "wait4"), reason="os.wait4 is not available")
+    def test_process_usage(self):
+        usage = []
+        for psim in range(2):
+            proc = subprocess.Popen(
+                [sys.executable, "-c", "sum(range(10 ** 6))"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+            )
+            rusage = _communicate(proc, input=b"\n")
+            assert proc.returncode == 0
+            usage.append(ProcessUsage.from_rusage(psim, rusage, wall=1.0))
+
+        assert usage[0].max_rss > 0
+        assert usage[0].cpu_time > 0
+
+        summary = summarize_usage(usage)
+        assert summary["count"] == 2
+        assert summary["max_rss"] == max(u.max_rss for u in usage)
+        assert summary["cpu_time"] == pytest.approx(sum(u.cpu_time for u in usage))
+        assert summary["wall"] == 2.0
+
+    @pytest.mark.skipif(not hasattr(os, "wait4"), reason="os.wait4 is not available")
+    def test_process_usage_exit_status(self):
+        # The process exits with an error without reading its input
+        proc = subprocess.Popen(
+            [sys.executable, "-c", "import os; os._exit(3)"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+        )
+        time.sleep(0.5)
+        assert _communicate(proc, input="\n" * 2**20) is not None
+        assert proc.returncode == 3
+        assert proc.poll() == 3
+
+
+def test_load_diagnostics(tmp_path):
+    files = []
+    for i in range(3):
+        fn = tmp_path / f"run-{i}_Diagnostics.csv"
+        fn.write_text(
+            "observed_data_series,filename,DIAG_NASH_SUTCLIFFE,DIAG_RMSE,\n"
+            f"HYDROGRAPH_ALL[1],obs.nc,0.{i},{i}.5,\n"
+            f"HYDROGRAPH_ALL[2],obs.nc,0.{i}1,{i}.6,\n"
+            f"Average_HYDROGRAPH_ALL,[multiple],0.{i}2,{i}.7,\n"
+            f"HYDROGRAPH_cal_1[1],obs.nc,0.{i}3,{i}.8,\n"
+            f"HYDROGRAPH_cal_1[2],obs.nc,0.{i}4,{i}.9,\n"
+            f"Average_HYDROGRAPH_cal_1,[multiple],0.{i}5,{i}.0,\n"
+        )
+        files.append(fn)
+
+    ds = load_diagnostics(files, dim="params", periods=["cal_1"])
+    da = ds.diagnostics
+    assert da.dims == ("params", "metric", "period", "observation")
+    assert list(da.period.values) == ["ALL", "cal_1"]
+    assert list(da.observation.values) == [
+        "HYDROGRAPH[1]",
+        "HYDROGRAPH[2]",
+        "Average_HYDROGRAPH",
+    ]
+    np.testing.assert_array_equal(
+        da.sel(metric="DIAG_RMSE", period="cal_1", observation="HYDROGRAPH[2]"),
+        [0.9, 1.9, 2.9],
+    )
+
+    ds = load_diagnostics(files[:1], periods=["cal_1"])
+    assert ds.diagnostics.dims == ("metric", "period", "observation")
+
+    files[2].write_text(files[2].read_text().split("Average")[0])
+    with pytest.raises(ValueError):
+        load_diagnostics(files, dim="params", periods=["cal_1"])
@@ -1,6 +1,7 @@
 import re
 
 import netCDF4 as nc4
+import numpy as np
 from click.testing import CliRunner
 
 from ravenpy.cli import aggregate_forcings_to_hrus, generate_grid_weights
@@ -150,6 +151,62 @@ class TestGenerateGridWeights:
         weight = float(re.search("13 238 (.+)", output).group(1))
         assert abs(weight - 0.9851111335377887) < 1e-04
 
+    def test_generate_grid_weights_with_jobs(self, tmp_path):
+        runner = CliRunner()
+        outputs = []
+        for jobs in ["1", "3"]:
+            output_path = tmp_path / f"weights_{jobs}.rvt"
+            params = [
+                get_local_testdata("raven-routing-sample/VIC_streaminputs.nc"),
+                get_local_testdata("raven-routing-sample/finalcat_hru_info.zip"),
+                "--jobs",
+                jobs,
+                "--no-cache",
+                "-o",
+                output_path,
+            ]
+            params = map(str, params)
+
+            result = runner.invoke(generate_grid_weights, params)
+
+            assert result.exit_code == 0
+            assert not result.exception
+            outputs.append(output_path.read_text())
+
+        assert outputs[0] == outputs[1]
+
+    def test_generate_grid_weights_with_cache(self, tmp_path):
+        runner = CliRunner()
+        cache_dir = tmp_path / "cache"
+        output_path = tmp_path / "bla.rvt"
+        params = [
+            get_local_testdata("raven-routing-sample/VIC_streaminputs.nc"),
+            get_local_testdata("raven-routing-sample/finalcat_hru_info.zip"),
+            "--cache-dir",
+            cache_dir,
+            "-o",
+            output_path,
+        ]
+        params = list(map(str, params))
+
+        outputs = []
+        for extra in [[], [], ["--refresh-cache"]]:
+            result = runner.invoke(generate_grid_weights, params + extra)
+
+            assert result.exit_code == 0
+            assert not result.exception
+            outputs.append(output_path.read_text())
+
+        assert len(list(cache_dir.iterdir())) == 1
+        assert outputs[0] == outputs[1] == outputs[2]
+
+        # A different threshold is a different entry
+        result = runner.invoke(
+            generate_grid_weights, params + ["--area-error-threshold", "0.42"]
+        )
+        assert result.exit_code == 0
+        assert len(list(cache_dir.iterdir())) == 2
+
 
 class TestAggregateForcingsToHRUs:
     def test_aggregate_forcings_to_hrus(self, tmp_path):
@@ -295,3 +352,58 @@ class TestAggregateForcingsToHRUs:
         assert val[2, 3].mask  # = 0.4*NODATA + 0.6*NODATA
         assert abs(val[2, 3].data - 0.0) < 1e-04  # = 0.4*NODATA + 0.6*NODATA
         assert abs(val[3, 3] - 4.0) < 1e-04  # = 0.4*4 + 0.6*NODATA = 1.0*4
+
+    def test_aggregate_forcings_to_hrus_with_time_window(self, tmp_path):
+        runner = CliRunner()
+        params = [
+            get_local_testdata("raven-routing-sample/VIC_test_nodata.nc"),
+            get_local_testdata("raven-routing-sample/VIC_test_nodata_weights.rvt"),
+            "-v",
+            "et",
+            "--dim-names",
+            "rlon",
+            "rlat",
+            "--output-weight-file",
+            tmp_path / "weight_aggreg.rvt",
+        ]
+
+        result = runner.invoke(
+            aggregate_forcings_to_hrus,
+            list(map(str, params + ["--output-nc-file", tmp_path / "aggreg.nc"])),
+        )
+        assert result.exit_code == 0
+
+        # one time step per window: the NODATA cells of each time step are the same at all the time steps of the window
+        result = runner.invoke(
+            aggregate_forcings_to_hrus,
+            list(
+                map(
+                    str,
+                    params
+                    + [
+                        "--output-nc-file",
+                        tmp_path / "aggreg_window.nc",
+                        "--time-window",
+                        1,
+                        "--chunk-size",
+                        2,
+                        "--no-zlib",
+                    ],
+                )
+            ),
+        )
+        assert result.exit_code == 0
+        assert not result.exception
+
+        with nc4.Dataset(tmp_path / "aggreg.nc", "r") as nc_in:
+            val = nc_in.variables["et"][:]
+            assert nc_in.variables["et"].filters()["zlib"]
+
+        with nc4.Dataset(tmp_path / "aggreg_window.nc", "r") as nc_in:
+            var = nc_in.variables["et"]
+            assert not var.filters()["zlib"]
+            assert var.chunking() == [2, 4]
+            val_window = var[:]
+
+        np.testing.assert_array_equal(val_window.mask, val.mask)
+        np.testing.assert_array_equal(val_window.data, val.data)
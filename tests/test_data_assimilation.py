@@ -1,4 +1,5 @@
 import datetime as dt
+import zipfile
 
 import matplotlib.pyplot as plt
 import numpy as np
@@ -8,6 +9,7 @@ import xskillscore as xss
 
 from ravenpy.models import GR4JCN
 from ravenpy.utilities.data_assimilation import (
+    assimilate,
     assimilation_initialization,
     perturb_full_series,
     perturbation,
@@ -35,6 +37,69 @@ def test_perturbation():
 
 
 class TestAssimilationGR4JCN:
+    def test_assimilate_states(self):
+        ts = get_local_testdata(
+            "raven-gr4j-cemaneige/Salmon-River-Near-Prince-George_meteo_daily.nc"
+        )
+        n_members = 3
+        assim_var = ("soil0", "soil1")
+        start_date = dt.datetime(1996, 9, 1)
+        end_date = dt.datetime(1996, 9, 6)
+
+        model, xa, hru_states, basin_states = assimilation_initialization(
+            GR4JCN(),
+            ts,
+            start_date=start_date,
+            end_date=start_date + dt.timedelta(days=2),
+            area=4250.6,
+            elevation=843.0,
+            latitude=54.4848,
+            longitude=-123.3659,
+            params=(0.1353389, -0.005067198, 576.8007, 6.986121, 1.102917, 0.9224778),
+            assim_var=assim_var,
+            n_members=n_members,
+        )
+        hru_states.set("soil0", [[11.5], [12.5], [13.5]])
+
+        perturbed = perturb_full_series(
+            model,
+            std={
+                "rainfall": 0.30,
+                "prsn": 0.30,
+                "tasmin": 2.0,
+                "tasmax": 2.0,
+                "water_volume_transport_in_river_channel": 0.10,
+            },
+            start_date=start_date,
+            end_date=end_date,
+            dists={
+                "rainfall": "gamma",
+                "prsn": "gamma",
+                "water_volume_transport_in_river_channel": "rnorm",
+            },
+            n_members=n_members,
+        )
+        p_fn = model.workdir / "perturbed_forcing.nc"
+        xr.Dataset(perturbed).to_netcdf(p_fn, mode="w")
+        q_obs = xr.open_dataset(ts)["qobs"].sel(time=slice(start_date, end_date))
+
+        # Assimilation step starting from the HRU and basin states given separately
+        dates = [start_date + dt.timedelta(days=x) for x in range(3, 6)]
+        model.config.rvi.start_date = dates[0]
+        model.config.rvi.end_date = dates[-1]
+        xa, model = assimilate(
+            model, p_fn, q_obs, assim_var, basin_states, hru_states, dates
+        )
+        assert xa.shape == (len(assim_var), n_members)
+
+        with zipfile.ZipFile(model.outputs["rv_config"]) as z:
+            rvcs = sorted(n for n in z.namelist() if n.endswith(".rvc"))
+            assert len(rvcs) == n_members
+            for name, soil0 in zip(rvcs, ["11.5", "12.5", "13.5"]):
+                rvc = z.read(name).decode()
+                assert f"    1,{soil0}," in rvc
+                assert ":BasinIndex 1" in rvc
+
     def test_simple(self):
 
         # get timeseries
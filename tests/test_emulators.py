@@ -1,3 +1,4 @@
+import asyncio
 import datetime as dt
 import os
 import tempfile
@@ -37,6 +38,7 @@ from ravenpy.models import (
     RavenError,
     get_average_annual_runoff,
 )
+from ravenpy.models.base import MAX_CONCURRENT_RUNS, _get_async_semaphore
 from ravenpy.utilities.testdata import get_local_testdata
 
 from .common import _convert_2d
@@ -263,7 +265,8 @@ class TestGR4JCN:
             # has only one region/station (which is column 0)
             data=((1, 0, 1.0), (2, 0, 1.0), (3, 0, 1.0)),
         )
-        # These will be shared (inline) to all the StationForcing commands in the RVT
+        # These will be shared by all the StationForcing commands in the RVT, through
+        # a :RedirectToFile command
         model.config.rvt.grid_weights = gws
 
         #########
@@ -385,6 +388,20 @@ class TestGR4JCN:
         d = model.diagnostics
         np.testing.assert_almost_equal(d["DIAG_NASH_SUTCLIFFE"], -0.0141168, 4)
 
+        # The grid weights are written once, in their own file
+        rvt = (model.model_path / f"{model.identifier}.rvt").read_text()
+        assert ":GridWeights" not in rvt
+        n_forcings = rvt.count(":StationForcing ")
+        assert n_forcings > 1
+        assert rvt.count(f":RedirectToFile {model.grid_weights_file}") == n_forcings
+        gw = (model.model_path / model.grid_weights_file).read_text()
+        assert GridWeightsCommand.parse(gw) == gws
+
+        # The weights are inlined when the RVT is rendered on its own
+        rvt = model.config.rvt.to_rv()
+        assert ":RedirectToFile" not in rvt
+        assert rvt.count(":GridWeights") == n_forcings
+
     def test_config_update(self):
         model = GR4JCN()
 
@@ -695,6 +712,266 @@ class TestGR4JCN:
         z = zipfile.ZipFile(model.outputs["rv_config"])
         assert len(z.filelist) == 10
 
+    def test_parallel_params_max_workers(self):
+        params = [
+            (0.529, -3.396, 407.29, 1.072, 16.9, 0.947),
+            (0.528, -3.4, 407.3, 1.07, 17, 0.95),
+            (0.527, -3.5, 407.2, 1.08, 16, 0.94),
+        ]
+        kwargs = dict(
+            start_date=dt.datetime(2000, 1, 1),
+            end_date=dt.datetime(2002, 1, 1),
+        )
+
+        model = GR4JCN()
+        model.config.rvh.hrus = (GR4JCN.LandHRU(**salmon_land_hru_1),)
+        model(TS, params=params, max_workers=2, **kwargs)
+
+        assert model.hydrograph.dims["params"] == 3
+        assert len(model.ind_outputs["hydrograph"]) == 3
+
+        # Outputs are ordered like the parameters, whatever the order of completion
+        for i, p in enumerate(params):
+            single = GR4JCN()
+            single.config.rvh.hrus = (GR4JCN.LandHRU(**salmon_land_hru_1),)
+            single(TS, params=p, **kwargs)
+            np.testing.assert_array_equal(model.q_sim.isel(params=i), single.q_sim)
+
+    def test_parallel_params_lazy_output(self, tmp_path):
+        params = [
+            (0.529, -3.396, 407.29, 1.072, 16.9, 0.947),
+            (0.528, -3.4, 407.3, 1.07, 17, 0.95),
+        ]
+        model = GR4JCN()
+        model.config.rvh.hrus = (GR4JCN.LandHRU(**salmon_land_hru_1),)
+        model(
+            TS,
+            params=params,
+            start_date=dt.datetime(2000, 1, 1),
+            end_date=dt.datetime(2002, 1, 1),
+        )
+
+        # The hydrographs are not concatenated in a new file
+        assert isinstance(model.outputs["hydrograph"], xr.Dataset)
+        assert model.q_sim.chunks is not None
+        assert not list(model.final_path.glob("*.nc"))
+
+        fn = model.materialize(tmp_path / "hydrographs.nc")
+        with xr.open_dataset(fn) as ds:
+            xr.testing.assert_identical(ds.load(), model.hydrograph.load())
+
+    def test_scratch_dir(self, tmp_path):
+        params = [
+            (0.529, -3.396, 407.29, 1.072, 16.9, 0.947),
+            (0.528, -3.4, 407.3, 1.07, 17, 0.95),
+        ]
+        model = GR4JCN()
+        model.config.rvh.hrus = (GR4JCN.LandHRU(**salmon_land_hru_1),)
+        model.scratch_dir = tmp_path / "scratch"
+        model.scratch_outputs = ["hydrograph"]
+        model(
+            TS,
+            params=params,
+            start_date=dt.datetime(2000, 1, 1),
+            end_date=dt.datetime(2002, 1, 1),
+        )
+
+        # The execution directory has been removed
+        assert list(model.scratch_dir.iterdir()) == []
+        assert not (model.workdir / "exec").exists()
+
+        assert model.hydrograph.dims["params"] == 2
+        assert "storage" not in model.outputs
+        for fn in model.ind_outputs["hydrograph"]:
+            assert fn.parent.parent.parent == model.final_path
+
+        # The outputs of the run are parsed again from the final directory
+        assert model.exec_path == model.final_path
+        hydrographs = model.ind_outputs["hydrograph"]
+        model.parse_results()
+        assert model.ind_outputs["hydrograph"] == hydrographs
+        assert model.hydrograph.dims["params"] == 2
+
+    def test_profile(self, tmp_path):
+        params = [
+            (0.529, -3.396, 407.29, 1.072, 16.9, 0.947),
+            (0.528, -3.4, 407.3, 1.07, 17, 0.95),
+        ]
+        model = GR4JCN()
+        model.config.rvh.hrus = (GR4JCN.LandHRU(**salmon_land_hru_1),)
+        model.profile_file = tmp_path / "timings.jsonl"
+        model(
+            TS,
+            params=params,
+            start_date=dt.datetime(2000, 1, 1),
+            end_date=dt.datetime(2002, 1, 1),
+        )
+
+        summary = model.timings.summary()
+        for phase in ["derived_parameters", "_dump_rv", "setup_model_run", "execute"]:
+            assert summary[phase]["count"] == 2
+        for phase in ["extract_raven_messages", "parse_results"]:
+            assert summary[phase]["count"] == 1
+        assert summary["execute"]["cpu"] > 0
+
+        assert [u.psim for u in model.results.usage] == [0, 1]
+        assert model.results.usage_summary()["max_rss"] > 0
+
+        records = model.profile_file.read_text().splitlines()
+        assert len(records) == len(model.timings.records)
+
+    def test_parallel_params_messages(self):
+        params = [
+            (0.529, -3.396, 407.29, 1.072, 16.9, 0.947),
+            (0.528, -3.4, 407.3, 1.07, 17, 0.95),
+        ]
+        model = GR4JCN()
+        model.config.rvh.hrus = (GR4JCN.LandHRU(**salmon_land_hru_1),)
+        kwds = dict(
+            params=params,
+            start_date=dt.datetime(2000, 1, 1),
+            end_date=dt.datetime(2002, 1, 1),
+        )
+        model(TS, **kwds)
+
+        assert sorted(model.raven_messages) == [0, 1]
+        assert all(m["SIMULATION COMPLETE"] for m in model.raven_messages.values())
+
+        # The messages of a previous run in the same directory are not picked up
+        err_file = model.ind_outputs["hydrograph"][1].parent / "Raven_errors.txt"
+        err_file.write_text("ERROR : Stale error\n")
+        model(TS, **kwds)
+        assert not model.raven_messages[1]["ERROR"]
+
+    def test_parallel_params_reuse_rv(self):
+        params = [
+            (0.529, -3.396, 407.29, 1.072, 16.9, 0.947),
+            (0.528, -3.4, 407.3, 1.07, 17, 0.95),
+        ]
+        model = GR4JCN()
+        model.config.rvh.hrus = (GR4JCN.LandHRU(**salmon_land_hru_1),)
+        model(
+            TS,
+            params=params,
+            start_date=dt.datetime(2000, 1, 1),
+            end_date=dt.datetime(2002, 1, 1),
+        )
+
+        p0, p1 = (model.exec_path / "model" / f"p{i:02}" for i in range(2))
+        for rvx in ["rvh", "rvt", "rvc"]:
+            fn = f"{model.identifier}.{rvx}"
+            assert (p0 / fn).samefile(p1 / fn)
+
+        fn = f"{model.identifier}.rvp"
+        assert not (p0 / fn).samefile(p1 / fn)
+
+        def content(text):
+            return [line for line in text.splitlines() if ":CreationDate" not in line]
+
+        assert content((p1 / fn).read_text()) == content(model.config.rvp.to_rv())
+
+    def test_parallel_params_rv_modified_in_place(self, monkeypatch):
+        model = GR4JCN()
+        model.config.rvh.hrus = (GR4JCN.LandHRU(**salmon_land_hru_1),)
+
+        # The HRU is modified in place before the setup of the second simulation
+        setup_model_run = model.setup_model_run
+
+        def setup(ts):
+            if model.psim == 1:
+                model.config.rvh.hrus[0].area = 1234.5
+                model.config.rvh.set_modified("hrus")
+            return setup_model_run(ts)
+
+        monkeypatch.setattr(model, "setup_model_run", setup)
+        model(
+            TS,
+            params=[(0.529, -3.396, 407.29, 1.072, 16.9, 0.947)] * 2,
+            start_date=dt.datetime(2000, 1, 1),
+            end_date=dt.datetime(2002, 1, 1),
+        )
+
+        p0, p1 = (model.exec_path / "model" / f"p{i:02}" for i in range(2))
+        fn = f"{model.identifier}.rvh"
+        assert not (p0 / fn).samefile(p1 / fn)
+        assert "1234.5" in (p1 / fn).read_text()
+        assert "1234.5" not in (p0 / fn).read_text()
+
+    def test_arun(self):
+        params = [
+            (0.529, -3.396, 407.29, 1.072, 16.9, 0.947),
+            (0.528, -3.4, 407.3, 1.07, 17, 0.95),
+        ]
+        kwargs = dict(
+            start_date=dt.datetime(2000, 1, 1),
+            end_date=dt.datetime(2002, 1, 1),
+        )
+
+        models = [GR4JCN(), GR4JCN()]
+        for model in models:
+            model.config.rvh.hrus = (GR4JCN.LandHRU(**salmon_land_hru_1),)
+
+        async def main():
+            await asyncio.gather(
+                models[0].arun(TS, params=params, **kwargs),
+                models[1].arun(TS, params=params[0], **kwargs),
+            )
+
+        asyncio.run(main())
+
+        assert models[0].hydrograph.dims["params"] == 2
+        np.testing.assert_array_equal(models[0].q_sim.isel(params=0), models[1].q_sim)
+
+    def test_arun_cancel(self):
+        model = GR4JCN()
+        model.config.rvh.hrus = (GR4JCN.LandHRU(**salmon_land_hru_1),)
+
+        async def main():
+            task = asyncio.ensure_future(
+                model.arun(
+                    TS,
+                    start_date=dt.datetime(1954, 1, 1),
+                    end_date=dt.datetime(2010, 1, 1),
+                    params=[(0.529, -3.396, 407.29, 1.072, 16.9, 0.947)] * 4,
+                )
+            )
+            await asyncio.sleep(0.1)
+            task.cancel()
+            await task
+
+        with pytest.raises(asyncio.CancelledError):
+            asyncio.run(main())
+
+        assert not model.outputs
+
+    def test_arun_setup_error(self, monkeypatch):
+        model = GR4JCN()
+        model.config.rvh.hrus = (GR4JCN.LandHRU(**salmon_land_hru_1),)
+
+        # The setup of the second simulation fails while the first one is running
+        setup_model_run = model.setup_model_run
+
+        def setup(ts):
+            if model.psim == 1:
+                raise ValueError("setup failed")
+            return setup_model_run(ts)
+
+        monkeypatch.setattr(model, "setup_model_run", setup)
+
+        async def main():
+            semaphore = _get_async_semaphore()
+            with pytest.raises(ValueError):
+                await model.arun(
+                    TS,
+                    start_date=dt.datetime(2000, 1, 1),
+                    end_date=dt.datetime(2002, 1, 1),
+                    params=[(0.529, -3.396, 407.29, 1.072, 16.9, 0.947)] * 2,
+                )
+            # The permits of the cancelled simulations are released
+            assert semaphore._value == MAX_CONCURRENT_RUNS
+
+        asyncio.run(main())
+
     def test_parallel_basins(self, input2d):
         ts = input2d
         model = GR4JCN()
@@ -834,6 +1111,28 @@ class TestGR4JCN_OST:
             gr4j.diagnostics["DIAG_NASH_SUTCLIFFE"], d["DIAG_NASH_SUTCLIFFE"]
         )
 
+    def test_arun(self):
+        model = GR4JCN_OST()
+        model.config.rvh.hrus = (GR4JCN.LandHRU(**salmon_land_hru_1),)
+        model.configure(
+            get_local_testdata("ostrich-gr4j-cemaneige/OstRandomNumbers.txt")
+        )
+
+        asyncio.run(
+            model.arun(
+                TS,
+                start_date=dt.datetime(1954, 1, 1),
+                duration=208,
+                lowerBounds=(0.01, -15.0, 10.0, 0.0, 1.0, 0.0),
+                upperBounds=(2.5, 10.0, 700.0, 7.0, 30.0, 1.0),
+                algorithm="DDS",
+                random_seed=0,
+                max_iterations=10,
+            )
+        )
+
+        np.testing.assert_almost_equal(model.obj_func, -0.50717, 4)
+
 
 class TestHMETS:
     def test_simple(self):
@@ -0,0 +1,45 @@
+from ravenpy.config.commands import GridWeightsCommand
+from ravenpy.extractors import RoutingProductGridWeightExtractor
+from ravenpy.utilities.grid_weights import GridWeightsCache
+from ravenpy.utilities.testdata import get_local_testdata
+
+
+class TestGridWeightsCache:
+    def test_save_load(self, tmp_path):
+        gw = GridWeightsCommand.from_arrays(
+            [1, 1, 2], [0, 3, 3], [0.25, 0.75, 1.0], number_grid_cells=4
+        )
+        cache = GridWeightsCache(tmp_path / "cache")
+        assert cache.load("a") is None
+
+        cache.save("a", gw)
+        loaded = cache.load("a")
+        assert (loaded.number_hrus, loaded.number_grid_cells) == (2, 4)
+        assert loaded.data == gw.data
+        assert loaded.to_rv() == gw.to_rv()
+        assert (cache.hits, cache.misses) == (1, 1)
+
+        # Saving again replaces the entry
+        cache.save("a", GridWeightsCommand.from_arrays([1], [0], [1.0]))
+        assert cache.load("a").data == ((1, 0, 1.0),)
+        assert [p.name for p in cache.path.iterdir()] == ["a"]
+
+    def test_extractor(self, tmp_path):
+        input_file = get_local_testdata("raven-routing-sample/VIC_streaminputs.nc")
+        routing_file = get_local_testdata("raven-routing-sample/finalcat_hru_info.zip")
+        cache = GridWeightsCache(tmp_path / "cache")
+        extractor = RoutingProductGridWeightExtractor(
+            input_file, routing_file, cache=cache
+        )
+        key = extractor.fingerprint()
+        gw = extractor.extract()
+        assert [p.name for p in cache.path.iterdir()] == [key]
+
+        # The fingerprint is not changed by the extraction, which modifies the inputs
+        assert extractor.fingerprint() == key
+        assert extractor.extract().data == gw.data
+        assert (cache.hits, cache.misses) == (1, 1)
+
+        other = RoutingProductGridWeightExtractor(input_file, routing_file)
+        other.extract()
+        assert other.fingerprint() == key
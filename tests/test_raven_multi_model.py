@@ -1,11 +1,24 @@
 import datetime as dt
+import os
 import zipfile
 
 from ravenpy.models import GR4JCN, RavenMultiModel
+from ravenpy.models.base import parse_raven_messages
 from ravenpy.utilities.testdata import get_local_testdata
 
 
 class TestRavenMultiModel:
+    def test_raven_errors(self):
+        model = RavenMultiModel(models=["gr4jcn", "hmets"])
+        model._models[0].raven_messages = {
+            0: parse_raven_messages("ERROR : boom\nSIMULATION COMPLETE :)\n")
+        }
+        model._models[1].raven_messages = {
+            0: parse_raven_messages("SIMULATION COMPLETE :)\n")
+        }
+
+        assert model._raven_errors() == {"gr4jcn": ["boom"]}
+
     def test_simple(self):
         ts = get_local_testdata(
             "raven-gr4j-cemaneige/Salmon-River-Near-Prince-George_meteo_daily.nc"
@@ -49,5 +62,8 @@ class TestRavenMultiModel:
         )
 
         assert len(model.q_sim) == 2
+        if hasattr(os, "wait4"):
+            # One process per model
+            assert len(model.results.usage) == 2
         z = zipfile.ZipFile(model.outputs["rv_config"])
         assert len(z.filelist) == 10
@@ -1,18 +1,30 @@
 import datetime as dt
+import io
 import re
 from collections import namedtuple
 from pathlib import Path
 
+import numpy as np
 import pytest
 
 import ravenpy
+from pydantic import ValidationError
+
+from ravenpy.config import commands, rvs
 from ravenpy.config.commands import (
+    HRU,
+    BasinIndexCommand,
     BasinStateVariablesCommand,
     EvaluationPeriod,
     GriddedForcingCommand,
+    GridWeightsCommand,
+    GridWeightsData,
+    HRUState,
     HRUStateVariableTableCommand,
+    Sub,
 )
 from ravenpy.config.rvs import OST, RVC, RVH, RVI, RVP, RVT, Config
+from ravenpy.config.states import ModelState, StateEnsemble
 from ravenpy.extractors import (
     RoutingProductGridWeightExtractor,
     RoutingProductShapefileExtractor,
@@ -20,6 +32,95 @@ from ravenpy.extractors import (
 from ravenpy.utilities.testdata import get_local_testdata
 
 
+class TestCommandConstruction:
+    def test_construct(self):
+        assert HRUState.construct(index=2, soil0=1.0) == HRUState(index=2, soil0=1)
+        # Default values are converted as by the constructor
+        assert str(BasinIndexCommand.construct(index=2)) == str(
+            BasinIndexCommand(index=2)
+        )
+        assert HRU.construct(3, 10.0).area == 10
+
+        # Numbers are converted to the type of their field
+        assert type(HRUState.construct(soil0=1).soil0) is float
+        assert type(HRU.construct(np.int64(3)).hru_id) is int
+        assert str(BasinIndexCommand.construct(qout=(1, 2, 0))) == str(
+            BasinIndexCommand(qout=(1, 2, 0))
+        )
+        # Ostrich parameter names are left as is
+        assert HRUState.construct(soil0="par_x01").soil0 == "par_x01"
+
+        # Mutable defaults are not shared
+        gw = GriddedForcingCommand.construct().grid_weights
+        assert gw == GriddedForcingCommand().grid_weights
+        assert gw is not GriddedForcingCommand.construct().grid_weights
+
+        with pytest.raises(TypeError):
+            HRUState.construct(soil9999=1)
+        with pytest.raises(TypeError):
+            EvaluationPeriod.construct(name="period")
+
+    def test_copy(self):
+        hru = HRU(hru_id=1, area=10)
+        new = hru.copy({"area": "12.5"}, validate=True)
+        assert new.area == 12.5
+        assert new.hru_id == 1
+        assert hru.area == 10
+        # Trusted values are not converted
+        assert hru.copy({"area": "12.5"}).area == "12.5"
+
+        with pytest.raises(ValidationError):
+            hru.copy({"area": "large"}, validate=True)
+        with pytest.raises(TypeError):
+            hru.copy({"size": 1})
+
+
+class TestGridWeights:
+    gw = GridWeightsCommand(
+        number_hrus=2,
+        number_grid_cells=4,
+        data=((1, 0, 0.25), (1, 3, 0.5), (2, 1, 1.0)),
+    )
+
+    def test_parse(self):
+        gw = GridWeightsCommand.parse(self.gw.to_rv())
+        assert isinstance(gw.data, GridWeightsData)
+        assert gw == self.gw
+        assert gw.to_rv() == self.gw.to_rv()
+
+        # The arrays behave as the tuple of records
+        assert len(gw.data) == 3
+        assert gw.data[1] == (1, 3, 0.5)
+        assert list(gw.data) == list(self.gw.data)
+        np.testing.assert_array_equal(gw.data.cell_ids, [0, 3, 1])
+
+        with pytest.raises(ValueError):
+            GridWeightsCommand.parse(self.gw.to_rv().replace("0.5", "x"))
+
+    def test_arrays(self):
+        data = self.gw.arrays()
+        ids, sums = data.row_sums()
+        np.testing.assert_array_equal(ids, [1, 2])
+        np.testing.assert_array_equal(sums, [0.75, 1])
+        np.testing.assert_allclose(data.normalized().row_sums()[1], 1)
+
+        ids, m = data.to_matrix(self.gw.number_grid_cells)
+        np.testing.assert_array_equal(m.toarray(), [[0.25, 0, 0, 0.5], [0, 1, 0, 0]])
+
+        # Weights of each HRU in the order of the records
+        records = GridWeightsData([2, 1, 1, 1], [1, 3, 0, 3], [1.0, 0.5, 0.25, 0.25])
+        ids, m = records.to_matrix(canonical=False)
+        np.testing.assert_array_equal(ids, [1, 2])
+        np.testing.assert_array_equal(m.indices, [3, 0, 3, 1])
+        np.testing.assert_array_equal(m.toarray(), [[0.25, 0, 0, 0.75], [0, 1, 0, 0]])
+
+        gw = GridWeightsCommand.from_arrays(
+            data.hru_ids, data.cell_ids, data.weights, number_grid_cells=4
+        )
+        assert gw == self.gw
+        assert GridWeightsCommand(data=gw.data).data is gw.data
+
+
 class TestRV:
     def test_end_date(self):
         rvi = RVI(None)
@@ -55,6 +156,78 @@ class TestRV:
         d = EvaluationPeriod("dry", dt.date(1980, 1, 1), dt.date(1989, 12, 31))
         assert str(d) == str(rvi.evaluation_periods.splitlines()[0])
 
+    def test_modified(self):
+        config = Config(model=None)
+        assert set(config.modified) == {"rvc", "rvh", "rvi", "rvp", "rvt", "ost"}
+
+        for rvx in config.modified:
+            getattr(config, rvx).reset_modified()
+        assert config.modified == {}
+
+        # Assigning an equal value is not a modification
+        config.rvi.run_name = "run"
+        config.rvi.calendar = "STANDARD"
+        assert config.modified == {}
+
+        config.rvi.calendar = "NOLEAP"
+        config.rvh.land_subbasin_ids = (1, 2)
+        assert config.modified == {"rvi": {"_calendar"}, "rvh": {"land_subbasin_ids"}}
+
+        config.rvp.set_extra_attributes(x=1)
+        assert config.rvp.modified == {"_extra_attributes"}
+        config.rvp.reset_modified()
+        config.rvp.set_extra_attributes(x=1)
+        assert config.rvp.modified == set()
+
+        # States modified in place
+        config.rvc.hru_states[1] = HRUState(soil0=1)
+        assert config.rvc.modified == {"hru_states"}
+        config.rvc.reset_modified()
+        config.rvc.hru_states[1] = HRUState(soil0=1)
+        assert config.rvc.modified == set()
+        config.rvc.set_hru_state(HRUState(soil0=2))
+        assert config.rvc.modified == {"hru_states"}
+
+    def test_rendered_records(self):
+        rvh = RVH(None)
+        rvh.hrus = (HRU(hru_id=1, area=10), HRU(hru_id=2, area=20))
+        res = rvh.to_rv()
+        assert rvh.to_rv() == res
+        assert rvh._fragments["hrus"][1] in res
+
+        # Records modified in place are rendered again
+        rvh.hrus[1].area = 30.0
+        hrus = re.search(":HRUs(.+):EndHRUs", rvh.to_rv(), re.DOTALL).group(1)
+        assert "30.0" in hrus and "20.0" not in hrus
+
+        rvh.hrus = rvh.hrus[:1]
+        assert len(list(filter(None, rvh.to_rv().splitlines()))) < len(
+            list(filter(None, res.splitlines()))
+        )
+
+    @pytest.mark.parametrize("max_memoized", [10000, 0])
+    def test_write_to(self, monkeypatch, max_memoized):
+        monkeypatch.setattr(commands, "WRITE_CHUNK_SIZE", 2)
+        monkeypatch.setattr(rvs, "MAX_MEMOIZED_RECORDS", max_memoized)
+
+        rvh = RVH(None)
+        rvh.subbasins = tuple(Sub(subbasin_id=i, name=f"sub_{i}") for i in range(5))
+        rvh.hrus = tuple(HRU(hru_id=i, area=i) for i in range(5))
+        f = io.StringIO()
+        rvh.write_to(f)
+        assert f.getvalue() == rvh.to_rv()
+        assert f.getvalue().count("sub_") == 5
+
+        gw = GridWeightsCommand(
+            number_hrus=2,
+            number_grid_cells=3,
+            data=((1, 0, 0.5), (1, 1, 0.5), (2, 2, 1)),
+        )
+        f = io.StringIO()
+        gw.write_to(f, indent_level=1)
+        assert f.getvalue() == gw.to_rv(indent_level=1)
+        assert GridWeightsCommand.parse(gw.to_rv()) == gw
+
 
 class TestOst:
     def test_random(self):
@@ -105,6 +278,162 @@ class TestRVC:
         assert ":BasinIndex 1 watershed" in rv
 
 
+class TestModelState:
+    solution = """
+    :TimeStamp 2000-07-01 00:00:00.00
+    :HRUStateVariableTable
+      :Attributes,SURFACE_WATER,ATMOSPHERE,SOIL[0],SOIL[1]
+      :Units,mm,mm,mm,mm
+      1,0.00000,821.98274,123.50000,7.00000
+      2,0.00000,1.50000,3.50000,4.50000
+    :EndHRUStateVariableTable
+    :BasinStateVariables
+      :BasinIndex 1,watershed
+        :ChannelStorage, 0.50000
+        :RivuletStorage, 0.00000
+        :Qout,1,13.21660,13.29232
+        :Qlat,3,1,2
+        ,3,4
+        :Qin ,0
+      :BasinIndex 2,outlet
+        :ChannelStorage, 5.00000
+        :RivuletStorage, 0.00000
+        :Qout,1,1.5,2.5
+    :EndBasinStateVariables
+    """
+
+    def test_parse(self):
+        state = ModelState.parse(self.solution)
+        assert state.timestamp == "2000-07-01 00:00:00.00"
+        assert state.hru_values.shape == (2, 4)
+        np.testing.assert_array_equal(state.hru_index, [1, 2])
+        np.testing.assert_array_equal(state["SOIL[0]"], [123.5, 3.5])
+        assert state.units == ["mm"] * 4
+
+        np.testing.assert_array_equal(state.basin_index, [1, 2])
+        assert state.basin_names == ["watershed", "outlet"]
+        np.testing.assert_array_equal(state.channel_storage, [0.5, 5])
+        np.testing.assert_array_equal(
+            state.basin_flow("Qout", 0), [1, 13.2166, 13.29232]
+        )
+        # Wrapped over two lines
+        np.testing.assert_array_equal(state.basin_flow("Qlat", 0), [3, 1, 2, 3, 4])
+        assert state.basin_flow("Qlat", 1).size == 0
+
+        with pytest.raises(ValueError):
+            ModelState.parse(self.solution.replace("123.5", "x"))
+
+    @pytest.mark.parametrize("suffix", [".rvc", ".npz", ".nc"])
+    def test_save_load(self, tmp_path, suffix):
+        state = ModelState.parse(self.solution)
+        state["SOIL[1]"] += 0.1
+        fn = tmp_path / f"state{suffix}"
+        state.save(fn)
+        loaded = ModelState.load(fn)
+        np.testing.assert_array_equal(loaded.hru_values, state.hru_values)
+        assert loaded.to_rv() == state.to_rv()
+
+    def test_rvc(self):
+        state = ModelState.parse(self.solution)
+        rvc = RVC(None)
+        rvc.set_state(state)
+        assert rvc.has_hru_states
+        assert "    2,0.0,1.5,3.5,4.5" in rvc.to_rv()
+
+        # Single states are set on top of the records of all the states
+        rvc.set_hru_state(HRUState(index=2, soil0=1))
+        assert rvc.state is None
+        assert rvc.hru_states[1].soil0 == 123.5
+        assert rvc.hru_states[2].soil0 == 1
+        assert rvc.basin_states[2].qout == (1, 1.5, 2.5)
+
+        # Items set on the dictionaries, or dictionaries assigned directly, replace the array states too
+        rvc.set_state(state)
+        hru_states = rvc.hru_states
+        hru_states[2] = HRUState(index=2, soil0=1)
+        assert rvc.state is None
+        assert rvc.hru_states is hru_states
+        assert rvc.hru_states[1].soil0 == 123.5
+        assert "123.5" in rvc.to_rv()
+
+        rvc.set_state(state)
+        rvc.hru_states = {}
+        assert not rvc.has_hru_states
+        assert rvc.has_basin_states
+        assert rvc.basin_states[2].qout == (1, 1.5, 2.5)
+        assert "123.5" not in rvc.to_rv()
+
+
+class TestStateEnsemble:
+    def test_stack(self):
+        state = ModelState.parse(TestModelState.solution)
+        other = state.copy()
+        other["SOIL[0]"] = 0
+        ens = StateEnsemble.from_states([state, other, state])
+        assert len(ens) == 3
+        assert ens.hru_values.shape == (3, 2, 4)
+        np.testing.assert_array_equal(ens.get("soil0", hru=1), [123.5, 0, 123.5])
+        assert ens.get(["soil0", "SOIL[1]"]).shape == (3, 2, 2)
+        np.testing.assert_array_equal(
+            ens.basin_flows["Qout"][0][:, :3], [[1, 13.2166, 13.29232]] * 3
+        )
+
+        # Members are views on the ensemble arrays
+        member = ens[1]
+        assert isinstance(member, ModelState)
+        member["SOIL[1]"] = -1
+        np.testing.assert_array_equal(ens.get("soil1")[1], [-1, -1])
+
+        other.basin_flows["Qout"] = (np.zeros(4), np.array([0, 2, 4]))
+        with pytest.raises(ValueError):
+            StateEnsemble.from_states([state, other])
+
+    def test_set(self):
+        state = ModelState.parse(TestModelState.solution)
+        ens = StateEnsemble.repeat(state, 4)
+        ens.set(["soil0", "soil1"], np.arange(8).reshape(4, 2), hru=2)
+        np.testing.assert_array_equal(ens.get("soil0", hru=[1, 2])[:, 1], [0, 2, 4, 6])
+        np.testing.assert_array_equal(ens.get("soil0", hru=1), [123.5] * 4)
+        # The repeated states are copies
+        assert state["soil0"][1] == 3.5
+
+        ens.set("ATMOSPHERE", 0)
+        assert not ens.get("ATMOSPHERE").any()
+        with pytest.raises(KeyError):
+            ens.get("soil9")
+
+        rvc = RVC(None)
+        rvc.set_state(ens[3])
+        assert "    2,0.0,0.0,6.0,7.0" in rvc.to_rv()
+
+    def test_views(self):
+        state = ModelState.parse(TestModelState.solution)
+        ens = StateEnsemble.repeat(state, 3)
+        hru_states, basin_states = ens.hru_view(), ens.basin_view()
+        assert len(hru_states) == len(basin_states) == 3
+        assert hru_states.basin_index.size == 0
+        assert basin_states.hru_index.size == 0
+        with pytest.raises(KeyError):
+            basin_states.get("soil0")
+
+        # The views share the arrays of the ensemble
+        hru_states.set("soil0", 0)
+        assert not ens.get("soil0").any()
+        basin_states.channel_storage[:] = 1
+
+        merged = StateEnsemble.merge(hru_states, basin_states)
+        np.testing.assert_array_equal(merged.hru_values, ens.hru_values)
+        np.testing.assert_array_equal(merged.channel_storage, 1)
+        np.testing.assert_array_equal(
+            merged.basin_flows["Qout"][0], ens.basin_flows["Qout"][0]
+        )
+        with pytest.raises(ValueError):
+            StateEnsemble.merge(hru_states, StateEnsemble.repeat(state, 2))
+
+        member = ModelState.merge(hru_states[1], basin_states[1])
+        assert member.to_rv() == ens[1].to_rv()
+
+
 class TestRVH:
     @classmethod
     def setup_class(self):